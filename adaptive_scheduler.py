@@ -0,0 +1,243 @@
+"""
+Adaptive detection scheduling for the timer-triggered anomaly detection.
+The timer fires on a short base tick; the scheduler decides on each tick whether a
+detection run is due, based on recent build arrival rate and anomaly rate.
+"""
+
+import logging
+import math
+import os
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# Detection interval used when adaptive scheduling is disabled, and the
+# fixed cadence that "queries saved" is measured against
+DEFAULT_INTERVAL_SECONDS = 300
+DEFAULT_MIN_INTERVAL_SECONDS = 60
+DEFAULT_MAX_INTERVAL_SECONDS = 1800
+DEFAULT_TARGET_BUILDS_PER_RUN = 20
+DEFAULT_ANOMALY_RATE_THRESHOLD = 0.05
+DEFAULT_SMOOTHING = 0.3
+
+# Timer ticks can fire slightly early; treat a run as due within this slack
+TICK_TOLERANCE_SECONDS = 5
+
+
+def get_env_float(name: str, default: float) -> float:
+    """
+    Read a positive number setting from the environment.
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+
+    Returns:
+        Float setting
+    """
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        value = None
+    if value is None or not math.isfinite(value) or value <= 0:
+        logger.warning(f"Invalid {name} setting {raw!r}; using {default}")
+        return default
+    return value
+
+
+class AdaptiveScheduler:
+    """Chooses the effective detection interval from recent pipeline activity."""
+
+    def __init__(self, adaptive: bool = False,
+                 interval: float = DEFAULT_INTERVAL_SECONDS,
+                 min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS,
+                 max_interval: float = DEFAULT_MAX_INTERVAL_SECONDS,
+                 target_builds_per_run: float = DEFAULT_TARGET_BUILDS_PER_RUN,
+                 anomaly_rate_threshold: float = DEFAULT_ANOMALY_RATE_THRESHOLD,
+                 smoothing: float = DEFAULT_SMOOTHING):
+        """
+        Initialize the scheduler.
+
+        Args:
+            adaptive: Adjust the interval to activity; if False, run every `interval` seconds
+            interval: Fixed interval in seconds (also the starting interval in adaptive mode)
+            min_interval: Shortest interval in adaptive mode
+            max_interval: Longest interval in adaptive mode (also caps the query window)
+            target_builds_per_run: Builds a run should cover before the interval drops below `interval`
+            anomaly_rate_threshold: Anomaly rate above which the minimum interval is used
+            smoothing: Weight of the newest observation in the moving averages
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Expected 0 < min_interval <= max_interval")
+
+        self.adaptive = adaptive
+        self.base_interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_builds_per_run = target_builds_per_run
+        self.anomaly_rate_threshold = anomaly_rate_threshold
+        self.smoothing = smoothing
+
+        self.interval = min(max(interval, min_interval), max_interval) if adaptive else interval
+        self.build_rate = None
+        self.anomaly_rate = None
+        self.last_run = None
+
+        # Counters for stats()
+        self.started = None
+        self.ticks = 0
+        self.runs = 0
+        self.builds = 0
+        self.latency_weighted = 0.0
+        self.max_window = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'AdaptiveScheduler':
+        """
+        Create a scheduler from Function App settings.
+
+        Invalid settings fall back to their defaults with a warning, so a
+        bad app setting never stops timer detection.
+
+        Returns:
+            AdaptiveScheduler configured from ADAPTIVE_SCHEDULING and DETECTION_* settings
+        """
+        min_interval = get_env_float('DETECTION_MIN_INTERVAL_SECONDS', DEFAULT_MIN_INTERVAL_SECONDS)
+        max_interval = get_env_float('DETECTION_MAX_INTERVAL_SECONDS', DEFAULT_MAX_INTERVAL_SECONDS)
+        if min_interval > max_interval:
+            logger.warning(f"DETECTION_MIN_INTERVAL_SECONDS ({min_interval}) exceeds "
+                           f"DETECTION_MAX_INTERVAL_SECONDS ({max_interval}); using "
+                           f"{DEFAULT_MIN_INTERVAL_SECONDS} and {DEFAULT_MAX_INTERVAL_SECONDS}")
+            min_interval, max_interval = DEFAULT_MIN_INTERVAL_SECONDS, DEFAULT_MAX_INTERVAL_SECONDS
+
+        return cls(
+            adaptive=os.environ.get('ADAPTIVE_SCHEDULING', '').lower() in ('1', 'true', 'yes'),
+            interval=get_env_float('DETECTION_INTERVAL_SECONDS', DEFAULT_INTERVAL_SECONDS),
+            min_interval=min_interval,
+            max_interval=max_interval,
+            target_builds_per_run=get_env_float('DETECTION_TARGET_BUILDS', DEFAULT_TARGET_BUILDS_PER_RUN),
+            anomaly_rate_threshold=get_env_float('DETECTION_ANOMALY_RATE_THRESHOLD', DEFAULT_ANOMALY_RATE_THRESHOLD)
+        )
+
+    def should_run(self, now: float) -> bool:
+        """
+        Record a timer tick and decide whether detection is due.
+
+        Args:
+            now: Current time in epoch seconds
+
+        Returns:
+            True if a detection run should happen on this tick
+        """
+        self.ticks += 1
+        if self.started is None:
+            self.started = now
+        if self.last_run is None:
+            return True
+        return now - self.last_run >= self.interval - TICK_TOLERANCE_SECONDS
+
+    def window(self, now: float) -> timedelta:
+        """
+        Query window for a run at `now`: everything since the previous run.
+
+        The previous run is only known in memory. In adaptive mode the gap
+        before the first run of an instance (after a restart or scale-out)
+        can be up to max_interval, so the first window covers all of it;
+        builds near its start may have been scored by the previous instance.
+
+        Args:
+            now: Current time in epoch seconds
+
+        Returns:
+            Window covering the time since the last run, capped at max_interval
+        """
+        longest = max(self.max_interval, self.interval)
+        if self.last_run is None:
+            seconds = longest if self.adaptive else self.interval
+        else:
+            seconds = min(now - self.last_run, longest)
+        return timedelta(seconds=seconds)
+
+    def record_run(self, now: float, window: timedelta, builds: int, anomalies: int):
+        """
+        Update activity estimates after a detection run and pick the next interval.
+
+        Args:
+            now: Time of the run in epoch seconds
+            window: Query window used for the run
+            builds: Number of builds scored
+            anomalies: Number of anomalies detected
+        """
+        window_s = window.total_seconds()
+        build_rate = builds / window_s if window_s > 0 else 0.0
+        anomaly_rate = anomalies / builds if builds else 0.0
+
+        if self.build_rate is None:
+            self.build_rate, self.anomaly_rate = build_rate, anomaly_rate
+        else:
+            self.build_rate += self.smoothing * (build_rate - self.build_rate)
+            self.anomaly_rate += self.smoothing * (anomaly_rate - self.anomaly_rate)
+
+        self.last_run = now
+        self.runs += 1
+        self.builds += builds
+        # A build lands uniformly within the window, so on average it waits half of it
+        self.latency_weighted += builds * window_s / 2
+        self.max_window = max(self.max_window, window_s)
+
+        if self.adaptive:
+            self.interval = self.next_interval()
+
+    def next_interval(self) -> float:
+        """
+        Compute the adaptive interval from the smoothed activity estimates.
+
+        Returns:
+            Interval in seconds within [min_interval, max_interval]
+        """
+        if self.anomaly_rate >= self.anomaly_rate_threshold:
+            # Something is going wrong: look again as soon as allowed
+            return self.min_interval
+        if self.build_rate * self.base_interval < 1:
+            # Fewer than one build expected per base interval: the pipelines
+            # are idle, so wait roughly until the next build is expected
+            if self.build_rate <= 0:
+                return self.max_interval
+            return min(max(1 / self.build_rate, self.base_interval), self.max_interval)
+
+        # Active pipelines: never slower than the base interval, and faster
+        # when builds arrive quickly enough to fill a run sooner
+        interval = self.target_builds_per_run / self.build_rate
+        return min(max(interval, self.min_interval), self.base_interval)
+
+    def stats(self, now: float = None) -> dict:
+        """
+        Summarize scheduling behaviour since the first tick.
+
+        Args:
+            now: Current time in epoch seconds (defaults to the last run)
+
+        Returns:
+            Dictionary with run counts, queries saved versus the fixed
+            DEFAULT_INTERVAL_SECONDS cadence, and detection latency estimates
+        """
+        now = now if now is not None else (self.last_run or 0.0)
+        elapsed = max(now - self.started, 0.0) if self.started is not None else 0.0
+        fixed_runs = elapsed / DEFAULT_INTERVAL_SECONDS + (1 if self.started is not None else 0)
+
+        return {
+            'adaptive': self.adaptive,
+            'ticks': self.ticks,
+            'runs': self.runs,
+            'skipped_ticks': self.ticks - self.runs,
+            'fixed_schedule_runs': int(fixed_runs),
+            'queries_saved': int(fixed_runs) - self.runs,
+            'current_interval_s': round(self.interval, 1),
+            'build_rate_per_min': round((self.build_rate or 0.0) * 60, 3),
+            'anomaly_rate': round(self.anomaly_rate or 0.0, 4),
+            'mean_detection_latency_s': round(self.latency_weighted / self.builds, 1) if self.builds else None,
+            'max_detection_latency_s': round(self.max_window, 1)
+        }
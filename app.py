@@ -1,6 +1,84 @@
-from flask import Flask, jsonify
+import gc
+import json
+import logging
+import os
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+from scoring import score as scoring
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+# /score mirrors the Azure ML endpoint contract; larger batches go to /score/bulk
+DEFAULT_SCORE_MAX_ROWS = 10000
+DEFAULT_BULK_CHUNK_SIZE = 5000
+
+
+def load_model(model_dir: str = None) -> bool:
+    """
+    Load the model and scaler used by the /score endpoints.
+
+    Runs at import, so with `gunicorn --preload` the artifacts are loaded once
+    in the master and shared copy-on-write by every forked worker. gc.freeze()
+    keeps the workers' garbage collector from writing to (and so un-sharing)
+    the pages holding the loaded objects.
+
+    Args:
+        model_dir: Directory with the model artifacts (defaults to the
+            MODEL_DIR environment variable, then 'model')
+
+    Returns:
+        True if the model was loaded
+    """
+    try:
+        scoring.init(model_dir)
+    except Exception:
+        logger.warning("Scoring model not loaded; /score endpoints will return 503")
+        return False
+    gc.freeze()
+    return True
+
+
+MODEL_LOADED = load_model()
+
+
+def get_env_int(name: str, default: int) -> int:
+    """Read a positive integer setting, falling back to the default."""
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def check_features(X):
+    """
+    Reject feature matrices the model cannot score, before any scoring starts.
+
+    Raises:
+        ValueError: If X has the wrong shape or a missing or non-finite value
+    """
+    if X.ndim != 2 or X.shape[1] != len(scoring.FEATURE_COLS):
+        raise ValueError(f'expected columns {scoring.FEATURE_COLS}')
+    if not np.isfinite(X).all():
+        raise ValueError('features must be finite numbers')
+
+
+def parse_bulk_body():
+    """
+    Read a bulk scoring body: NDJSON with one build per line, or the
+    {"data": ...} JSON body accepted by /score.
+
+    Returns:
+        Value for scoring.parse_input
+    """
+    if request.mimetype == 'application/x-ndjson':
+        lines = (line.strip() for line in request.get_data(as_text=True).splitlines())
+        return json.loads('[' + ','.join(line for line in lines if line) + ']')
+    return request.get_json(force=True)['data']
+
 
 @app.route('/')
 def home():
@@ -12,8 +90,101 @@ def home():
 @app.route('/health')
 def health():
     return jsonify({
-        'status': 'healthy'
+        'status': 'healthy',
+        'model_loaded': MODEL_LOADED
     }), 200
 
+@app.route('/score', methods=['POST'])
+def score():
+    """Score a batch of builds; same request and response as the Azure ML endpoint."""
+    if not MODEL_LOADED:
+        return jsonify({'error': 'Model not loaded'}), 503
+
+    try:
+        X, build_ids = scoring.parse_input(request.get_json(force=True)['data'])
+        check_features(X)
+    except Exception as e:
+        return jsonify({'error': f'Invalid input: {e}'}), 400
+
+    max_rows = get_env_int('SCORE_MAX_ROWS', DEFAULT_SCORE_MAX_ROWS)
+    if len(X) > max_rows:
+        return jsonify({'error': f'At most {max_rows} rows per request; use /score/bulk'}), 413
+
+    try:
+        is_anomaly, anomaly_scores, avg_trees = scoring.predict(X)
+    except Exception as e:
+        logger.error(f"Error during prediction: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    response = {
+        'predictions': is_anomaly.tolist(),
+        'anomaly_scores': anomaly_scores.tolist(),
+        'build_ids': build_ids,
+        'model_version': scoring.model_version
+    }
+    if scoring.progressive_scorer is not None:
+        response['avg_trees_per_row'] = round(avg_trees, 2)
+    return jsonify(response)
+
+@app.route('/score/bulk', methods=['POST'])
+def score_bulk():
+    """
+    Score any number of builds, streaming one NDJSON result line per build.
+
+    Rows are scored in chunks of SCORE_BULK_CHUNK_SIZE while the response is
+    written, so the encoded output is never held in memory at once. Input is
+    validated before the first chunk; a chunk that still fails to score ends
+    the stream with an {"error": ...} line, since the status is already sent.
+    """
+    if not MODEL_LOADED:
+        return jsonify({'error': 'Model not loaded'}), 503
+
+    try:
+        X, build_ids = scoring.parse_input(parse_bulk_body())
+        check_features(X)
+    except Exception as e:
+        return jsonify({'error': f'Invalid input: {e}'}), 400
+
+    chunk_size = get_env_int('SCORE_BULK_CHUNK_SIZE', DEFAULT_BULK_CHUNK_SIZE)
+
+    def generate():
+        for start in range(0, len(X), chunk_size):
+            try:
+                is_anomaly, anomaly_scores, _ = scoring.predict(X[start:start + chunk_size])
+            except Exception as e:
+                logger.error(f"Error during prediction: {str(e)}")
+                yield json.dumps({'error': str(e)}) + '\n'
+                return
+            yield ''.join(
+                json.dumps({'build_id': build_id, 'is_anomaly': flag, 'anomaly_score': value}) + '\n'
+                for build_id, flag, value in zip(build_ids[start:start + chunk_size],
+                                                 is_anomaly.tolist(), anomaly_scores.tolist())
+            )
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/drift')
+def drift():
+    """
+    Drift of the inputs and scores this worker has served against the training data.
+
+    Each gunicorn worker keeps its own live sketches, so the report covers the
+    traffic of the worker that answers.
+    """
+    if not MODEL_LOADED:
+        return jsonify({'error': 'Model not loaded'}), 503
+
+    report = scoring.drift_report()
+    return jsonify(report), 404 if 'error' in report else 200
+
+@app.route('/shadow')
+def shadow():
+    """Agreement of the shadow model with the primary on this worker's traffic."""
+    if not MODEL_LOADED:
+        return jsonify({'error': 'Model not loaded'}), 503
+
+    report = scoring.shadow_report()
+    return jsonify(report), 404 if 'error' in report else 200
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8000, debug=False)
@@ -0,0 +1,336 @@
+"""
+Offline backfill: re-score pipeline metrics history with the saved model.
+
+Splits a metrics CSV (pipeline_metrics.csv by default) into byte ranges of
+whole rows, parses and scores the ranges on a process pool with the artifacts in
+model/, and writes one columnar part file per chunk: build_id, anomaly_score,
+prediction and model_version. The CSV must hold one row per line (no quoted
+newlines), as written by the pipeline.
+A manifest records completed chunks, so an interrupted run resumes where it
+stopped.
+
+Usage:
+    python backfill_scores.py                                    # pipeline_metrics.csv -> backfill_output/
+    python backfill_scores.py --input history.csv --output rescored/ --workers 8
+    python backfill_scores.py --chunk-size 200000 --model-dir model_v2/
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics_batch import StringTable
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+DEFAULT_CHUNK_SIZE = 100000
+INPUT_COLUMNS = ['build_id', 'duration', 'failure_rate']
+INPUT_DTYPES = {'build_id': str, 'duration': np.float64, 'failure_rate': np.float64}
+SCORING_MODE = 'exact'
+SCAN_BLOCK_BYTES = 1 << 24
+
+
+def part_path(output_dir: Path, chunk_index: int) -> Path:
+    return output_dir / f'part-{chunk_index:05d}.npz'
+
+
+def init_worker(model_dir: str):
+    """Load the model once per worker process, for exact scoring only."""
+    from scoring import score
+
+    # Backfilled scores must be the model's exact output, whatever the
+    # endpoint settings in the environment: no early exit, no shadow model
+    os.environ['SCORING_MODE'] = SCORING_MODE
+    os.environ.pop('SHADOW_MODEL_DIR', None)
+
+    logging.getLogger('scoring.score').setLevel(logging.WARNING)
+    score.init(model_dir)
+    # History is not live traffic; keep it out of the drift sketches
+    score.drift_monitor = None
+
+
+def score_chunk(chunk_index: int, input_path: str, columns: list, byte_range: tuple, output_dir: str) -> tuple:
+    """
+    Parse and score one chunk of the CSV and write its part file.
+
+    The worker reads its own byte range, so the parent never parses rows or
+    pickles feature arrays. The part is written to a temporary name and
+    renamed, so a part file either exists complete or not at all.
+
+    Args:
+        chunk_index: Position of the chunk in the input
+        input_path: Metrics CSV
+        columns: Column names from the CSV header
+        byte_range: (start, end) offsets of the chunk's rows in the file
+        output_dir: Output directory
+
+    Returns:
+        Tuple of (chunk index, rows, anomalies)
+    """
+    from scoring import score
+
+    start, end = byte_range
+    with open(input_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=INPUT_COLUMNS, dtype=INPUT_DTYPES)
+    X = chunk[['duration', 'failure_rate']].to_numpy(dtype=np.float64)
+
+    is_anomaly, anomaly_scores, _ = score.predict(X)
+    ids = StringTable.from_list(chunk['build_id'].tolist())
+
+    path = part_path(Path(output_dir), chunk_index)
+    tmp_path = path.with_name(path.stem + '.tmp.npz')
+    np.savez(
+        tmp_path,
+        build_id_data=np.frombuffer(ids.data, dtype=np.uint8),
+        build_id_offsets=ids.offsets,
+        anomaly_score=anomaly_scores,
+        prediction=is_anomaly,
+        model_version=np.array(score.model_version)
+    )
+    os.replace(tmp_path, path)
+    return chunk_index, len(X), int(np.count_nonzero(is_anomaly))
+
+
+def chunk_ranges(input_path: str, chunk_size: int) -> tuple:
+    """
+    Split a CSV into byte ranges of chunk_size rows without parsing it.
+
+    Only newlines are counted, a block at a time, so the scan runs far faster
+    than the workers parse and never holds more than one block in memory.
+
+    Args:
+        input_path: CSV with a header line and one row per line
+        chunk_size: Rows per range
+
+    Returns:
+        Tuple of (header column names, list of (start, end) byte offsets)
+
+    Raises:
+        ValueError: If the header lacks one of the input columns
+    """
+    with open(input_path, 'rb') as f:
+        header = f.readline()
+        columns = next(csv.reader([header.decode('utf-8-sig')]), [])
+        missing = [column for column in INPUT_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"{input_path} is missing columns: {', '.join(missing)}")
+
+        ranges = []
+        chunk_start = position = content_end = f.tell()
+        lines = 0  # Rows already in the current range
+        while block := f.read(SCAN_BLOCK_BYTES):
+            if block.strip():
+                content_end = position + len(block.rstrip())
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            # Newlines that end a range: the (chunk_size - lines)th, then every chunk_size
+            for end in newlines[chunk_size - lines - 1::chunk_size]:
+                ranges.append((chunk_start, position + int(end) + 1))
+                chunk_start = ranges[-1][1]
+            lines = (lines + len(newlines)) % chunk_size
+            position += len(block)
+
+    # The last rows, unless only blank lines follow the last full range
+    if chunk_start < content_end:
+        ranges.append((chunk_start, position))
+    return columns, ranges
+
+
+def load_manifest(output_dir: Path, settings: dict) -> dict:
+    """
+    Load the manifest of a previous run, or start a new one.
+
+    Args:
+        output_dir: Output directory
+        settings: Input, chunk size, model version and scoring mode of this run
+
+    Returns:
+        Manifest dictionary with the settings and completed chunks
+
+    Raises:
+        ValueError: If the output holds a run with different settings
+    """
+    path = output_dir / MANIFEST_FILE
+    if not path.exists():
+        return {**settings, 'completed': {}}
+
+    with open(path) as f:
+        manifest = json.load(f)
+
+    mismatched = [key for key in settings if manifest.get(key) != settings[key]]
+    if mismatched:
+        raise ValueError(f"{output_dir} holds a backfill with different {', '.join(mismatched)}; "
+                         f"use another --output or --restart")
+
+    # Only chunks whose part file exists count as done
+    manifest['completed'] = {
+        index: stats for index, stats in manifest['completed'].items()
+        if part_path(output_dir, int(index)).exists()
+    }
+    return manifest
+
+
+def save_manifest(output_dir: Path, manifest: dict):
+    """Write the manifest atomically."""
+    tmp_path = output_dir / (MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, output_dir / MANIFEST_FILE)
+
+
+def backfill(input_path: str, output_dir: str, model_dir: str = 'model',
+             chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None, restart: bool = False) -> dict:
+    """
+    Score a metrics CSV into columnar part files, resuming a previous run.
+
+    Args:
+        input_path: CSV with build_id, duration and failure_rate columns
+        output_dir: Directory for part files and the manifest
+        model_dir: Directory with the model artifacts
+        chunk_size: Rows per chunk (and part file)
+        workers: Worker processes (defaults to the CPU count)
+        restart: Discard the progress of a previous run
+
+    Returns:
+        Dictionary with rows scored, chunks scored and skipped, anomalies,
+        elapsed seconds and rows per second
+    """
+    from scoring.score import artifact_version
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    settings = {
+        'input': str(Path(input_path).resolve()),
+        'input_bytes': os.path.getsize(input_path),
+        'chunk_size': chunk_size,
+        'model_version': artifact_version(model_dir),
+        'scoring_mode': SCORING_MODE
+    }
+    if restart:
+        for part in output.glob('part-*.npz'):
+            part.unlink()
+        (output / MANIFEST_FILE).unlink(missing_ok=True)
+    manifest = load_manifest(output, settings)
+    done = set(manifest['completed'])
+
+    start = time.perf_counter()
+    rows = chunks = anomalies = 0
+    skipped = len(done)
+    pending = set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(model_dir,)) as pool:
+        def collect(futures):
+            nonlocal rows, chunks, anomalies
+            for future in futures:
+                chunk_index, n_rows, n_anomalies = future.result()
+                manifest['completed'][str(chunk_index)] = {'rows': n_rows, 'anomalies': n_anomalies}
+                rows += n_rows
+                chunks += 1
+                anomalies += n_anomalies
+            save_manifest(output, manifest)
+            elapsed = time.perf_counter() - start
+            logger.info(f"{chunks} chunks, {rows} rows scored ({rows / elapsed:,.0f} rows/s)")
+
+        columns, ranges = chunk_ranges(input_path, chunk_size)
+        for chunk_index, byte_range in enumerate(ranges):
+            if str(chunk_index) in done:
+                continue
+            # Keep a bounded number of chunks in flight so memory stays flat
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(pool.submit(score_chunk, chunk_index, input_path, columns, byte_range, str(output)))
+
+        if pending:
+            collect(wait(pending)[0])
+
+    elapsed = time.perf_counter() - start
+    manifest['complete'] = True
+    save_manifest(output, manifest)
+
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'skipped_chunks': skipped,
+        'anomalies': anomalies,
+        'model_version': settings['model_version'],
+        'workers': workers,
+        'seconds': round(elapsed, 2),
+        'rows_per_s': round(rows / elapsed) if elapsed > 0 else 0
+    }
+
+
+def load_results(output_dir: str) -> dict:
+    """
+    Read all part files of a backfill into columns, in input order.
+
+    Args:
+        output_dir: Backfill output directory
+
+    Returns:
+        Dictionary with build_id (list), anomaly_score, prediction and
+        model_version arrays
+    """
+    parts = sorted(Path(output_dir).glob('part-[0-9]*[0-9].npz'))
+    build_ids, scores, predictions, versions = [], [], [], []
+    for part in parts:
+        with np.load(part) as data:
+            ids = StringTable(data['build_id_data'].tobytes(), data['build_id_offsets'])
+            build_ids.extend(ids.tolist())
+            scores.append(data['anomaly_score'])
+            predictions.append(data['prediction'])
+            versions.append(np.full(len(ids), str(data['model_version'])))
+
+    return {
+        'build_id': build_ids,
+        'anomaly_score': np.concatenate(scores) if scores else np.zeros(0),
+        'prediction': np.concatenate(predictions) if predictions else np.zeros(0, dtype=bool),
+        'model_version': np.concatenate(versions) if versions else np.zeros(0, dtype=str)
+    }
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Re-score pipeline metrics history with the saved model')
+    parser.add_argument('--input', default='pipeline_metrics.csv', help='Metrics CSV to score')
+    parser.add_argument('--output', default='backfill_output', help='Directory for part files and the manifest')
+    parser.add_argument('--model-dir', default='model', help='Directory with the model artifacts')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--restart', action='store_true', help='Ignore and discard previous progress')
+    args = parser.parse_args()
+
+    try:
+        result = backfill(args.input, args.output, args.model_dir, args.chunk_size, args.workers, args.restart)
+    except (OSError, ValueError) as e:
+        logger.error(f"Backfill failed: {str(e)}")
+        return 1
+
+    logger.info(f"Backfill complete: {result['rows']:,} rows in {result['chunks']} chunks "
+                f"({result['skipped_chunks']} already done), {result['anomalies']:,} anomalies, "
+                f"{result['rows_per_s']:,} rows/s with {result['workers']} workers, "
+                f"model version {result['model_version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for scoring, training and the detection pipeline.
+Run with: python -m benchmarks.run_benchmarks
+"""
@@ -0,0 +1,211 @@
+"""
+Throughput and memory of the Flask app's /score endpoint under gunicorn for
+different worker counts, with and without --preload.
+
+Each configuration starts gunicorn on 127.0.0.1 against a fixture model, drives
+/score closed-loop from client processes for a fixed duration, and reads
+per-process RSS/PSS from /proc to show how much model memory the workers share.
+Linux only (gunicorn and /proc).
+
+Usage:
+    python -m benchmarks.app_workers                          # 1 vs 4 workers, --preload
+    python -m benchmarks.app_workers --workers 1 2 4 --no-preload-too
+    python -m benchmarks.app_workers --rows 1000 --clients 16 --duration 20
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from synthetic_data import synthetic_metrics, train_fixture_model
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    """Pick an unused local port."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers: int, preload: bool, model_dir: str) -> tuple:
+    """
+    Start gunicorn serving app:app and wait until /health reports the model.
+
+    Args:
+        workers: Number of worker processes
+        preload: Pass --preload (load the app in the master before forking)
+        model_dir: Directory with the fixture model
+
+    Returns:
+        Tuple of (process, base URL)
+    """
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--log-level', 'warning']
+    if preload:
+        command.append('--preload')
+    command.append('app:app')
+
+    env = {**os.environ, 'MODEL_DIR': model_dir, 'OMP_NUM_THREADS': '1', 'OPENBLAS_NUM_THREADS': '1'}
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env)
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=2) as response:
+                if json.loads(response.read()).get('model_loaded'):
+                    # Let every worker finish booting before measuring
+                    time.sleep(1 + 0.25 * workers)
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def worker_pids(master_pid: int) -> list:
+    """Find the gunicorn worker processes forked from the master."""
+    pids = []
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # The ppid is the second field after the parenthesised command name
+        if int(stat.rsplit(')', 1)[1].split()[1]) == master_pid:
+            pids.append(int(entry.name))
+    return pids
+
+
+def memory_mb(pid: int) -> dict:
+    """Read RSS, PSS and private memory of a process from smaps_rollup."""
+    fields = {}
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:
+        name, value = line.split(':', 1)
+        fields[name] = int(value.split()[0]) / 1024
+    return {
+        'rss_mb': fields.get('Rss', 0.0),
+        'pss_mb': fields.get('Pss', 0.0),
+        'private_mb': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+    }
+
+
+def client_loop(url: str, body: bytes, duration: float) -> list:
+    """Send /score requests back to back for `duration` seconds; return latencies in ms."""
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        request = urllib.request.Request(f'{url}/score', data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_config(workers: int, preload: bool, model_dir: str, body: bytes,
+               clients: int, duration: float) -> dict:
+    """
+    Measure one gunicorn configuration.
+
+    Returns:
+        Dictionary with throughput, latency percentiles and memory per process
+    """
+    process, url = start_gunicorn(workers, preload, model_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            # Warm up every worker before the timed run
+            list(pool.map(client_loop, [url] * clients, [body] * clients, [1.0] * clients))
+            start = time.perf_counter()
+            per_client = list(pool.map(client_loop, [url] * clients, [body] * clients, [duration] * clients))
+            elapsed = time.perf_counter() - start
+
+        latencies = np.concatenate([np.array(c) for c in per_client])
+        workers_memory = [memory_mb(pid) for pid in worker_pids(process.pid)]
+        master_memory = memory_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        'workers': workers,
+        'preload': preload,
+        'requests': int(len(latencies)),
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99))
+        },
+        'memory_mb': {
+            'master': master_memory,
+            'worker_rss': float(np.mean([m['rss_mb'] for m in workers_memory])),
+            'worker_private': float(np.mean([m['private_mb'] for m in workers_memory])),
+            'total_pss': master_memory['pss_mb'] + sum(m['pss_mb'] for m in workers_memory)
+        }
+    }
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Compare /score throughput and memory across gunicorn worker counts')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--no-preload-too', action='store_true',
+                        help='Also run every worker count without --preload')
+    parser.add_argument('--rows', type=int, default=100, help='Builds per /score request')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per configuration')
+    parser.add_argument('--model-samples', type=int, default=1000,
+                        help='Training rows for the fixture model (more rows = larger trees)')
+    parser.add_argument('--json', metavar='PATH', help='Also write results to PATH')
+    args = parser.parse_args()
+
+    data = synthetic_metrics(args.rows, seed=7)
+    body = json.dumps({'data': {
+        'build_id': data['build_id'],
+        'duration': data['duration'].tolist(),
+        'failure_rate': data['failure_rate'].tolist()
+    }}).encode('utf-8')
+
+    configs = [(w, True) for w in args.workers]
+    if args.no_preload_too:
+        configs += [(w, False) for w in args.workers]
+
+    results = []
+    with tempfile.TemporaryDirectory() as model_dir:
+        train_fixture_model(model_dir, n_samples=args.model_samples)
+
+        print(f"{'workers':>7} {'preload':>7} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'worker RSS':>11} {'private':>8} {'total PSS':>10}")
+        for workers, preload in configs:
+            result = run_config(workers, preload, model_dir, body, args.clients, args.duration)
+            results.append(result)
+            memory = result['memory_mb']
+            print(f"{workers:>7} {str(preload):>7} {result['throughput_rps']:9.1f} "
+                  f"{result['latency_ms']['p50']:8.1f} {result['latency_ms']['p99']:8.1f} "
+                  f"{memory['worker_rss']:10.1f}M {memory['worker_private']:7.1f}M {memory['total_pss']:9.1f}M")
+
+    print(f"\n{os.cpu_count()} CPUs, {args.rows} rows per request, {args.clients} clients")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'rows': args.rows, 'clients': args.clients,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
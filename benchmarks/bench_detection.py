@@ -0,0 +1,62 @@
+"""
+Detection pipeline benchmarks: the function app's predict -> extract -> alert flow
+against local stand-ins for the ML endpoint and Teams webhook.
+"""
+
+import logging
+import os
+from unittest import mock
+
+from benchmarks.harness import measure
+from benchmarks.stand_ins import StandInServer, accept_handler, scoring_handler
+from synthetic_data import synthetic_metrics
+
+WINDOW_SIZES = [100, 10000, 50000]
+QUICK_WINDOW_SIZES = [100, 10000]
+
+
+def run(score_module, quick: bool = False) -> dict:
+    """
+    Benchmark end-to-end detection for windows of different sizes.
+
+    Args:
+        score_module: Initialized scoring/score.py module served by the ML stand-in
+        quick: Use fewer window sizes and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    import function_app
+    from metrics_batch import MetricsBatch
+
+    logger = logging.getLogger('benchmarks.detection')
+    results = {}
+    repeat = 3 if quick else 5
+
+    routes = {'/score': scoring_handler(score_module), '/teams': accept_handler}
+
+    with StandInServer(routes) as server:
+        settings = {
+            'ML_ENDPOINT_URL': f'{server.url}/score',
+            'TEAMS_WEBHOOK_URL': f'{server.url}/teams',
+            'ML_RETRY_BACKOFF_SECONDS': '0'
+        }
+
+        with mock.patch.dict(os.environ, settings):
+            for n_rows in (QUICK_WINDOW_SIZES if quick else WINDOW_SIZES):
+                data = synthetic_metrics(n_rows, seed=11)
+
+                def detect():
+                    metrics = MetricsBatch.from_columns(data['build_id'], data['duration'], data['failure_rate'])
+                    scored = function_app.predict_anomalies(metrics, logger)
+                    anomalies = scored.anomalies().to_records()
+                    function_app.send_teams_alert(anomalies, logger)
+                    return anomalies
+
+                timing = measure(detect, repeat=repeat)
+                results[f'detection.end_to_end.{n_rows}'] = {
+                    **timing,
+                    'rows_per_s': n_rows / (timing['median_ms'] / 1000)
+                }
+
+    return results
@@ -0,0 +1,98 @@
+"""
+Metrics history benchmarks: appending scored batches to metrics_store.MetricsStore
+and reading hour, day and full ranges back, before and after compaction,
+next to reading the same rows from one flat CSV.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import measure, peak_memory_mb
+from synthetic_data import synthetic_metrics
+
+# Rows per detection run, detection runs per hour (every 5 minutes)
+ROWS_PER_RUN = 100
+RUNS_PER_HOUR = 12
+DAYS = 7
+QUICK_DAYS = 2
+START = 1760054400.0  # 2025-10-10T00:00:00Z
+
+
+def scored_run(run: int):
+    """MetricsBatch of one detection run, with mock predictions attached."""
+    import function_app
+    from metrics_batch import MetricsBatch
+
+    data = synthetic_metrics(ROWS_PER_RUN, seed=run)
+    batch = MetricsBatch.from_columns([f'{run:06d}_{build_id}' for build_id in data['build_id']],
+                                      data['duration'], data['failure_rate'])
+    return function_app.mock_predictions(batch)
+
+
+def run(quick: bool = False) -> dict:
+    """
+    Benchmark appends and range reads on a store filled like a week of detection runs.
+
+    Args:
+        quick: Fewer days and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    from metrics_store import MetricsStore
+
+    results = {}
+    repeat = 3 if quick else 5
+    days = QUICK_DAYS if quick else DAYS
+    runs = [scored_run(i) for i in range(RUNS_PER_HOUR * 24)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        scratch = MetricsStore(os.path.join(workdir, 'scratch'))
+        timing = measure(lambda: scratch.append(runs[0], START), repeat=repeat * 4)
+        results[f'history.append.{ROWS_PER_RUN}'] = {
+            **timing,
+            'rows_per_s': ROWS_PER_RUN / (timing['median_ms'] / 1000)
+        }
+
+        store = MetricsStore(os.path.join(workdir, 'history'))
+        for i in range(days * 24 * RUNS_PER_HOUR):
+            store.append(runs[i % len(runs)], START + i * 3600 / RUNS_PER_HOUR + np.arange(ROWS_PER_RUN) * 0.1)
+        total_rows = days * 24 * RUNS_PER_HOUR * ROWS_PER_RUN
+
+        # The same rows as one flat CSV, read the way load_data reads pipeline_metrics.csv
+        csv_path = os.path.join(workdir, 'pipeline_metrics.csv')
+        columns = store.read()
+        columns['model_version'] = columns['model_version'].astype(object)
+        pd.DataFrame(columns).to_csv(csv_path, index=False)
+        timing = measure(lambda: pd.read_csv(csv_path), repeat=repeat)
+        results[f'history.read_csv.all.{days}d'] = {**timing, 'rows_per_s': total_rows / (timing['median_ms'] / 1000)}
+
+        # Hour and day in the middle of the range. Names carry the day count:
+        # quick and full runs fill stores of different sizes
+        middle = START + (days // 2) * 86400
+        ranges = {'hour': (middle + 12 * 3600, middle + 13 * 3600), 'day': (middle, middle + 86400),
+                  'all': (None, None)}
+
+        def read_ranges(state):
+            for span, (start, end) in ranges.items():
+                rows = len(store.read(start, end, columns=['timestamp'])['timestamp'])
+                timing = measure(lambda: store.read(start, end), repeat=repeat)
+                results[f'history.read.{span}.{days}d.{state}'] = {
+                    **timing,
+                    'rows_per_s': rows / (timing['median_ms'] / 1000),
+                    'segments': len(store.segments(start, end))
+                }
+                if span == 'all':
+                    results[f'history.read.{span}.{days}d.{state}']['peak_mb'] = peak_memory_mb(lambda: store.read())
+
+        read_ranges('segments')
+
+        timing = measure(lambda: store.compact(before=START + days * 86400), repeat=1, warmup=0)
+        results[f'history.compact.{days}d'] = {**timing, 'rows_per_s': total_rows / (timing['median_ms'] / 1000)}
+
+        read_ranges('compacted')
+
+    return results
@@ -0,0 +1,156 @@
+"""
+Scoring benchmarks: latency and throughput of scoring/score.py run() across batch sizes.
+"""
+
+import json
+import tempfile
+
+import numpy as np
+
+from benchmarks.harness import measure
+from synthetic_data import synthetic_metrics, train_fixture_model
+
+BATCH_SIZES = [1, 100, 1000, 10000]
+QUICK_BATCH_SIZES = [1, 100, 1000]
+
+
+def make_payload(n_rows: int, columnar: bool = False) -> str:
+    """
+    Build a run() request body with n_rows builds.
+
+    Args:
+        n_rows: Number of builds
+        columnar: Use the {column: values} layout instead of a list of records
+
+    Returns:
+        JSON request string
+    """
+    data = synthetic_metrics(n_rows, seed=7)
+    if columnar:
+        payload = {
+            'build_id': data['build_id'],
+            'duration': data['duration'].tolist(),
+            'failure_rate': data['failure_rate'].tolist()
+        }
+    else:
+        payload = [
+            {'build_id': b, 'duration': d, 'failure_rate': f}
+            for b, d, f in zip(data['build_id'], data['duration'].tolist(), data['failure_rate'].tolist())
+        ]
+    return json.dumps({'data': payload})
+
+
+def run(score_module, quick: bool = False) -> dict:
+    """
+    Benchmark run() on an initialized score module.
+
+    Args:
+        score_module: scoring/score.py module after init()
+        quick: Use fewer batch sizes and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    results = {}
+    repeat = 3 if quick else 7
+
+    for n_rows in (QUICK_BATCH_SIZES if quick else BATCH_SIZES):
+        for layout in ('records', 'columnar'):
+            payload = make_payload(n_rows, columnar=(layout == 'columnar'))
+            timing = measure(lambda: score_module.run(payload), repeat=repeat)
+            results[f'scoring.run.{layout}.{n_rows}'] = {
+                **timing,
+                'rows_per_s': n_rows / (timing['median_ms'] / 1000)
+            }
+
+    results.update(run_approximate(score_module, quick))
+    results.update(run_shadow(score_module, quick))
+    return results
+
+
+def run_approximate(score_module, quick: bool = False) -> dict:
+    """
+    Benchmark approximate (early-exit) scoring and validate it against exact mode.
+
+    Args:
+        score_module: scoring/score.py module after init() in exact mode
+        quick: Use fewer batch sizes and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics, including the fraction of
+        predictions that differ from exact scoring and trees evaluated per row
+    """
+    from scoring.progressive import ProgressiveScorer
+
+    results = {}
+    repeat = 3 if quick else 7
+
+    for n_rows in (QUICK_BATCH_SIZES if quick else BATCH_SIZES)[1:]:
+        payload = make_payload(n_rows, columnar=True)
+        exact = json.loads(score_module.run(payload))
+
+        score_module.progressive_scorer = ProgressiveScorer(score_module.model)
+        try:
+            timing = measure(lambda: score_module.run(payload), repeat=repeat)
+            approximate = json.loads(score_module.run(payload))
+        finally:
+            score_module.progressive_scorer = None
+
+        disagreement = np.mean(np.array(approximate['predictions']) != np.array(exact['predictions']))
+        results[f'scoring.run.approximate.{n_rows}'] = {
+            **timing,
+            'rows_per_s': n_rows / (timing['median_ms'] / 1000),
+            'avg_trees_per_row': approximate['avg_trees_per_row'],
+            'disagreement': float(disagreement)
+        }
+
+    return results
+
+
+def run_shadow(score_module, quick: bool = False) -> dict:
+    """
+    Benchmark run() with a shadow model against run() without one.
+
+    The shadow is a model trained on different data (so with its own scaler),
+    scored in approximate and in exact mode.
+
+    Args:
+        score_module: scoring/score.py module after init() without a shadow
+        quick: Use fewer batch sizes and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics, including the shadow's
+        overhead as a fraction of the request without it
+    """
+    from scoring.shadow import ShadowScorer
+
+    results = {}
+    repeat = 3 if quick else 7
+
+    with tempfile.TemporaryDirectory() as shadow_dir:
+        import joblib
+
+        train_fixture_model(shadow_dir, n_samples=2000)
+        shadow_model = joblib.load(f'{shadow_dir}/isolation_forest_model.pkl')
+        shadow_scaler = joblib.load(f'{shadow_dir}/scaler.pkl')
+
+    for n_rows in (QUICK_BATCH_SIZES if quick else BATCH_SIZES):
+        payload = make_payload(n_rows, columnar=True)
+        baseline = measure(lambda: score_module.run(payload), repeat=repeat)
+
+        for mode in ('approximate', 'exact'):
+            score_module.shadow_scorer = ShadowScorer(shadow_model, shadow_scaler, score_module.scaler, mode=mode)
+            try:
+                timing = measure(lambda: score_module.run(payload), repeat=repeat)
+                report = score_module.shadow_report()
+            finally:
+                score_module.shadow_scorer = None
+
+            results[f'scoring.run.shadow_{mode}.{n_rows}'] = {
+                **timing,
+                'rows_per_s': n_rows / (timing['median_ms'] / 1000),
+                'shadow_overhead': (timing['median_ms'] - baseline['median_ms']) / baseline['median_ms'],
+                'agreement_rate': report['agreement_rate']
+            }
+
+    return results
@@ -0,0 +1,48 @@
+"""
+Startup benchmarks: import time and time-to-first-detection of the function app
+and the scoring script in fresh interpreters, measured with profile_startup.py.
+"""
+
+import statistics
+import tempfile
+from pathlib import Path
+
+from profile_startup import FUNCTION_APP_PROBE, REPO_DIR, SCORING_PROBE, ensure_model, run_probe
+
+# Phases reported by the probes, in seconds
+PHASES = {'import': 'import_s', 'first_detection': 'first_detection_s'}
+
+
+def run(quick: bool = False) -> dict:
+    """
+    Benchmark cold starts of both entry points.
+
+    The scoring probe loads a throwaway model trained in a temporary
+    directory, so results do not depend on the artifacts in ./model.
+
+    Args:
+        quick: Fewer cold starts per target
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    runs = 3 if quick else 7
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ensure_model(Path(workdir))
+        probes = {
+            'function_app': (FUNCTION_APP_PROBE.format(repo_dir=str(REPO_DIR)), REPO_DIR),
+            'scoring': (SCORING_PROBE.format(scoring_dir=str(REPO_DIR / 'scoring')), Path(workdir))
+        }
+
+        for target, (source, cwd) in probes.items():
+            samples = [run_probe(source, cwd) for _ in range(runs)]
+            for phase, key in PHASES.items():
+                timings = [sample[key] * 1000 for sample in samples]
+                results[f'startup.{target}.{phase}'] = {
+                    'median_ms': statistics.median(timings),
+                    'min_ms': min(timings)
+                }
+
+    return results
@@ -0,0 +1,59 @@
+"""
+Streaming aggregation benchmarks: events/s of stream_aggregator.RunAggregator on
+one core, alone and feeding finished runs to the function app's scoring step.
+"""
+
+import logging
+
+from benchmarks.harness import measure, peak_memory_mb
+from synthetic_data import synthetic_events
+
+EVENT_COUNTS = [100000, 1000000]
+QUICK_EVENT_COUNTS = [100000]
+INGEST_BATCH = 1000
+
+
+def run(quick: bool = False) -> dict:
+    """
+    Benchmark event ingestion with and without scoring of finished runs.
+
+    Args:
+        quick: Use fewer event counts and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    import function_app
+    from stream_aggregator import RunAggregator
+
+    logger = logging.getLogger('benchmarks.stream')
+    # predict_anomalies warns on every batch that it is using mock predictions
+    logger.setLevel(logging.ERROR)
+    results = {}
+    repeat = 3 if quick else 5
+
+    for n_events in (QUICK_EVENT_COUNTS if quick else EVENT_COUNTS):
+        events = synthetic_events(n_runs=n_events // 25)
+
+        def aggregate(sink=None):
+            aggregator = RunAggregator(sink=sink)
+            for start in range(0, len(events), INGEST_BATCH):
+                aggregator.add_many(events[start:start + INGEST_BATCH])
+            aggregator.flush()
+
+        timing = measure(aggregate, repeat=repeat)
+        results[f'stream.aggregate.{n_events}'] = {
+            **timing,
+            'rows_per_s': n_events / (timing['median_ms'] / 1000),
+            'peak_mb': peak_memory_mb(aggregate)
+        }
+
+        # Finished runs go to predict_anomalies (mock rule without ML_ENDPOINT_URL)
+        timing = measure(lambda: aggregate(sink=lambda batch: function_app.predict_anomalies(batch, logger)),
+                         repeat=repeat)
+        results[f'stream.aggregate_and_score.{n_events}'] = {
+            **timing,
+            'rows_per_s': n_events / (timing['median_ms'] / 1000)
+        }
+
+    return results
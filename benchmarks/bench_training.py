@@ -0,0 +1,64 @@
+"""
+Training benchmarks: PipelineAnomalyDetector.load_data and train_model time and
+peak memory across dataset sizes.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmarks.harness import measure, peak_memory_mb
+from synthetic_data import synthetic_metrics
+
+DATASET_SIZES = [1000, 10000, 100000]
+QUICK_DATASET_SIZES = [1000, 10000]
+
+
+def run(quick: bool = False) -> dict:
+    """
+    Benchmark loading and training in a scratch directory.
+
+    train_model saves artifacts to ./model, so the benchmark runs in a
+    temporary working directory to leave the repository untouched.
+
+    Args:
+        quick: Use fewer dataset sizes and repeats
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    from train_anomaly_detection import PipelineAnomalyDetector
+
+    results = {}
+    repeat = 2 if quick else 3
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for n_rows in (QUICK_DATASET_SIZES if quick else DATASET_SIZES):
+                csv_path = os.path.join(workdir, f'metrics_{n_rows}.csv')
+                pd.DataFrame(synthetic_metrics(n_rows)).to_csv(csv_path, index=False)
+
+                detector = PipelineAnomalyDetector('bench', 'bench', 'bench')
+                data = detector.load_data(csv_path)
+
+                load = measure(lambda: detector.load_data(csv_path), repeat=repeat)
+                results[f'training.load_data.{n_rows}'] = {
+                    **load,
+                    'peak_mb': peak_memory_mb(lambda: detector.load_data(csv_path))
+                }
+
+                # IsolationForest(verbose=1) reports progress on stderr
+                with contextlib.redirect_stderr(io.StringIO()):
+                    train = measure(lambda: detector.train_model(data), repeat=repeat, warmup=0)
+                    peak = peak_memory_mb(lambda: detector.train_model(data))
+
+                results[f'training.train_model.{n_rows}'] = {**train, 'peak_mb': peak}
+        finally:
+            os.chdir(cwd)
+
+    return results
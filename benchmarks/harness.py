@@ -0,0 +1,133 @@
+"""
+Shared helpers for the benchmark suite: timing, peak memory and baseline
+comparison. Synthetic data and fixture models come from synthetic_data.py,
+which the tests use too.
+"""
+
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines.json'
+
+# Metrics compared against the baseline; all of them are "lower is better"
+COMPARED_METRICS = ('median_ms', 'peak_mb')
+
+
+def measure(fn, repeat: int = 5, warmup: int = 1) -> dict:
+    """
+    Time a callable, reporting the median and best of several runs.
+
+    Args:
+        fn: Zero-argument callable to time
+        repeat: Number of timed runs
+        warmup: Number of untimed runs first
+
+    Returns:
+        Dictionary with median_ms and min_ms
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings)}
+
+
+def peak_memory_mb(fn) -> float:
+    """
+    Measure peak traced allocation (Python and NumPy) while running fn.
+
+    Args:
+        fn: Zero-argument callable
+
+    Returns:
+        Peak allocation in megabytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def quiet_logging():
+    """Silence per-request INFO logging that would dominate small benchmarks."""
+    logging.disable(logging.INFO)
+
+
+def environment_info() -> dict:
+    """Describe the machine results were recorded on."""
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> dict:
+    """Load stored baselines, or an empty baseline if none exist yet."""
+    if not path.exists():
+        return {'environment': {}, 'results': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(results: dict, path: Path = BASELINE_PATH):
+    """Store results as the new baseline, merged over existing entries."""
+    baselines = load_baselines(path)
+    baselines['environment'] = environment_info()
+    baselines['results'].update(results)
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list:
+    """
+    Find benchmarks that are significantly slower (or larger) than the baseline.
+
+    Args:
+        results: Current results, {benchmark: {metric: value}}
+        baselines: Stored results in the same shape
+        tolerance: Allowed relative slowdown (0.3 = 30%)
+
+    Returns:
+        List of (benchmark, metric, baseline, current, ratio) regressions
+    """
+    regressions = []
+    for name, metrics in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        for metric, value in metrics.items():
+            if metric not in COMPARED_METRICS or metric not in baseline:
+                continue
+            reference = baseline[metric]
+            if reference <= 0:
+                continue
+            ratio = value / reference
+            if ratio > 1 + tolerance:
+                regressions.append((name, metric, reference, value, ratio))
+    return regressions
@@ -0,0 +1,316 @@
+"""
+End-to-end load test of the function app's detection flow against local stand-ins
+for Log Analytics, the Azure ML endpoint, the Teams webhook and SendGrid.
+
+The stand-ins run in a separate process. This process drives http_trigger
+(query -> score -> alert -> response) open-loop at a target rate on a worker
+thread pool sized like one Functions Python worker. Latency is measured from each
+request's scheduled start, so queueing shows up once the instance saturates.
+The first-page snapshot cache is disabled, so every request queries, scores and
+alerts instead of reusing a window another request already scored.
+
+Usage:
+    python -m benchmarks.load_test --rate 5 --duration 30
+    python -m benchmarks.load_test --rate 5 --ml-error-rate 0.2 --la-latency-ms 300
+    python -m benchmarks.load_test --ramp 2:40:2 --duration 15 --slo-p99-ms 2000
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.stand_ins import (
+    LOG_ANALYTICS_ROUTE, SCORE_ROUTE, SENDGRID_ROUTE, TEAMS_ROUTE, serve_stand_ins
+)
+
+SERVICES = {
+    'la': LOG_ANALYTICS_ROUTE,
+    'ml': SCORE_ROUTE,
+    'teams': TEAMS_ROUTE,
+    'sendgrid': SENDGRID_ROUTE
+}
+
+# Substrings of function_app log messages that signal a degraded path
+FAILURE_SIGNALS = {
+    'Error querying metrics': 'log_analytics_fallback_to_sample',
+    'Query failed': 'log_analytics_fallback_to_sample',
+    'retrying': 'ml_chunk_retries',
+    'Error scoring chunk': 'ml_chunk_fallback_to_mock',
+    'Unexpected error during prediction': 'ml_batch_fallback_to_mock',
+    'Error sending Teams alert': 'teams_alert_failed',
+    'Unexpected error sending alert': 'teams_alert_failed',
+    'Error sending email alert': 'email_alert_failed',
+    'Unexpected error sending email': 'email_alert_failed',
+    'Error in HTTP trigger': 'trigger_failed'
+}
+
+
+class FailureCounter(logging.Handler):
+    """Counts warning/error log records by the failure path they report."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.counts = Counter()
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        for signal, category in FAILURE_SIGNALS.items():
+            if signal in message:
+                self.counts[category] += 1
+                return
+
+
+def start_stand_ins(config: dict) -> tuple:
+    """
+    Start the stand-in services in a child process.
+
+    Args:
+        config: Configuration for serve_stand_ins
+
+    Returns:
+        Tuple of (base URL, process, stop event)
+    """
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    stop = context.Event()
+    process = context.Process(target=serve_stand_ins, args=(config, ready, stop), daemon=True)
+    process.start()
+    return ready.get(timeout=120), process, stop
+
+
+def fetch_stand_in_stats(base_url: str) -> dict:
+    """Read per-route request and injected-error counters from the stand-ins."""
+    with urllib.request.urlopen(f'{base_url}/_stats', timeout=10) as response:
+        return json.loads(response.read())
+
+
+def configure_function_app(base_url: str):
+    """
+    Point the function app at the stand-ins and return its HTTP trigger.
+
+    Log Analytics is reached through the real LogsQueryClient. It uses a
+    static bearer header instead of DefaultAzureCredential, and the client
+    is injected into the function app's per-instance client cache. The
+    snapshot cache is turned off: requests in the same second share a
+    window, and a cache hit would skip the query, scoring and alerts.
+
+    Args:
+        base_url: Base URL of the stand-in server
+
+    Returns:
+        The undecorated http_trigger function
+    """
+    os.environ.update({
+        'LOG_ANALYTICS_WORKSPACE_ID': 'load-test-workspace',
+        'ML_ENDPOINT_URL': f'{base_url}{SCORE_ROUTE}',
+        'TEAMS_WEBHOOK_URL': f'{base_url}{TEAMS_ROUTE}',
+        'SENDGRID_API_KEY': 'load-test',
+        'SENDGRID_FROM_EMAIL': 'alerts@load.test',
+        'SENDGRID_TO_EMAIL': 'devops@load.test',
+        'SENDGRID_API_URL': f'{base_url}{SENDGRID_ROUTE}'
+    })
+
+    from azure.core.pipeline.policies import SansIOHTTPPolicy
+    from azure.monitor.query import LogsQueryClient
+
+    import function_app
+
+    class StandInAuthPolicy(SansIOHTTPPolicy):
+        def on_request(self, request):
+            request.http_request.headers['Authorization'] = 'Bearer load-test'
+
+    function_app._logs_client = LogsQueryClient(
+        credential=None,
+        endpoint=f'{base_url}{LOG_ANALYTICS_ROUTE}',
+        authentication_policy=StandInAuthPolicy()
+    )
+    function_app.SNAPSHOT_CACHE_SIZE = 0
+
+    return function_app.http_trigger.build().get_user_function()
+
+
+def run_step(trigger, rate: float, duration: float, workers: int,
+             failures: FailureCounter, base_url: str) -> dict:
+    """
+    Drive the trigger open-loop at `rate` requests/s for `duration` seconds.
+
+    Args:
+        trigger: Undecorated http_trigger
+        rate: Offered requests per second
+        duration: Step length in seconds
+        workers: Worker threads (concurrent invocations on the instance)
+        failures: Log handler counting degraded paths
+        base_url: Stand-in base URL, for service-side counters
+
+    Returns:
+        Dictionary with throughput, latency percentiles and failure behaviour
+    """
+    import azure.functions as func
+
+    n_requests = max(int(rate * duration), 1)
+    failures.counts.clear()
+    services_before = fetch_stand_in_stats(base_url)
+
+    def invoke(scheduled: float):
+        request = func.HttpRequest(method='GET', url='/api/detect_anomalies', params={}, body=b'')
+        try:
+            status = trigger(request).status_code
+        except Exception:
+            status = 'exception'
+        return scheduled, time.perf_counter(), status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for i in range(n_requests):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(invoke, scheduled))
+        outcomes = [future.result() for future in futures]
+
+    finished = max(done for _, done, _ in outcomes)
+    latencies = np.array([(done - scheduled) * 1000 for scheduled, done, _ in outcomes])
+    statuses = Counter(str(status) for _, _, status in outcomes)
+
+    services_after = fetch_stand_in_stats(base_url)
+    services = {
+        name: {
+            key: services_after[route][key] - services_before[route][key]
+            for key in ('requests', 'injected_errors')
+        }
+        for name, route in SERVICES.items()
+    }
+    # Every request must run the full flow; retries only add calls
+    for name in ('la', 'ml'):
+        if services[name]['requests'] < n_requests:
+            raise RuntimeError(f"{services[name]['requests']} {name} calls for {n_requests} requests: "
+                               "detections were served without querying and scoring")
+
+    return {
+        'offered_rps': rate,
+        'requests': n_requests,
+        'throughput_rps': n_requests / (finished - start),
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p90': float(np.percentile(latencies, 90)),
+            'p99': float(np.percentile(latencies, 99)),
+            'max': float(latencies.max())
+        },
+        'statuses': dict(statuses),
+        'degraded_paths': dict(failures.counts),
+        'services': services
+    }
+
+
+def print_step(result: dict):
+    """Print one load step as a readable block."""
+    latency = result['latency_ms']
+    print(f"\noffered {result['offered_rps']:.1f} rps -> {result['throughput_rps']:.2f} rps "
+          f"({result['requests']} requests)")
+    print(f"  latency ms  p50 {latency['p50']:.0f}  p90 {latency['p90']:.0f}  "
+          f"p99 {latency['p99']:.0f}  max {latency['max']:.0f}")
+    print(f"  statuses    {result['statuses']}")
+    if result['degraded_paths']:
+        print(f"  degraded    {result['degraded_paths']}")
+    calls = ', '.join(f"{name} {s['requests']} ({s['injected_errors']} injected errors)"
+                      for name, s in result['services'].items())
+    print(f"  services    {calls}")
+
+
+def parse_ramp(value: str) -> list:
+    """Parse START:STOP:STEP into a list of rates."""
+    start, stop, step = (float(v) for v in value.split(':'))
+    return list(np.arange(start, stop + step / 2, step))
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Load test the function app against local service stand-ins')
+    parser.add_argument('--rate', type=float, default=5.0, help='Offered detections per second')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per load step')
+    parser.add_argument('--ramp', metavar='START:STOP:STEP',
+                        help='Step the rate up until the instance saturates or breaks the SLO')
+    parser.add_argument('--slo-p99-ms', type=float, default=2000.0, help='p99 latency limit for --ramp')
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                        help='Concurrent invocations (Functions Python worker thread pool size)')
+    parser.add_argument('--rows-per-query', type=int, default=500, help='Builds returned by each Log Analytics query')
+    parser.add_argument('--anomaly-fraction', type=float, default=0.05)
+    parser.add_argument('--ml-mode', choices=['score', 'rule'], default='score',
+                        help="'score' serves scoring/score.py with a fixture model, 'rule' a cheap rule")
+    for name, label in (('la', 'Log Analytics'), ('ml', 'ML endpoint'), ('teams', 'Teams'), ('sendgrid', 'SendGrid')):
+        parser.add_argument(f'--{name}-latency-ms', type=float, default=0.0, help=f'{label} added latency')
+        parser.add_argument(f'--{name}-jitter-ms', type=float, default=0.0, help=f'{label} random extra latency')
+        parser.add_argument(f'--{name}-error-rate', type=float, default=0.0, help=f'{label} injected error fraction')
+        parser.add_argument(f'--{name}-error-status', type=int, default=503, help=f'{label} injected error status')
+    parser.add_argument('--json', metavar='PATH', help='Also write results to PATH')
+    args = parser.parse_args()
+
+    config = {
+        'rows_per_query': args.rows_per_query,
+        'anomaly_fraction': args.anomaly_fraction,
+        'ml_mode': args.ml_mode,
+        'faults': {
+            route: {
+                'latency_ms': getattr(args, f'{name}_latency_ms'),
+                'jitter_ms': getattr(args, f'{name}_jitter_ms'),
+                'error_rate': getattr(args, f'{name}_error_rate'),
+                'error_status': getattr(args, f'{name}_error_status')
+            }
+            for name, route in SERVICES.items()
+        }
+    }
+
+    base_url, process, stop = start_stand_ins(config)
+    try:
+        logging.disable(logging.INFO)
+        failures = FailureCounter()
+        logging.getLogger().addHandler(failures)
+        trigger = configure_function_app(base_url)
+
+        # Warm up: client construction, connection pools, first-call imports
+        run_step(trigger, rate=1, duration=1, workers=1, failures=failures, base_url=base_url)
+
+        rates = parse_ramp(args.ramp) if args.ramp else [args.rate]
+        steps = []
+        limit = None
+        for rate in rates:
+            result = run_step(trigger, rate, args.duration, args.workers, failures, base_url)
+            steps.append(result)
+            print_step(result)
+
+            sustained = (result['throughput_rps'] >= 0.95 * rate
+                         and result['latency_ms']['p99'] <= args.slo_p99_ms)
+            if args.ramp:
+                if not sustained:
+                    break
+                limit = rate
+
+        if args.ramp:
+            if limit is None:
+                print(f"\nScaling limit: below {rates[0]:.1f} rps (p99 SLO {args.slo_p99_ms:.0f} ms)")
+            else:
+                print(f"\nScaling limit: {limit:.1f} rps sustained within p99 {args.slo_p99_ms:.0f} ms "
+                      f"({args.workers} workers, {args.rows_per_query} builds per query)")
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'config': config, 'workers': args.workers, 'scaling_limit_rps': limit, 'steps': steps},
+                          f, indent=2)
+    finally:
+        stop.set()
+        process.join(timeout=10)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
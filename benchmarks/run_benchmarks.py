@@ -0,0 +1,112 @@
+"""
+Benchmark runner with stored baselines and a regression check.
+
+Usage:
+    python -m benchmarks.run_benchmarks                      # run and print results
+    python -m benchmarks.run_benchmarks --check              # fail on regressions vs baselines.json
+    python -m benchmarks.run_benchmarks --update-baseline    # record results as the new baseline
+    python -m benchmarks.run_benchmarks --suite scoring --quick
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from benchmarks import bench_detection, bench_history, bench_scoring, bench_startup, bench_stream, bench_training
+from benchmarks.harness import compare, environment_info, load_baselines, quiet_logging, save_baselines
+from synthetic_data import train_fixture_model
+
+SUITES = ['scoring', 'training', 'detection', 'stream', 'history', 'startup']
+
+
+def run_suites(suites: list, quick: bool) -> dict:
+    """
+    Run the selected benchmark suites.
+
+    Args:
+        suites: Names of suites to run
+        quick: Use the reduced sizes of each suite
+
+    Returns:
+        Dictionary of benchmark name to metrics
+    """
+    from scoring import score
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        if 'scoring' in suites or 'detection' in suites:
+            train_fixture_model(model_dir)
+            score.init(model_dir)
+
+        if 'scoring' in suites:
+            results.update(bench_scoring.run(score, quick))
+        if 'training' in suites:
+            results.update(bench_training.run(quick))
+        if 'detection' in suites:
+            results.update(bench_detection.run(score, quick))
+        if 'stream' in suites:
+            results.update(bench_stream.run(quick))
+        if 'history' in suites:
+            results.update(bench_history.run(quick))
+        if 'startup' in suites:
+            results.update(bench_startup.run(quick))
+
+    return results
+
+
+def print_results(results: dict, baselines: dict):
+    """Print results alongside the stored baseline."""
+    print(f"{'benchmark':<40} {'median ms':>12} {'baseline':>12} {'ratio':>7} {'rows/s':>12} {'peak MB':>9}")
+    for name, metrics in sorted(results.items()):
+        reference = baselines.get(name, {}).get('median_ms')
+        ratio = f"{metrics['median_ms'] / reference:6.2f}x" if reference else ''
+        rows_per_s = f"{metrics['rows_per_s']:12.0f}" if 'rows_per_s' in metrics else ''
+        peak = f"{metrics['peak_mb']:9.1f}" if 'peak_mb' in metrics else ''
+        reference = f"{reference:12.2f}" if reference else ''
+        print(f"{name:<40} {metrics['median_ms']:12.2f} {reference:>12} {ratio:>7} {rows_per_s:>12} {peak:>9}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Run scoring, training, detection, stream, history and startup benchmarks')
+    parser.add_argument('--suite', choices=SUITES + ['all'], default='all')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes and fewer repeats')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Allowed slowdown relative to baseline (default 0.3 = 30%%)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store results as the new baseline')
+    parser.add_argument('--json', metavar='PATH', help='Also write raw results to PATH')
+    args = parser.parse_args()
+
+    quiet_logging()
+    suites = SUITES if args.suite == 'all' else [args.suite]
+    results = run_suites(suites, args.quick)
+
+    baselines = load_baselines()
+    print_results(results, baselines['results'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+
+    if args.update_baseline:
+        save_baselines(results)
+        print("\nBaseline updated")
+
+    if args.check:
+        if baselines['environment'] and baselines['environment'].get('platform') != environment_info()['platform']:
+            print("\nWarning: baseline was recorded on a different platform; ratios may not be meaningful")
+
+        regressions = compare(results, baselines['results'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, metric, reference, value, ratio in regressions:
+                print(f"  {name} {metric}: {reference:.2f} -> {value:.2f} ({ratio:.2f}x)")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Local stand-ins for the external services the function app calls:
+Log Analytics, the Azure ML scoring endpoint, the Teams webhook and SendGrid.
+Each stand-in is a threaded HTTP server on 127.0.0.1 with an ephemeral port and
+optional injected latency and errors.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Route prefixes the function app is pointed at
+LOG_ANALYTICS_ROUTE = '/v1'
+SCORE_ROUTE = '/score'
+TEAMS_ROUTE = '/teams'
+SENDGRID_ROUTE = '/v3/mail/send'
+
+
+class FaultProfile:
+    """Latency and error injection for one stand-in route."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503):
+        """
+        Initialize the profile.
+
+        Args:
+            latency_ms: Delay added before every response
+            jitter_ms: Uniform random extra delay in [0, jitter_ms]
+            error_rate: Fraction of requests answered with error_status
+            error_status: HTTP status used for injected errors
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+
+class StandInServer:
+    """Threaded HTTP server dispatching POST paths to Python handlers."""
+
+    def __init__(self, routes: dict, port: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            routes: Mapping of path prefix to handler(body: bytes) -> (status, response bytes),
+                or to a (handler, FaultProfile) tuple
+            port: Port to bind (0 for an ephemeral port)
+        """
+        self.routes = {
+            prefix: route if isinstance(route, tuple) else (route, FaultProfile())
+            for prefix, route in routes.items()
+        }
+        self.stats = {prefix: {'requests': 0, 'injected_errors': 0, 'bytes_sent': 0} for prefix in self.routes}
+        self._lock = threading.Lock()
+        self._rng = random.Random(1234)
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def requests(self) -> int:
+        return sum(s['requests'] for s in self.stats.values())
+
+    def match(self, path: str):
+        """Return the route prefix serving `path`, or None."""
+        path = path.split('?')[0]
+        for prefix in self.routes:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return prefix
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path == '/_stats':
+                    with server._lock:
+                        self._respond(200, json.dumps(server.stats).encode('utf-8'))
+                else:
+                    self._respond(404, b'{"error": "not found"}')
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                prefix = server.match(self.path)
+
+                if prefix is None:
+                    self._respond(404, b'{"error": "not found"}')
+                    return
+
+                handler, profile = server.routes[prefix]
+                with server._lock:
+                    fail = profile.error_rate > 0 and server._rng.random() < profile.error_rate
+                    delay = profile.latency_ms + (server._rng.uniform(0, profile.jitter_ms) if profile.jitter_ms else 0.0)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+
+                if fail:
+                    status, payload = profile.error_status, b'{"error": "injected failure"}'
+                else:
+                    status, payload = handler(body)
+
+                with server._lock:
+                    stats = server.stats[prefix]
+                    stats['requests'] += 1
+                    stats['injected_errors'] += fail
+                    stats['bytes_sent'] += len(payload)
+
+                self._respond(status, payload)
+
+            def _respond(self, status: int, payload: bytes):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def scoring_handler(score_module):
+    """
+    Serve an initialized scoring/score.py module like the Azure ML endpoint.
+
+    Args:
+        score_module: score module on which init() has been called
+
+    Returns:
+        Route handler returning run()'s JSON output
+    """
+    def handle(body: bytes):
+        result = score_module.run(body.decode('utf-8'))
+        status = 500 if '"error"' in result[:20] else 200
+        return status, result.encode('utf-8')
+
+    return handle
+
+
+def rule_scoring_handler(body: bytes):
+    """
+    Cheap stand-in for the ML endpoint using the function app's mock rule.
+
+    Useful when the endpoint itself should not be the bottleneck of a load test.
+    """
+    data = json.loads(body)['data']
+    is_anomaly = [d > 600 or f > 0.2 for d, f in zip(data['duration'], data['failure_rate'])]
+    return 200, json.dumps({
+        'predictions': is_anomaly,
+        'anomaly_scores': [-0.5 if a else 0.5 for a in is_anomaly],
+        'build_ids': data['build_id']
+    }).encode('utf-8')
+
+
+def log_analytics_handler(rows_per_query: int, anomaly_fraction: float = 0.05, seed: int = 42):
+    """
+    Answer Log Analytics queries with a fixed table of run-level metrics.
+
+    The response body is generated once, so the stand-in's own cost stays
+    negligible next to the function app under test.
+
+    Args:
+        rows_per_query: Number of builds returned by each query
+        anomaly_fraction: Fraction of slow/failing builds in the table
+        seed: Random seed
+
+    Returns:
+        Route handler returning a Log Analytics query response
+    """
+    rng = np.random.default_rng(seed)
+    n_anomalies = int(rows_per_query * anomaly_fraction)
+    duration = np.concatenate([rng.normal(300, 50, rows_per_query - n_anomalies),
+                               rng.normal(900, 100, n_anomalies)])
+    failure_rate = np.concatenate([rng.beta(2, 50, rows_per_query - n_anomalies),
+                                   rng.beta(10, 5, n_anomalies)])
+
+    body = json.dumps({'tables': [{
+        'name': 'PrimaryResult',
+        'columns': [
+            {'name': 'build_id', 'type': 'string'},
+            {'name': 'duration', 'type': 'real'},
+            {'name': 'failure_rate', 'type': 'real'}
+        ],
+        'rows': [[f'run_{i:07d}', d, f] for i, (d, f) in
+                 enumerate(zip(duration.tolist(), failure_rate.tolist()))]
+    }]}).encode('utf-8')
+
+    def handle(request_body: bytes):
+        return 200, body
+
+    return handle
+
+
+def accept_handler(body: bytes):
+    """Accept any notification (Teams webhook, SendGrid) with an empty JSON body."""
+    return 200, json.dumps({}).encode('utf-8')
+
+
+def serve_stand_ins(config: dict, ready, stop):
+    """
+    Run all four stand-ins on one server until `stop` is set.
+
+    Intended as a multiprocessing target so the stand-ins do not compete with
+    the function app for the GIL during a load test.
+
+    Args:
+        config: Dictionary with rows_per_query, anomaly_fraction, ml_mode
+            ('score' or 'rule') and per-service fault settings under
+            'faults' ({route: {latency_ms, jitter_ms, error_rate, error_status}})
+        ready: Queue receiving the server URL once listening
+        stop: Event that shuts the server down
+    """
+    import logging
+    import tempfile
+
+    logging.disable(logging.INFO)
+    faults = {route: FaultProfile(**settings) for route, settings in config.get('faults', {}).items()}
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        if config.get('ml_mode', 'score') == 'score':
+            from synthetic_data import train_fixture_model
+            from scoring import score
+
+            train_fixture_model(model_dir)
+            score.init(model_dir)
+            ml_handler = scoring_handler(score)
+        else:
+            ml_handler = rule_scoring_handler
+
+        handlers = {
+            LOG_ANALYTICS_ROUTE: log_analytics_handler(config['rows_per_query'], config.get('anomaly_fraction', 0.05)),
+            SCORE_ROUTE: ml_handler,
+            TEAMS_ROUTE: accept_handler,
+            SENDGRID_ROUTE: accept_handler
+        }
+        routes = {route: (handler, faults.get(route, FaultProfile())) for route, handler in handlers.items()}
+
+        with StandInServer(routes) as server:
+            ready.put(server.url)
+            stop.wait()
@@ -0,0 +1,36 @@
+import pytest
+
+from synthetic_data import train_fixture_model
+
+# Module state of scoring/score.py set by init()
+SCORING_GLOBALS = ('model', 'scaler', 'model_version', 'drift_monitor', 'progressive_scorer', 'shadow_scorer')
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory):
+    """Model artifacts trained once per session on synthetic metrics; tests must not modify them"""
+    path = tmp_path_factory.mktemp('model')
+    train_fixture_model(str(path))
+    return path
+
+
+@pytest.fixture(scope='session')
+def shadow_model_dir(tmp_path_factory):
+    """A second model, trained on more data, for shadow scoring tests"""
+    path = tmp_path_factory.mktemp('shadow_model')
+    train_fixture_model(str(path), n_samples=2000)
+    return path
+
+
+@pytest.fixture
+def scoring_state():
+    """Restore the model and monitors loaded in scoring/score.py when the test ends"""
+    from scoring import score
+
+    saved = {name: getattr(score, name) for name in SCORING_GLOBALS if hasattr(score, name)}
+    yield score
+    for name in SCORING_GLOBALS:
+        if name in saved:
+            setattr(score, name, saved[name])
+        elif hasattr(score, name):
+            delattr(score, name)
@@ -6,33 +6,98 @@ Monitors GitHub Actions pipelines and sends alerts when anomalies are detected.
 import logging
 import json
 import os
-from datetime import datetime, timedelta
+import base64
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import List
 import azure.functions as func
-from azure.identity import DefaultAzureCredential
-from azure.monitor.query import LogsQueryClient, LogsQueryStatus
-import requests
+import numpy as np
+
+from adaptive_scheduler import AdaptiveScheduler
+from metrics_batch import MetricsBatch
+from metrics_store import MetricsStore
+from stream_aggregator import RunAggregator
+
+# azure.identity, azure.monitor.query and requests are imported on first use:
+# the sample-data and mock-prediction paths never need them, and importing
+# them up front dominates the cold start of a fresh function instance.
 
 # Configure logging
 app = func.FunctionApp()
 
+# Log Analytics client, created once per function instance
+_logs_client = None
+
+# Detection scheduler; its activity estimates live as long as the instance
+_scheduler = None
+
+# Metrics history store, opened on first use when METRICS_STORE_PATH is set
+_metrics_store = None
+
+# Aggregator of raw job events from the stream trigger; open runs live as
+# long as the instance
+_run_aggregator = None
+
+# HTTP response shaping
+ANOMALY_FIELDS = ('build_id', 'duration', 'failure_rate', 'anomaly_score')
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+DEFAULT_HTTP_WINDOW = timedelta(minutes=5)
+
+# Scored HTTP detection windows by (start, end), so later pages of a result
+# reuse the first page's scoring instead of querying and scoring again
+# (0 disables the cache)
+SNAPSHOT_CACHE_SIZE = 8
+_snapshots = OrderedDict()
+
+# ML endpoint batching
+DEFAULT_ML_CHUNK_SIZE = 5000
+DEFAULT_ML_MAX_PARALLEL = 4
+DEFAULT_ML_MAX_RETRIES = 2
+DEFAULT_ML_RETRY_BACKOFF_SECONDS = 1.0
+DEFAULT_ML_TIMEOUT_SECONDS = 30
+
+# Model version recorded for rows scored by the mock rule
+MOCK_MODEL_VERSION = 'mock'
 
-def query_pipeline_metrics(logger: logging.Logger) -> list:
+
+def get_logs_client():
+    """
+    Return the Log Analytics query client, creating it on first use.
+    
+    Returns:
+        Tuple of (LogsQueryClient, LogsQueryStatus)
+    """
+    global _logs_client
+    
+    from azure.monitor.query import LogsQueryClient, LogsQueryStatus
+    
+    if _logs_client is None:
+        from azure.identity import DefaultAzureCredential
+        _logs_client = LogsQueryClient(DefaultAzureCredential())
+    
+    return _logs_client, LogsQueryStatus
+
+
+def query_pipeline_metrics(logger: logging.Logger, window: timedelta = None, end: datetime = None) -> MetricsBatch:
     """
     Query Azure Monitor for recent GitHub Actions pipeline metrics.
     
     Args:
         logger: Azure Functions logger
+        window: How far back from end to query (defaults to 5 minutes)
+        end: End of the queried window (defaults to now); a fixed end lets
+            repeated queries read the same snapshot
         
     Returns:
-        List of pipeline metrics
+        MetricsBatch of pipeline metrics
     """
     try:
         logger.info("Querying Azure Monitor for pipeline metrics")
         
-        # Initialize Azure Monitor client
-        credential = DefaultAzureCredential()
-        logs_client = LogsQueryClient(credential)
-        
         # Workspace ID from environment variable
         workspace_id = os.environ.get('LOG_ANALYTICS_WORKSPACE_ID')
         
@@ -40,10 +105,15 @@ def query_pipeline_metrics(logger: logging.Logger) -> list:
             logger.warning("LOG_ANALYTICS_WORKSPACE_ID not set, using sample data")
             return get_sample_metrics()
         
-        # Query for pipeline metrics from the last 5 minutes
-        query = """
-        let startTime = ago(5m);
-        let endTime = now();
+        # Initialize Azure Monitor client
+        logs_client, LogsQueryStatus = get_logs_client()
+        
+        # Query for pipeline metrics in the `window` before `end`
+        window = window or timedelta(minutes=5)
+        end = end or datetime.now(timezone.utc)
+        query = f"""
+        let endTime = datetime({end.strftime('%Y-%m-%dT%H:%M:%S.%fZ')});
+        let startTime = endTime - {int(window.total_seconds())}s;
         ContainerInsights
         | where TimeGenerated between(startTime .. endTime)
         | where Name contains "github-runner"
@@ -58,17 +128,11 @@ def query_pipeline_metrics(logger: logging.Logger) -> list:
         response = logs_client.query_workspace(
             workspace_id=workspace_id,
             query=query,
-            timespan=timedelta(minutes=5)
+            timespan=(end - window, end)
         )
         
         if response.status == LogsQueryStatus.SUCCESS:
-            metrics = []
-            for row in response.tables[0].rows:
-                metrics.append({
-                    'build_id': row[0],
-                    'duration': float(row[1]) if row[1] else 300.0,
-                    'failure_rate': float(row[2]) if row[2] else 0.0
-                })
+            metrics = MetricsBatch.from_rows(response.tables[0].rows)
             
             logger.info(f"Retrieved {len(metrics)} pipeline metrics")
             return metrics
@@ -81,12 +145,27 @@ def query_pipeline_metrics(logger: logging.Logger) -> list:
         return get_sample_metrics()
 
 
-def get_sample_metrics() -> list:
+def get_scheduler() -> AdaptiveScheduler:
+    """
+    Return the detection scheduler, creating it from app settings on first use.
+    
+    Returns:
+        AdaptiveScheduler for this function instance
+    """
+    global _scheduler
+    
+    if _scheduler is None:
+        _scheduler = AdaptiveScheduler.from_env()
+    
+    return _scheduler
+
+
+def get_sample_metrics() -> MetricsBatch:
     """
     Generate sample metrics for testing when Azure Monitor is not available.
     
     Returns:
-        List of sample pipeline metrics
+        MetricsBatch of sample pipeline metrics, marked with is_sample
     """
     import random
     
@@ -108,29 +187,149 @@ def get_sample_metrics() -> list:
             'failure_rate': failure_rate
         })
     
-    return metrics
+    batch = MetricsBatch.from_records(metrics)
+    batch.is_sample = True
+    return batch
+
+
+def get_env_int(name: str, default: int, minimum: int = 1) -> int:
+    """
+    Read an integer setting from the environment.
+    
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+        minimum: Smallest valid value (1 for counts and sizes, 0 for retries)
+        
+    Returns:
+        Integer setting
+    """
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value >= minimum else default
+
+
+def get_env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    """
+    Read a number setting from the environment.
+    
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+        minimum: Smallest valid value
+        
+    Returns:
+        Float setting
+    """
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if math.isfinite(value) and value >= minimum else default
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed endpoint call is worth retrying.
+    
+    Connection errors, timeouts, throttling (429) and server errors (5xx)
+    are transient; other client errors (e.g. 413 payload too large) are not.
+    
+    Args:
+        error: Exception raised while scoring a chunk
+        
+    Returns:
+        True if the chunk should be retried
+    """
+    import requests
+    
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+def score_chunk(session, url: str, headers: dict, chunk: MetricsBatch,
+                timeout: int, max_retries: int, backoff: float, logger: logging.Logger) -> tuple:
+    """
+    Score one chunk on the ML endpoint, retrying transient failures.
+    
+    Args:
+        session: requests.Session shared by all chunks
+        url: Scoring endpoint URL
+        headers: Request headers
+        chunk: Slice of the metrics batch to score
+        timeout: Per-request timeout in seconds
+        max_retries: Number of retries after the first attempt
+        backoff: Delay before the first retry in seconds (doubles each attempt)
+        logger: Azure Functions logger
+        
+    Returns:
+        Tuple of (scored chunk, True if the chunk fell back to mock predictions)
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.post(
+                url,
+                headers=headers,
+                json={'data': chunk.to_payload()},
+                timeout=timeout
+            )
+            response.raise_for_status()
+            
+            predictions = response.json()
+            return chunk.with_predictions(predictions['predictions'], predictions['anomaly_scores'],
+                                          predictions.get('model_version', 'unknown')), False
+            
+        except Exception as e:
+            if attempt < max_retries and is_retryable(e):
+                logger.warning(f"Chunk of {len(chunk)} builds failed (attempt {attempt + 1}), retrying: {str(e)}")
+                time.sleep(backoff * 2 ** attempt)
+                continue
+            
+            logger.error(f"Error scoring chunk of {len(chunk)} builds, using mock predictions: {str(e)}")
+            return mock_predictions(chunk), True
 
 
-def predict_anomalies(metrics: list, logger: logging.Logger) -> dict:
+def predict_anomalies(metrics: MetricsBatch, logger: logging.Logger) -> MetricsBatch:
     """
     Call Azure ML endpoint to predict anomalies.
     
+    Large batches are split into chunks of ML_CHUNK_SIZE builds scored
+    concurrently (at most ML_MAX_PARALLEL requests in flight). Results are
+    merged back in input order; a chunk that still fails after
+    ML_MAX_RETRIES retries falls back to mock predictions on its own.
+    
     Args:
-        metrics: List of pipeline metrics
+        metrics: Batch of pipeline metrics
         logger: Azure Functions logger
         
     Returns:
-        Dictionary with predictions
+        The batch with predictions and anomaly scores attached
     """
+    ml_endpoint_url = os.environ.get('ML_ENDPOINT_URL')
+    ml_api_key = os.environ.get('ML_API_KEY')
+    
+    if not ml_endpoint_url:
+        logger.warning("ML_ENDPOINT_URL not set, using mock predictions")
+        return mock_predictions(metrics)
+    
+    import requests
+    from requests.adapters import HTTPAdapter
+    
     try:
-        ml_endpoint_url = os.environ.get('ML_ENDPOINT_URL')
-        ml_api_key = os.environ.get('ML_API_KEY')
+        chunk_size = get_env_int('ML_CHUNK_SIZE', DEFAULT_ML_CHUNK_SIZE)
+        max_parallel = get_env_int('ML_MAX_PARALLEL', DEFAULT_ML_MAX_PARALLEL)
+        max_retries = get_env_int('ML_MAX_RETRIES', DEFAULT_ML_MAX_RETRIES, minimum=0)
+        timeout = get_env_int('ML_TIMEOUT_SECONDS', DEFAULT_ML_TIMEOUT_SECONDS)
+        backoff = get_env_float('ML_RETRY_BACKOFF_SECONDS', DEFAULT_ML_RETRY_BACKOFF_SECONDS)
         
-        if not ml_endpoint_url:
-            logger.warning("ML_ENDPOINT_URL not set, using mock predictions")
-            return mock_predictions(metrics)
+        bounds = [(start, min(start + chunk_size, len(metrics))) for start in range(0, len(metrics), chunk_size)]
+        workers = min(max_parallel, len(bounds))
         
-        logger.info(f"Calling ML endpoint: {ml_endpoint_url}")
+        logger.info(f"Calling ML endpoint: {ml_endpoint_url} ({len(metrics)} builds in {len(bounds)} chunks, {workers} parallel)")
         
         # Prepare request
         headers = {
@@ -138,60 +337,107 @@ def predict_anomalies(metrics: list, logger: logging.Logger) -> dict:
             'Authorization': f'Bearer {ml_api_key}' if ml_api_key else ''
         }
         
-        payload = {
-            'data': metrics
-        }
-        
-        # Call ML endpoint
-        response = requests.post(
-            ml_endpoint_url,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        predictions = np.empty(len(metrics), dtype=bool)
+        anomaly_scores = np.empty(len(metrics), dtype=np.float64)
+        model_versions = np.empty(len(metrics), dtype=object)
+        failed_chunks = 0
         
-        response.raise_for_status()
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+                futures = {
+                    pool.submit(score_chunk, session, ml_endpoint_url, headers, metrics.slice(start, stop),
+                                timeout, max_retries, backoff, logger): (start, stop)
+                    for start, stop in bounds
+                }
+                
+                # Merge each chunk into its slot as soon as it completes
+                for future in as_completed(futures):
+                    start, stop = futures[future]
+                    chunk, fell_back = future.result()
+                    predictions[start:stop] = chunk.predictions
+                    anomaly_scores[start:stop] = chunk.anomaly_scores
+                    model_versions[start:stop] = chunk.model_version
+                    failed_chunks += fell_back
         
-        predictions = response.json()
+        if failed_chunks:
+            logger.warning(f"{failed_chunks} of {len(bounds)} chunks used mock predictions")
         logger.info(f"Received predictions for {len(metrics)} builds")
         
-        return predictions
+        # One version for the batch unless some chunks fell back to the mock rule
+        versions = set(model_versions.tolist())
+        model_version = versions.pop() if len(versions) == 1 else model_versions.astype(str)
+        
+        return metrics.with_predictions(predictions, anomaly_scores, model_version)
         
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling ML endpoint: {str(e)}")
-        return mock_predictions(metrics)
     except Exception as e:
         logger.error(f"Unexpected error during prediction: {str(e)}")
         return mock_predictions(metrics)
 
 
-def mock_predictions(metrics: list) -> dict:
+def mock_predictions(metrics: MetricsBatch) -> MetricsBatch:
     """
     Generate mock predictions for testing.
     
     Args:
-        metrics: List of pipeline metrics
+        metrics: Batch of pipeline metrics
         
     Returns:
-        Dictionary with mock predictions
+        The batch with mock predictions and anomaly scores attached
     """
-    predictions = []
-    anomaly_scores = []
-    build_ids = []
+    # Simple rule-based mock: slow builds or high failure rates are anomalies
+    is_anomaly = (metrics.duration > 600) | (metrics.failure_rate > 0.2)
     
-    for metric in metrics:
-        # Simple rule-based mock: slow builds or high failure rates are anomalies
-        is_anomaly = metric['duration'] > 600 or metric['failure_rate'] > 0.2
-        
-        predictions.append(is_anomaly)
-        anomaly_scores.append(-0.5 if is_anomaly else 0.5)
-        build_ids.append(metric['build_id'])
+    return metrics.with_predictions(is_anomaly, np.where(is_anomaly, -0.5, 0.5), MOCK_MODEL_VERSION)
+
+
+def get_metrics_store():
+    """
+    Return the metrics history store, or None when METRICS_STORE_PATH is not set.
     
-    return {
-        'predictions': predictions,
-        'anomaly_scores': anomaly_scores,
-        'build_ids': build_ids
-    }
+    Returns:
+        MetricsStore rooted at METRICS_STORE_PATH (e.g. a mounted Azure Files share)
+    """
+    global _metrics_store
+    
+    path = os.environ.get('METRICS_STORE_PATH')
+    if not path:
+        return None
+    
+    if _metrics_store is None or str(_metrics_store.root) != path:
+        _metrics_store = MetricsStore(path)
+    return _metrics_store
+
+
+def record_history(scored: MetricsBatch, scored_at: float, logger: logging.Logger):
+    """
+    Append a scored batch to the metrics history used for retraining.
+    
+    Only the timer trigger records: its runs query back-to-back windows, so
+    each build is stored once. Sample data generated when Log Analytics is
+    not configured or the query fails is skipped. Failures are logged, never
+    raised: history is best effort and must not block alerting.
+    
+    Args:
+        scored: Batch with predictions attached
+        scored_at: Detection time in seconds since the epoch
+        logger: Azure Functions logger
+    """
+    store = get_metrics_store()
+    if store is None or not len(scored):
+        return
+    
+    if scored.is_sample:
+        logger.info("Not recording sample metrics in metrics history")
+        return
+    
+    try:
+        store.append(scored, scored_at)
+    except Exception as e:
+        logger.error(f"Failed to record {len(scored)} builds in metrics history: {str(e)}")
 
 
 def send_teams_alert(anomalies: list, logger: logging.Logger):
@@ -202,13 +448,15 @@ def send_teams_alert(anomalies: list, logger: logging.Logger):
         anomalies: List of detected anomalies
         logger: Azure Functions logger
     """
+    teams_webhook = os.environ.get('TEAMS_WEBHOOK_URL')
+    
+    if not teams_webhook:
+        logger.warning("TEAMS_WEBHOOK_URL not set, skipping Teams notification")
+        return
+    
+    import requests
+    
     try:
-        teams_webhook = os.environ.get('TEAMS_WEBHOOK_URL')
-        
-        if not teams_webhook:
-            logger.warning("TEAMS_WEBHOOK_URL not set, skipping Teams notification")
-            return
-        
         logger.info(f"Sending Teams alert for {len(anomalies)} anomalies")
         
         # Build Teams message card
@@ -265,15 +513,17 @@ def send_email_alert(anomalies: list, logger: logging.Logger):
         anomalies: List of detected anomalies
         logger: Azure Functions logger
     """
+    sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
+    sendgrid_from_email = os.environ.get('SENDGRID_FROM_EMAIL')
+    sendgrid_to_email = os.environ.get('SENDGRID_TO_EMAIL')
+    
+    if not all([sendgrid_api_key, sendgrid_from_email, sendgrid_to_email]):
+        logger.warning("SendGrid config not complete, skipping email notification")
+        return
+    
+    import requests
+    
     try:
-        sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-        sendgrid_from_email = os.environ.get('SENDGRID_FROM_EMAIL')
-        sendgrid_to_email = os.environ.get('SENDGRID_TO_EMAIL')
-        
-        if not all([sendgrid_api_key, sendgrid_from_email, sendgrid_to_email]):
-            logger.warning("SendGrid config not complete, skipping email notification")
-            return
-        
         logger.info(f"Sending email alert for {len(anomalies)} anomalies")
         
         # Build email content
@@ -307,7 +557,7 @@ This is an automated alert from the AI-Powered Anomaly Detection system.
         
         # Send via SendGrid API
         response = requests.post(
-            'https://api.sendgrid.com/v3/mail/send',
+            os.environ.get('SENDGRID_API_URL', 'https://api.sendgrid.com/v3/mail/send'),
             headers={
                 'Authorization': f'Bearer {sendgrid_api_key}',
                 'Content-Type': 'application/json'
@@ -325,11 +575,225 @@ This is an automated alert from the AI-Powered Anomaly Detection system.
         logger.error(f"Unexpected error sending email: {str(e)}")
 
 
+def encode_cursor(build_id: str, window: tuple) -> str:
+    """
+    Encode the last returned build ID and the detection window as an opaque pagination cursor.
+    
+    Args:
+        build_id: Build ID of the last anomaly on the current page
+        window: (start, end) datetimes of the metrics window the pages come from
+        
+    Returns:
+        URL-safe cursor string
+    """
+    start, end = window
+    payload = {'after': build_id, 'start': int(start.timestamp()), 'end': int(end.timestamp())}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a pagination cursor produced by encode_cursor.
+    
+    Args:
+        cursor: Cursor string from a previous response
+        
+    Returns:
+        Tuple of (build ID after which the next page starts, (start, end) window)
+        
+    Raises:
+        ValueError: If the cursor is malformed, or its window is empty or
+            longer than DEFAULT_HTTP_WINDOW (a hand-made cursor must not
+            widen the query beyond what the first page scored)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        window = (datetime.fromtimestamp(int(payload['start']), timezone.utc),
+                  datetime.fromtimestamp(int(payload['end']), timezone.utc))
+        if not timedelta(0) < window[1] - window[0] <= DEFAULT_HTTP_WINDOW:
+            raise ValueError("window out of range")
+        return str(payload['after']), window
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def paginate_anomalies(anomalies: list, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                       window: tuple = None) -> tuple:
+    """
+    Return one page of anomalies ordered by build ID.
+    
+    The next cursor carries the detection window, so every page of a result
+    is cut from the same snapshot of metrics.
+    
+    Args:
+        anomalies: List of detected anomalies
+        cursor: Cursor from a previous page, or None for the first page
+        limit: Maximum number of anomalies on the page
+        window: (start, end) datetimes of the window the anomalies come from
+        
+    Returns:
+        Tuple of (page, next_cursor); next_cursor is None on the last page
+    """
+    ordered = sorted(anomalies, key=lambda a: str(a['build_id']))
+    
+    if cursor:
+        after, window = decode_cursor(cursor)
+        ordered = [a for a in ordered if str(a['build_id']) > after]
+    
+    page = ordered[:limit]
+    next_cursor = encode_cursor(str(page[-1]['build_id']), window) if len(ordered) > limit else None
+    
+    return page, next_cursor
+
+
+def project_fields(records: list, fields: list) -> list:
+    """
+    Keep only the requested fields of each record.
+    
+    Args:
+        records: List of anomaly dictionaries
+        fields: Field names to keep, or None to keep all fields
+        
+    Returns:
+        List of projected records
+    """
+    if not fields:
+        return records
+    return [{field: record[field] for field in fields} for record in records]
+
+
+def parse_response_options(params) -> dict:
+    """
+    Parse pagination, projection and encoding options from query parameters.
+    
+    Args:
+        params: Mapping of HTTP query parameters
+        
+    Returns:
+        Dictionary with limit, cursor, window (from the cursor, None on the
+        first page), fields, format and pretty options
+        
+    Raises:
+        ValueError: If any option is invalid
+    """
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError(f"Invalid limit: {params.get('limit')}")
+    
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    
+    fields = None
+    if params.get('fields'):
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in ANOMALY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+    
+    response_format = params.get('format', 'json').lower()
+    if response_format not in ('json', 'ndjson'):
+        raise ValueError(f"Unsupported format: {response_format}")
+    
+    cursor = params.get('cursor') or None
+    window = decode_cursor(cursor)[1] if cursor else None
+    
+    return {
+        'limit': limit,
+        'cursor': cursor,
+        'window': window,
+        'fields': fields,
+        'format': response_format,
+        'pretty': params.get('pretty', '').lower() in ('1', 'true', 'yes')
+    }
+
+
+def build_http_response(metrics_analyzed: int, anomalies: list, options: dict) -> func.HttpResponse:
+    """
+    Build the paginated JSON or NDJSON response for detected anomalies.
+    
+    Args:
+        metrics_analyzed: Number of metrics scored in this run
+        anomalies: Full list of detected anomalies
+        options: Options returned by parse_response_options
+        
+    Returns:
+        HTTP response with one page of anomalies
+    """
+    page, next_cursor = paginate_anomalies(anomalies, options['cursor'], options['limit'], options['window'])
+    page = project_fields(page, options['fields'])
+    
+    if options['format'] == 'ndjson':
+        # One anomaly per line so bulk consumers can parse incrementally;
+        # run-level metadata travels in headers instead of a wrapper object
+        body = ''.join(json.dumps(a, separators=(',', ':')) + '\n' for a in page)
+        headers = {
+            'X-Metrics-Analyzed': str(metrics_analyzed),
+            'X-Anomalies-Detected': str(len(anomalies))
+        }
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        
+        return func.HttpResponse(
+            body,
+            status_code=200,
+            headers=headers,
+            mimetype='application/x-ndjson'
+        )
+    
+    result = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'metrics_analyzed': metrics_analyzed,
+        'anomalies_detected': len(anomalies),
+        'anomalies': page,
+        'next_cursor': next_cursor
+    }
+    
+    if options['pretty']:
+        body = json.dumps(result, indent=2)
+    else:
+        body = json.dumps(result, separators=(',', ':'))
+    
+    return func.HttpResponse(
+        body,
+        status_code=200,
+        mimetype='application/json'
+    )
+
+
+def remember_snapshot(window: tuple, snapshot: tuple):
+    """
+    Keep the scored result of an HTTP detection window for its later pages.
+    
+    Args:
+        window: (start, end) datetimes of the window
+        snapshot: Tuple of (metrics analyzed, anomaly records)
+    """
+    if SNAPSHOT_CACHE_SIZE <= 0:
+        return
+    _snapshots[window] = snapshot
+    while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+        _snapshots.pop(next(iter(_snapshots)), None)
+
+
 @app.route(route="detect_anomalies", methods=["GET", "POST"])
 def http_trigger(req: func.HttpRequest) -> func.HttpResponse:
     """
     HTTP trigger for manual anomaly detection.
     
+    Scores the last 5 minutes. Every page of a result comes from the same
+    window: the cursor carries its start and end, and an instance reuses
+    the scoring of a window it has already served.
+    
+    Query parameters:
+        limit: Page size (default 1000, max 10000)
+        cursor: Cursor from a previous page's next_cursor
+        fields: Comma-separated subset of anomaly fields to return
+        format: 'json' (default) or 'ndjson' for one anomaly per line
+        pretty: 'true' to indent JSON output
+    
     Args:
         req: HTTP request
         
@@ -339,51 +803,57 @@ def http_trigger(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('HTTP trigger: Anomaly detection started')
     
     try:
-        # Query metrics
-        metrics = query_pipeline_metrics(logging)
-        
-        if not metrics:
-            return func.HttpResponse(
-                json.dumps({'message': 'No metrics available'}),
-                status_code=200,
-                mimetype='application/json'
-            )
+        options = parse_response_options(req.params)
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({'error': str(e)}),
+            status_code=400,
+            mimetype='application/json'
+        )
+    
+    try:
+        # The first page fixes the window; later pages carry it in their cursor
+        if options['window'] is None:
+            end = datetime.now(timezone.utc).replace(microsecond=0)
+            options['window'] = (end - DEFAULT_HTTP_WINDOW, end)
         
-        # Predict anomalies
-        predictions = predict_anomalies(metrics, logging)
+        snapshot = _snapshots.get(options['window'])
+        detected = snapshot is None
+        if detected:
+            # Query metrics
+            start, end = options['window']
+            metrics = query_pipeline_metrics(logging, end - start, end)
+            
+            if not metrics:
+                return func.HttpResponse(
+                    json.dumps({'message': 'No metrics available'}),
+                    status_code=200,
+                    mimetype='application/json'
+                )
+            
+            # Predict anomalies. History is recorded by the timer trigger only:
+            # this window overlaps the timer's, so recording it would store
+            # the same builds twice
+            scored = predict_anomalies(metrics, logging)
+            
+            # Find anomalies
+            snapshot = (len(metrics), scored.anomalies().to_records())
+            remember_snapshot(options['window'], snapshot)
         
-        # Find anomalies
-        anomalies = []
-        for i, is_anomaly in enumerate(predictions['predictions']):
-            if is_anomaly:
-                anomalies.append({
-                    'build_id': predictions['build_ids'][i],
-                    'duration': metrics[i]['duration'],
-                    'failure_rate': metrics[i]['failure_rate'],
-                    'anomaly_score': predictions['anomaly_scores'][i]
-                })
+        metrics_analyzed, anomalies = snapshot
         
-        # Send alerts if anomalies detected
-        if anomalies:
+        # Send alerts once per detection: when the first page scores the
+        # window, not when a request is served from its snapshot or pages
+        # through the result
+        if anomalies and detected and not options['cursor']:
             logging.warning(f"Detected {len(anomalies)} anomalies")
             send_teams_alert(anomalies, logging)
             send_email_alert(anomalies, logging)
-        else:
+        elif not anomalies:
             logging.info("No anomalies detected")
         
         # Return results
-        result = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'metrics_analyzed': len(metrics),
-            'anomalies_detected': len(anomalies),
-            'anomalies': anomalies
-        }
-        
-        return func.HttpResponse(
-            json.dumps(result, indent=2),
-            status_code=200,
-            mimetype='application/json'
-        )
+        return build_http_response(metrics_analyzed, anomalies, options)
         
     except Exception as e:
         logging.error(f"Error in HTTP trigger: {str(e)}")
@@ -394,37 +864,45 @@ def http_trigger(req: func.HttpRequest) -> func.HttpResponse:
         )
 
 
-@app.timer_trigger(schedule="0 */5 * * * *", arg_name="timer", run_on_startup=False)
+@app.timer_trigger(schedule="0 * * * * *", arg_name="timer", run_on_startup=False)
 def timer_trigger(timer: func.TimerRequest) -> None:
     """
-    Timer trigger for automated anomaly detection every 5 minutes.
+    Timer trigger for automated anomaly detection.
+    
+    The timer ticks every minute and the scheduler decides whether a run is
+    due: every DETECTION_INTERVAL_SECONDS (default 5 minutes), or, with
+    ADAPTIVE_SCHEDULING enabled, at an interval derived from recent build
+    and anomaly rates. Each run queries the time since the previous run.
     
     Args:
         timer: Timer request context
     """
+    scheduler = get_scheduler()
+    now = time.time()
+    
+    if not scheduler.should_run(now):
+        return
+    
     logging.info('Timer trigger: Anomaly detection started')
     
     try:
         # Query metrics
-        metrics = query_pipeline_metrics(logging)
+        # Consecutive runs query back-to-back windows ending at `now`, so each
+        # build is scored (and recorded in the history) once
+        window = scheduler.window(now)
+        metrics = query_pipeline_metrics(logging, window, datetime.fromtimestamp(now, timezone.utc))
         
         if not metrics:
+            scheduler.record_run(now, window, 0, 0)
             logging.info("No metrics available, skipping detection")
             return
         
         # Predict anomalies
-        predictions = predict_anomalies(metrics, logging)
+        scored = predict_anomalies(metrics, logging)
+        record_history(scored, now, logging)
         
         # Find anomalies
-        anomalies = []
-        for i, is_anomaly in enumerate(predictions['predictions']):
-            if is_anomaly:
-                anomalies.append({
-                    'build_id': predictions['build_ids'][i],
-                    'duration': metrics[i]['duration'],
-                    'failure_rate': metrics[i]['failure_rate'],
-                    'anomaly_score': predictions['anomaly_scores'][i]
-                })
+        anomalies = scored.anomalies().to_records()
         
         # Send alerts if anomalies detected
         if anomalies:
@@ -434,12 +912,132 @@ def timer_trigger(timer: func.TimerRequest) -> None:
         else:
             logging.info("No anomalies detected")
         
+        scheduler.record_run(now, window, len(metrics), len(anomalies))
+        
         logging.info(f"Timer trigger completed: {len(metrics)} metrics analyzed, {len(anomalies)} anomalies found")
+        logging.info(f"Scheduler: {json.dumps(scheduler.stats(now))}")
         
     except Exception as e:
         logging.error(f"Error in timer trigger: {str(e)}")
 
 
+def get_run_aggregator() -> RunAggregator:
+    """
+    Return the stream aggregator, creating it from STREAM_* app settings on first use.
+    
+    Returns:
+        RunAggregator whose finished runs go to score_finished_runs
+    """
+    global _run_aggregator
+    
+    if _run_aggregator is None:
+        _run_aggregator = RunAggregator.from_env(sink=score_finished_runs)
+    
+    return _run_aggregator
+
+
+def score_finished_runs(metrics: MetricsBatch):
+    """
+    Score runs finished by the stream aggregator and alert on anomalies.
+    
+    Stream runs are not recorded in the metrics history: the timer trigger
+    records the same runs once they reach Log Analytics.
+    
+    Args:
+        metrics: Batch of finished runs
+    """
+    scored = predict_anomalies(metrics, logging)
+    anomalies = scored.anomalies().to_records()
+    
+    if anomalies:
+        logging.warning(f"Detected {len(anomalies)} anomalies in {len(metrics)} finished stream runs")
+        send_teams_alert(anomalies, logging)
+        send_email_alert(anomalies, logging)
+
+
+def parse_event_time(value) -> float:
+    """Convert an ISO 8601 (UTC unless offset) or epoch-seconds event time to epoch seconds."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        event_time = float(value)
+    else:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        event_time = parsed.timestamp()
+    
+    if not math.isfinite(event_time):
+        raise ValueError(f"Invalid event time: {value}")
+    return event_time
+
+
+def consume_job_events(bodies: list, logger: logging.Logger) -> dict:
+    """
+    Feed raw job/step events to the stream aggregator.
+    
+    Each body is a JSON object with the ContainerInsights fields the KQL in
+    query_pipeline_metrics() summarizes: CorrelationId, TimeGenerated,
+    DurationMs and ExitCode. A body with "Completed": true instead marks its
+    run completed at TimeGenerated (e.g. from a workflow_run webhook).
+    Malformed events are logged and skipped.
+    
+    Args:
+        bodies: Event bodies (JSON bytes or str), in arrival order
+        logger: Azure Functions logger
+        
+    Returns:
+        Aggregator stats, plus the number of invalid events in this call
+    """
+    aggregator = get_run_aggregator()
+    events = []
+    invalid = 0
+    
+    for body in bodies:
+        try:
+            event = json.loads(body)
+            run_id = str(event['CorrelationId'])
+            event_time = parse_event_time(event['TimeGenerated'])
+            
+            if event.get('Completed'):
+                # Events before the marker are added first, as they arrived
+                aggregator.add_many(events)
+                events = []
+                aggregator.mark_completed(run_id, event_time)
+                continue
+            
+            duration_ms = float(event['DurationMs'])
+            if not math.isfinite(duration_ms):
+                raise ValueError(f"Invalid DurationMs: {event['DurationMs']}")
+            events.append((run_id, event_time, duration_ms, int(event['ExitCode'])))
+        except (ValueError, KeyError, TypeError) as e:
+            invalid += 1
+            logger.warning(f"Skipping invalid job event: {str(e)}")
+    
+    aggregator.add_many(events)
+    return {**aggregator.stats(), 'invalid_events': invalid}
+
+
+# The Event Hub binding cannot resolve %STREAM_EVENT_HUB_NAME% without the
+# setting, so the trigger is only registered when a stream is configured
+if os.environ.get('STREAM_EVENT_HUB_NAME'):
+    @app.event_hub_message_trigger(arg_name="events", event_hub_name="%STREAM_EVENT_HUB_NAME%",
+                                   connection="STREAM_EVENT_HUB_CONNECTION", cardinality=func.Cardinality.MANY)
+    def stream_trigger(events: List[func.EventHubEvent]) -> None:
+        """
+        Event Hub trigger for raw job/step events.
+        
+        Runs are scored and alerted on as soon as the aggregator finishes
+        them, without waiting for the events to land in Log Analytics.
+        
+        Args:
+            events: Batch of Event Hub events, one job/step event each
+        """
+        try:
+            stats = consume_job_events([event.get_body() for event in events], logging)
+            logging.info(f"Stream: {json.dumps(stats)}")
+        except Exception as e:
+            logging.error(f"Error in stream trigger: {str(e)}")
+
+
 if __name__ == '__main__':
     # For local testing
     import sys
@@ -453,17 +1051,9 @@ if __name__ == '__main__':
     
     print("Testing anomaly detection...")
     metrics = query_pipeline_metrics(logger)
-    predictions = predict_anomalies(metrics, logger)
+    scored = predict_anomalies(metrics, logger)
     
-    anomalies = []
-    for i, is_anomaly in enumerate(predictions['predictions']):
-        if is_anomaly:
-            anomalies.append({
-                'build_id': predictions['build_ids'][i],
-                'duration': metrics[i]['duration'],
-                'failure_rate': metrics[i]['failure_rate'],
-                'anomaly_score': predictions['anomaly_scores'][i]
-            })
+    anomalies = scored.anomalies().to_records()
     
     print(f"\nResults: {len(anomalies)} anomalies detected out of {len(metrics)} metrics")
     if anomalies:
@@ -0,0 +1,355 @@
+"""
+Columnar container for pipeline metrics flowing through the Azure Function.
+Features and scores live in NumPy arrays and build IDs in a packed string table,
+so a window of 100k+ builds is a handful of arrays instead of 100k dictionaries.
+"""
+
+import numpy as np
+
+FEATURE_COLUMNS = ('duration', 'failure_rate')
+
+# Values substituted for missing/empty Log Analytics cells
+DEFAULT_DURATION = 300.0
+DEFAULT_FAILURE_RATE = 0.0
+
+
+class StringTable:
+    """Immutable list of strings stored as one UTF-8 buffer plus end offsets."""
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: bytes, offsets: np.ndarray):
+        """
+        Initialize the table.
+
+        Args:
+            data: Concatenated UTF-8 encoded strings
+            offsets: int64 array of length n + 1 with the byte offset of each string
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, strings) -> 'StringTable':
+        """
+        Build a table from an iterable of strings.
+
+        Args:
+            strings: Iterable of strings (non-strings are converted with str())
+
+        Returns:
+            StringTable with the same strings in the same order
+        """
+        strings = [s if isinstance(s, str) else str(s) for s in strings]
+        text = ''.join(strings)
+
+        if text.isascii():
+            # Character lengths are byte lengths; skip per-string encoding
+            pieces, data = strings, text.encode('ascii')
+        else:
+            pieces = [s.encode('utf-8') for s in strings]
+            data = b''.join(pieces)
+
+        offsets = np.zeros(len(pieces) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces)), out=offsets[1:])
+        return cls(data, offsets)
+
+    @classmethod
+    def concat(cls, tables) -> 'StringTable':
+        """
+        Join tables end to end without decoding them.
+
+        Args:
+            tables: Sequence of StringTables
+
+        Returns:
+            StringTable with the strings of every table, in order
+        """
+        tables = list(tables)
+        offsets = np.zeros(sum(len(t) for t in tables) + 1, dtype=np.int64)
+        position, base = 1, 0
+        for table in tables:
+            offsets[position:position + len(table)] = table.offsets[1:] + base
+            position += len(table)
+            base += len(table.data)
+        return cls(b''.join(t.data for t in tables), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def take(self, indices: np.ndarray) -> 'StringTable':
+        """
+        Gather a subset of strings without decoding them.
+
+        Args:
+            indices: Integer array of positions to keep, in output order
+
+        Returns:
+            New StringTable with the selected strings
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        # Byte positions of every selected character, in output order
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1], dtype=np.int64)
+        buffer = np.frombuffer(self.data, dtype=np.uint8)[positions].tobytes()
+        return StringTable(buffer, offsets)
+
+    def slice(self, start: int, stop: int) -> 'StringTable':
+        """
+        Return the contiguous strings [start, stop) without a gather.
+
+        Args:
+            start: First position to keep
+            stop: Position after the last one to keep
+
+        Returns:
+            New StringTable with the selected strings
+        """
+        offsets = self.offsets[start:stop + 1]
+        return StringTable(self.data[offsets[0]:offsets[-1]], offsets - offsets[0])
+
+    def tolist(self) -> list:
+        """Decode all strings into a Python list."""
+        offsets = self.offsets.tolist()
+        if self.data.isascii():
+            # Byte offsets equal character offsets, so decode once and slice
+            text = self.data.decode('ascii')
+            return [text[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+        return [self.data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the buffer and offsets."""
+        return len(self.data) + self.offsets.nbytes
+
+
+class MetricsBatch:
+    """A window of pipeline metrics, optionally with model predictions."""
+
+    __slots__ = ('build_ids', 'features', 'predictions', 'anomaly_scores', 'model_version', 'is_sample')
+
+    def __init__(self, build_ids: StringTable, features: np.ndarray,
+                 predictions: np.ndarray = None, anomaly_scores: np.ndarray = None,
+                 model_version=None, is_sample: bool = False):
+        """
+        Initialize the batch.
+
+        Args:
+            build_ids: Build IDs, one per row
+            features: float64 array of shape (n, len(FEATURE_COLUMNS))
+            predictions: Optional bool array, True where the row is anomalous
+            anomaly_scores: Optional float64 array of model scores
+            model_version: Optional version of the model behind the predictions:
+                one string, or an array with one per row when rows were
+                scored by different models
+            is_sample: True for generated sample data rather than real builds
+        """
+        if len(build_ids) != len(features):
+            raise ValueError(f"Got {len(build_ids)} build IDs for {len(features)} feature rows")
+
+        self.build_ids = build_ids
+        self.features = features
+        self.predictions = predictions
+        self.anomaly_scores = anomaly_scores
+        self.model_version = model_version
+        self.is_sample = is_sample
+
+    @classmethod
+    def from_columns(cls, build_ids, duration, failure_rate) -> 'MetricsBatch':
+        """
+        Build a batch from per-column sequences.
+
+        Args:
+            build_ids: Sequence of build IDs
+            duration: Sequence of durations in seconds
+            failure_rate: Sequence of failure rates
+
+        Returns:
+            MetricsBatch without predictions
+        """
+        features = np.empty((len(build_ids), len(FEATURE_COLUMNS)), dtype=np.float64)
+        features[:, 0] = duration
+        features[:, 1] = failure_rate
+        return cls(StringTable.from_list(build_ids), features)
+
+    @classmethod
+    def from_records(cls, records: list) -> 'MetricsBatch':
+        """
+        Build a batch from a list of {'build_id', 'duration', 'failure_rate'} dicts.
+
+        Args:
+            records: List of per-build metric dictionaries
+
+        Returns:
+            MetricsBatch without predictions
+        """
+        return cls.from_columns(
+            [r['build_id'] for r in records],
+            [r['duration'] for r in records],
+            [r['failure_rate'] for r in records]
+        )
+
+    @classmethod
+    def from_rows(cls, rows) -> 'MetricsBatch':
+        """
+        Build a batch from Log Analytics rows of (build_id, duration, failure_rate).
+
+        Empty cells fall back to DEFAULT_DURATION / DEFAULT_FAILURE_RATE.
+
+        Args:
+            rows: Iterable of indexable query result rows
+
+        Returns:
+            MetricsBatch without predictions
+        """
+        rows = list(rows)
+        return cls.from_columns(
+            [row[0] for row in rows],
+            np.fromiter((float(row[1]) if row[1] else DEFAULT_DURATION for row in rows),
+                        dtype=np.float64, count=len(rows)),
+            np.fromiter((float(row[2]) if row[2] else DEFAULT_FAILURE_RATE for row in rows),
+                        dtype=np.float64, count=len(rows))
+        )
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.features[:, 0]
+
+    @property
+    def failure_rate(self) -> np.ndarray:
+        return self.features[:, 1]
+
+    @property
+    def is_scored(self) -> bool:
+        return self.predictions is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the batch's arrays and string table."""
+        total = self.build_ids.nbytes + self.features.nbytes
+        if self.is_scored:
+            total += self.predictions.nbytes + self.anomaly_scores.nbytes
+        return total
+
+    def with_predictions(self, predictions, anomaly_scores, model_version=None) -> 'MetricsBatch':
+        """
+        Attach model output aligned with this batch's rows.
+
+        Args:
+            predictions: Sequence of booleans, True where anomalous
+            anomaly_scores: Sequence of anomaly scores
+            model_version: Version of the model that produced them (string or one per row)
+
+        Returns:
+            New MetricsBatch sharing this batch's features and build IDs
+
+        Raises:
+            ValueError: If the model output does not have one entry per row
+        """
+        predictions = np.asarray(predictions, dtype=bool)
+        anomaly_scores = np.asarray(anomaly_scores, dtype=np.float64)
+
+        if len(predictions) != len(self) or len(anomaly_scores) != len(self):
+            raise ValueError(
+                f"Expected {len(self)} predictions, got {len(predictions)} predictions "
+                f"and {len(anomaly_scores)} scores"
+            )
+
+        return MetricsBatch(self.build_ids, self.features, predictions, anomaly_scores, model_version, self.is_sample)
+
+    def select(self, mask) -> 'MetricsBatch':
+        """
+        Select rows by boolean mask or integer indices.
+
+        Args:
+            mask: Boolean array of length len(self), or integer index array
+
+        Returns:
+            New MetricsBatch with the selected rows
+        """
+        mask = np.asarray(mask)
+        indices = np.flatnonzero(mask) if mask.dtype == bool else mask.astype(np.int64)
+
+        return MetricsBatch(
+            self.build_ids.take(indices),
+            self.features[indices],
+            self.predictions[indices] if self.is_scored else None,
+            self.anomaly_scores[indices] if self.is_scored else None,
+            self.model_version[indices] if isinstance(self.model_version, np.ndarray) else self.model_version,
+            self.is_sample
+        )
+
+    def slice(self, start: int, stop: int) -> 'MetricsBatch':
+        """
+        Return the contiguous rows [start, stop); arrays are views, not copies.
+
+        Args:
+            start: First row to keep
+            stop: Row after the last one to keep
+
+        Returns:
+            New MetricsBatch with the selected rows
+        """
+        stop = min(stop, len(self))
+        return MetricsBatch(
+            self.build_ids.slice(start, stop),
+            self.features[start:stop],
+            self.predictions[start:stop] if self.is_scored else None,
+            self.anomaly_scores[start:stop] if self.is_scored else None,
+            self.model_version[start:stop] if isinstance(self.model_version, np.ndarray) else self.model_version,
+            self.is_sample
+        )
+
+    def anomalies(self) -> 'MetricsBatch':
+        """
+        Return only the rows predicted as anomalous.
+
+        Raises:
+            ValueError: If the batch has not been scored
+        """
+        if not self.is_scored:
+            raise ValueError("Batch has no predictions")
+        return self.select(self.predictions)
+
+    def to_payload(self) -> dict:
+        """
+        Build the columnar request body for the scoring endpoint.
+
+        Returns:
+            Dictionary of column name to list of values
+        """
+        return {
+            'build_id': self.build_ids.tolist(),
+            'duration': self.duration.tolist(),
+            'failure_rate': self.failure_rate.tolist()
+        }
+
+    def to_records(self) -> list:
+        """
+        Convert rows to dictionaries for output (alerts, HTTP responses).
+
+        Returns:
+            List of dicts with build_id, duration, failure_rate and, when
+            scored, anomaly_score
+        """
+        columns = {
+            'build_id': self.build_ids.tolist(),
+            'duration': self.duration.tolist(),
+            'failure_rate': self.failure_rate.tolist()
+        }
+        if self.is_scored:
+            columns['anomaly_score'] = self.anomaly_scores.tolist()
+
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
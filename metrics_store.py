@@ -0,0 +1,448 @@
+"""
+Append-only, time-partitioned history of scored pipeline metrics.
+
+The detection pipeline appends every scored batch and training reads time
+ranges back. Segments live in one directory per UTC hour:
+
+    <root>/date=2026-10-19/hour=13/part-<time_ns>-<id>.npz
+
+Each append writes one immutable segment with the row timestamps, build IDs
+(packed string table), FEATURE_COLUMNS, anomaly_score, prediction and the
+model version (dictionary encoded). A range read lists only the date and hour
+directories that overlap the range and filters rows by timestamp.
+
+compact() merges the segments of each closed hour into one and rolls a closed
+day with few rows up into a single day-level segment. A compacted segment
+lists the segments it replaces, so readers ignore those even if compaction is
+interrupted before deleting them. Run one compaction at a time.
+
+Usage:
+    python metrics_store.py stats --path metrics_history
+    python metrics_store.py compact --path metrics_history --min-day-rows 50000
+"""
+
+import argparse
+import json
+import logging
+import numbers
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from metrics_batch import FEATURE_COLUMNS, StringTable
+
+logger = logging.getLogger(__name__)
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+DEFAULT_MIN_DAY_ROWS = 50000
+UNKNOWN_MODEL_VERSION = 'unknown'
+COLUMNS = ('timestamp', 'build_id', *FEATURE_COLUMNS, 'anomaly_score', 'prediction', 'model_version')
+
+# A concurrent compact() may delete a listed segment after replacing it; list again
+READ_ATTEMPTS = 3
+
+
+def to_epoch(value):
+    """
+    Convert a time bound to seconds since the epoch.
+
+    Args:
+        value: None, epoch seconds, an ISO 8601 string or a datetime
+            (naive values are UTC)
+
+    Returns:
+        Epoch seconds, or None for None
+    """
+    if value is None or isinstance(value, numbers.Real):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def overlaps(period_start: float, period_seconds: float, start, end) -> bool:
+    """True if [period_start, period_start + period_seconds) intersects [start, end)."""
+    return ((start is None or period_start + period_seconds > start)
+            and (end is None or period_start < end))
+
+
+def partition_dir(root: Path, hour: int) -> Path:
+    """Directory of the hour partition with the given hours-since-epoch index."""
+    start = datetime.fromtimestamp(hour * HOUR_SECONDS, tz=timezone.utc)
+    return root / f'date={start:%Y-%m-%d}' / f'hour={start:%H}'
+
+
+def day_start(day_dir: Path) -> float:
+    return datetime.strptime(day_dir.name[5:], '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+
+
+def hour_start(hour_dir: Path) -> float:
+    return day_start(hour_dir.parent) + int(hour_dir.name[5:]) * HOUR_SECONDS
+
+
+def list_segments(directory: Path) -> list:
+    """Segment files directly in a directory; compacted segments sort first."""
+    return sorted(list(directory.glob('compacted-*.npz')) + list(directory.glob('part-*.npz')))
+
+
+def encode_segment(timestamps, build_ids: StringTable, features, anomaly_scores, predictions, model_version) -> dict:
+    """
+    Build the arrays stored in a segment file.
+
+    Args:
+        timestamps: float64 epoch seconds, one per row
+        build_ids: Build IDs
+        features: float64 array of shape (n, len(FEATURE_COLUMNS))
+        anomaly_scores: Model scores
+        predictions: Boolean anomaly flags
+        model_version: One version string, or one per row
+
+    Returns:
+        Dictionary of array name to array for np.savez
+    """
+    n_rows = len(timestamps)
+    if isinstance(model_version, str):
+        names, codes = np.array([model_version]), np.zeros(n_rows, dtype=np.uint16)
+    else:
+        names, codes = np.unique(np.asarray(model_version, dtype=str), return_inverse=True)
+
+    columns = {
+        'timestamp': np.asarray(timestamps, dtype=np.float64),
+        'build_id_data': np.frombuffer(build_ids.data, dtype=np.uint8),
+        'build_id_offsets': build_ids.offsets,
+        'anomaly_score': np.asarray(anomaly_scores, dtype=np.float64),
+        'prediction': np.asarray(predictions, dtype=bool),
+        'model_version_names': names,
+        'model_version_codes': codes.astype(np.uint16)
+    }
+    for i, name in enumerate(FEATURE_COLUMNS):
+        columns[name] = np.ascontiguousarray(features[:, i])
+    return columns
+
+
+def load_segment(path: Path, columns) -> dict:
+    """
+    Read columns of one segment.
+
+    Args:
+        path: Segment file
+        columns: Names from COLUMNS to read; other arrays are not loaded
+
+    Returns:
+        Dictionary of column name to array (build_id as a StringTable)
+    """
+    segment = {}
+    with np.load(path) as data:
+        for name in columns:
+            if name == 'build_id':
+                segment[name] = StringTable(data['build_id_data'].tobytes(), data['build_id_offsets'])
+            elif name == 'model_version':
+                segment[name] = data['model_version_names'][data['model_version_codes']]
+            else:
+                segment[name] = data[name]
+    return segment
+
+
+def concat_columns(segments: list, columns) -> dict:
+    """Join per-segment columns end to end (build_id stays a StringTable)."""
+    result = {}
+    for name in columns:
+        parts = [segment[name] for segment in segments]
+        if name == 'build_id':
+            result[name] = StringTable.concat(parts)
+        elif parts:
+            result[name] = np.concatenate(parts)
+        else:
+            result[name] = np.zeros(0, dtype=bool if name == 'prediction' else str if name == 'model_version' else np.float64)
+    return result
+
+
+class MetricsStore:
+    """Hour-partitioned segment files of scored metrics under one root directory."""
+
+    def __init__(self, root):
+        """
+        Initialize the store; the directory is created on the first append.
+
+        Args:
+            root: Root directory (local disk or a mounted file share)
+        """
+        self.root = Path(root)
+
+    def append(self, batch, timestamp, model_version=None) -> list:
+        """
+        Record a scored batch.
+
+        Rows are grouped by UTC hour and each group is written as a new
+        segment under a temporary name, then renamed, so readers see a
+        segment complete or not at all.
+
+        Args:
+            batch: Scored MetricsBatch
+            timestamp: Epoch seconds for every row (scalar) or one per row
+            model_version: Version string or one per row; defaults to the
+                batch's model_version
+
+        Returns:
+            Paths of the segments written
+
+        Raises:
+            ValueError: If the batch has no predictions
+        """
+        if not batch.is_scored:
+            raise ValueError("Only scored batches can be recorded")
+        if not len(batch):
+            return []
+
+        timestamps = np.broadcast_to(np.asarray(timestamp, dtype=np.float64), (len(batch),))
+        version = model_version if model_version is not None else batch.model_version
+        if version is None:
+            version = UNKNOWN_MODEL_VERSION
+        elif not isinstance(version, str):
+            version = np.asarray(version, dtype=str)
+
+        hours = np.floor(timestamps / HOUR_SECONDS).astype(np.int64)
+        if hours[0] == hours[-1] and (hours == hours[0]).all():
+            groups = [(int(hours[0]), batch, timestamps, version)]
+        else:
+            groups = []
+            for hour in np.unique(hours):
+                rows = np.flatnonzero(hours == hour)
+                groups.append((int(hour), batch.select(rows), timestamps[rows],
+                               version if isinstance(version, str) else version[rows]))
+
+        return [
+            self._write_segment(
+                partition_dir(self.root, hour), 'part',
+                encode_segment(ts, part.build_ids, part.features, part.anomaly_scores, part.predictions, versions)
+            )
+            for hour, part, ts, versions in groups
+        ]
+
+    def _write_segment(self, directory: Path, prefix: str, columns: dict) -> Path:
+        """Write a segment atomically and return its path."""
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}'
+        path = directory / f'{prefix}-{name}.npz'
+        tmp_path = directory / f'tmp-{name}.npz'
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, path)
+        return path
+
+    def _day_dirs(self, start=None, end=None) -> list:
+        if not self.root.is_dir():
+            return []
+        return [d for d in sorted(self.root.glob('date=*')) if overlaps(day_start(d), DAY_SECONDS, start, end)]
+
+    def _live_segments(self, day_dir: Path, hour_dirs: list) -> tuple:
+        """
+        Segments of a day that are not replaced by a compacted segment.
+
+        Args:
+            day_dir: Date directory
+            hour_dirs: Hour directories of the day to include
+
+        Returns:
+            Tuple of (live segment paths, replaced segments still on disk)
+        """
+        candidates = list_segments(day_dir) + [path for hour_dir in hour_dirs for path in list_segments(hour_dir)]
+
+        replaced = set()
+        for path in candidates:
+            if path.name.startswith('compacted-'):
+                with np.load(path) as data:
+                    replaced.update(data['replaces'].tolist())
+
+        live, leftovers = [], []
+        for path in candidates:
+            (leftovers if path.relative_to(day_dir).as_posix() in replaced else live).append(path)
+        return live, leftovers
+
+    def segments(self, start=None, end=None) -> list:
+        """
+        Live segments that may hold rows in [start, end).
+
+        Only the date and hour directories overlapping the range are listed.
+        Day-level segments of a rolled-up day cover all of its hours.
+
+        Args:
+            start: Inclusive lower bound (see to_epoch), or None
+            end: Exclusive upper bound, or None
+
+        Returns:
+            Segment paths in read order
+        """
+        start, end = to_epoch(start), to_epoch(end)
+        result = []
+        for day_dir in self._day_dirs(start, end):
+            hour_dirs = [h for h in sorted(day_dir.glob('hour=*')) if overlaps(hour_start(h), HOUR_SECONDS, start, end)]
+            result.extend(self._live_segments(day_dir, hour_dirs)[0])
+        return result
+
+    def read(self, start=None, end=None, columns=None) -> dict:
+        """
+        Read the rows recorded in [start, end).
+
+        Rows come back in partition order (by hour, then append order within
+        an hour), which is time order except for late appends to a rolled-up day.
+
+        Args:
+            start: Inclusive lower bound (see to_epoch), or None for the beginning
+            end: Exclusive upper bound, or None for everything since start
+            columns: Subset of COLUMNS to read (default all); arrays that are
+                not requested are not loaded
+
+        Returns:
+            Dictionary of column name to array; build_id is a list of strings
+        """
+        start, end = to_epoch(start), to_epoch(end)
+        columns = list(columns or COLUMNS)
+        load = columns if 'timestamp' in columns or (start is None and end is None) else ['timestamp'] + columns
+
+        for attempt in range(READ_ATTEMPTS):
+            try:
+                segments = []
+                for path in self.segments(start, end):
+                    segment = load_segment(path, load)
+                    timestamps = segment.get('timestamp')
+                    if timestamps is not None and (start is not None or end is not None):
+                        mask = np.ones(len(timestamps), dtype=bool)
+                        if start is not None:
+                            mask &= timestamps >= start
+                        if end is not None:
+                            mask &= timestamps < end
+                        if not mask.all():
+                            rows = np.flatnonzero(mask)
+                            segment = {name: values.take(rows) if name == 'build_id' else values[rows]
+                                       for name, values in segment.items()}
+                    segments.append(segment)
+                break
+            except FileNotFoundError:
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+
+        result = concat_columns(segments, columns)
+        if 'build_id' in result:
+            result['build_id'] = result['build_id'].tolist()
+        return result
+
+    def _merge(self, day_dir: Path, target_dir: Path, segments: list) -> Path:
+        """Write the rows of several segments, in time order, as one compacted segment and delete them."""
+        merged = concat_columns([load_segment(path, COLUMNS) for path in segments], COLUMNS)
+        order = np.argsort(merged['timestamp'], kind='stable')
+        features = np.column_stack([merged[name][order] for name in FEATURE_COLUMNS])
+
+        columns = encode_segment(merged['timestamp'][order], merged['build_id'].take(order), features,
+                                 merged['anomaly_score'][order], merged['prediction'][order],
+                                 merged['model_version'][order])
+        columns['replaces'] = np.array([path.relative_to(day_dir).as_posix() for path in segments])
+        path = self._write_segment(target_dir, 'compacted', columns)
+
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+        return path
+
+    def compact(self, before=None, min_day_rows: int = DEFAULT_MIN_DAY_ROWS) -> dict:
+        """
+        Merge small segments of closed partitions.
+
+        A closed day with fewer than min_day_rows rows becomes one day-level
+        segment; otherwise every closed hour with more than one segment becomes
+        one segment. Leftovers of an interrupted compaction are deleted.
+
+        Args:
+            before: Partitions ending at or before this time are closed
+                (default: the start of the current hour)
+            min_day_rows: Days with fewer rows are rolled up into one segment
+
+        Returns:
+            Dictionary with segments merged, segments written and leftovers deleted
+        """
+        before = to_epoch(before) if before is not None else time.time() // HOUR_SECONDS * HOUR_SECONDS
+        stats = {'segments_merged': 0, 'segments_written': 0, 'leftovers_deleted': 0}
+
+        for day_dir in self._day_dirs(end=before):
+            hour_dirs = sorted(day_dir.glob('hour=*'))
+            live, leftovers = self._live_segments(day_dir, hour_dirs)
+            for path in leftovers:
+                path.unlink(missing_ok=True)
+            stats['leftovers_deleted'] += len(leftovers)
+
+            day_closed = day_start(day_dir) + DAY_SECONDS <= before
+            if day_closed and len(live) > 1 and sum(len(load_segment(p, ['timestamp'])['timestamp'])
+                                                    for p in live) < min_day_rows:
+                groups = [(day_dir, live)]
+            else:
+                groups = [(hour_dir, [p for p in live if p.parent == hour_dir]) for hour_dir in hour_dirs
+                          if hour_start(hour_dir) + HOUR_SECONDS <= before]
+
+            for target_dir, segments in groups:
+                if len(segments) > 1:
+                    self._merge(day_dir, target_dir, segments)
+                    stats['segments_merged'] += len(segments)
+                    stats['segments_written'] += 1
+
+            for hour_dir in hour_dirs:
+                if hour_start(hour_dir) + HOUR_SECONDS <= before and not any(hour_dir.iterdir()):
+                    hour_dir.rmdir()
+
+        return stats
+
+    def stats(self) -> dict:
+        """
+        Size of the store.
+
+        Returns:
+            Dictionary with days, hour partitions, live segments, rows and bytes
+        """
+        days = hours = segments = rows = size = 0
+        for day_dir in self._day_dirs():
+            hour_dirs = sorted(day_dir.glob('hour=*'))
+            live = self._live_segments(day_dir, hour_dirs)[0]
+            days += 1
+            hours += len(hour_dirs)
+            segments += len(live)
+            for path in live:
+                rows += len(load_segment(path, ['timestamp'])['timestamp'])
+                size += path.stat().st_size
+        return {'days': days, 'hour_partitions': hours, 'segments': segments, 'rows': rows, 'bytes': size}
+
+
+def main():
+    """Main execution function."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Inspect or compact the metrics history store')
+    parser.add_argument('command', choices=['stats', 'compact'])
+    parser.add_argument('--path', default=os.environ.get('METRICS_STORE_PATH', 'metrics_history'),
+                        help='Store root (default: METRICS_STORE_PATH or metrics_history)')
+    parser.add_argument('--before', default=None,
+                        help='Compact partitions ending before this ISO time (default: current hour)')
+    parser.add_argument('--min-day-rows', type=int, default=DEFAULT_MIN_DAY_ROWS,
+                        help='Roll closed days with fewer rows up into one segment')
+    args = parser.parse_args()
+
+    store = MetricsStore(args.path)
+    if args.command == 'compact':
+        start = time.perf_counter()
+        result = store.compact(args.before, args.min_day_rows)
+        logger.info(f"Compacted {result['segments_merged']} segments into {result['segments_written']} "
+                    f"in {time.perf_counter() - start:.2f}s ({result['leftovers_deleted']} leftovers deleted)")
+
+    print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
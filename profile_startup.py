@@ -0,0 +1,192 @@
+"""
+Startup profiler for the Azure Function app and the scoring script.
+Measures per-module import time and time-to-first-detection in a fresh interpreter,
+which is what a cold function or endpoint instance pays before its first result.
+
+Usage:
+    python profile_startup.py [function_app|scoring|all] [--top N] [--runs N]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Executed in a fresh interpreter; prints a JSON line with phase timings
+FUNCTION_APP_PROBE = '''
+import json, logging, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {repo_dir!r})
+import function_app
+t1 = time.perf_counter()
+logger = logging.getLogger('profile_startup')
+metrics = function_app.query_pipeline_metrics(logger)
+predictions = function_app.predict_anomalies(metrics, logger)
+t2 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'first_detection_s': t2 - t0, 'rows': len(metrics)}}))
+'''
+
+SCORING_PROBE = '''
+import json, logging, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {scoring_dir!r})
+import score
+t1 = time.perf_counter()
+logging.disable(logging.INFO)
+score.init()
+t2 = time.perf_counter()
+payload = json.dumps({{'data': [{{'build_id': 'build_0', 'duration': 300.0, 'failure_rate': 0.02}}]}})
+result = json.loads(score.run(payload))
+assert 'error' not in result, result
+t3 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'init_s': t2 - t1, 'first_detection_s': t3 - t0, 'rows': 1}}))
+'''
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Aggregate `python -X importtime` output by root package.
+
+    Self times are summed rather than cumulative ones, so every microsecond
+    is attributed to exactly one package (e.g. azure, numpy, sklearn).
+
+    Args:
+        stderr: Captured stderr of the probe process
+
+    Returns:
+        Dictionary of root package name to import time in seconds
+    """
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0.0) + int(self_us) / 1e6
+    return totals
+
+
+def ensure_model(model_root: Path):
+    """
+    Train a small throwaway model when no artifacts are available to profile.
+
+    Args:
+        model_root: Directory that will contain model/
+    """
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(42)
+    X = np.column_stack([rng.normal(300, 50, 1000), rng.beta(2, 50, 1000)])
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=100, contamination=0.05, random_state=42).fit(scaler.transform(X))
+
+    (model_root / 'model').mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, model_root / 'model' / 'isolation_forest_model.pkl')
+    joblib.dump(scaler, model_root / 'model' / 'scaler.pkl')
+
+
+def run_probe(source: str, cwd: Path) -> dict:
+    """
+    Run a probe in a fresh interpreter with import timing enabled.
+
+    Args:
+        source: Probe source code
+        cwd: Working directory for the probe
+
+    Returns:
+        Dictionary with phase timings, wall time and per-package import times
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', source],
+        cwd=cwd,
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Probe failed:\n{proc.stderr[-2000:]}")
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_wall_s'] = wall
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def profile_target(target: str, runs: int) -> dict:
+    """
+    Profile one target, keeping the fastest of several cold starts.
+
+    Args:
+        target: 'function_app' or 'scoring'
+        runs: Number of fresh interpreters to start
+
+    Returns:
+        Result of the fastest run
+    """
+    if target == 'function_app':
+        source = FUNCTION_APP_PROBE.format(repo_dir=str(REPO_DIR))
+        cwd = REPO_DIR
+        tmp = None
+    else:
+        source = SCORING_PROBE.format(scoring_dir=str(REPO_DIR / 'scoring'))
+        cwd = REPO_DIR
+        tmp = None
+        if not (REPO_DIR / 'model' / 'isolation_forest_model.pkl').exists():
+            tmp = tempfile.TemporaryDirectory()
+            cwd = Path(tmp.name)
+            ensure_model(cwd)
+
+    try:
+        results = [run_probe(source, cwd) for _ in range(runs)]
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    return min(results, key=lambda r: r['first_detection_s'])
+
+
+def print_report(target: str, result: dict, top: int):
+    """Print a human-readable startup report for one target."""
+    print(f"\n=== {target} ===")
+    print(f"  process wall time:        {result['process_wall_s'] * 1000:8.1f} ms")
+    print(f"  import of entry module:   {result['import_s'] * 1000:8.1f} ms")
+    if 'init_s' in result:
+        print(f"  init() (model load):      {result['init_s'] * 1000:8.1f} ms")
+    print(f"  time to first detection:  {result['first_detection_s'] * 1000:8.1f} ms")
+    print("  slowest imports (self time by package):")
+    ranked = sorted(result['imports'].items(), key=lambda item: item[1], reverse=True)
+    for name, seconds in ranked[:top]:
+        print(f"    {seconds * 1000:8.1f} ms  {name}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Profile cold start of the function app and scoring script')
+    parser.add_argument('target', nargs='?', default='all', choices=['function_app', 'scoring', 'all'])
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to show')
+    parser.add_argument('--runs', type=int, default=3, help='Cold starts per target (fastest is reported)')
+    parser.add_argument('--json', action='store_true', help='Print raw JSON instead of a report')
+    args = parser.parse_args()
+
+    targets = ['function_app', 'scoring'] if args.target == 'all' else [args.target]
+    report = {target: profile_target(target, args.runs) for target in targets}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for target in targets:
+            print_report(target, report[target], args.top)
+
+
+if __name__ == '__main__':
+    main()
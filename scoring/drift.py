@@ -0,0 +1,228 @@
+"""
+Constant-memory drift detection for the scoring service.
+
+Training stores a histogram sketch per column (duration, failure_rate and
+anomaly score). Bin edges are the training quantiles, so every bin holds
+roughly the same share of the training data. Scoring adds live rows to
+sketches with the same edges, and the Population Stability Index (PSI)
+between the training and live bin shares tells whether inputs have drifted.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SKETCH_FILE = 'drift_sketches.json'
+DRIFT_COLUMNS = ('duration', 'failure_rate', 'anomaly_score')
+
+DEFAULT_BINS = 20
+DEFAULT_HALF_LIFE_ROWS = 50000
+DEFAULT_MIN_ROWS = 500
+
+# Common PSI rules of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+
+def _env_rows(name: str, default: int) -> int:
+    """Read a non-negative row count setting, falling back to the default with a warning."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = -1
+    if value < 0:
+        logger.warning(f"Invalid {name} setting {raw!r}; using {default}")
+        return default
+    return value
+
+
+class HistogramSketch:
+    """Fixed-bin histogram: bins (-inf, e0], (e0, e1], ..., (e_k, inf)."""
+
+    def __init__(self, edges, counts=None):
+        """
+        Initialize the sketch.
+
+        Args:
+            edges: Increasing interior bin edges
+            counts: Count per bin (len(edges) + 1), zeros if omitted
+        """
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = (np.zeros(len(self.edges) + 1) if counts is None
+                       else np.asarray(counts, dtype=np.float64))
+
+    @classmethod
+    def from_values(cls, values, n_bins: int = DEFAULT_BINS) -> 'HistogramSketch':
+        """Build a sketch whose edges are the quantiles of `values`."""
+        values = np.asarray(values, dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    @property
+    def total(self) -> float:
+        return float(self.counts.sum())
+
+    def update(self, values, decay: float = 1.0):
+        """
+        Add values to the sketch.
+
+        Args:
+            values: New observations
+            decay: Factor applied to existing counts first (1.0 keeps all history)
+        """
+        bins = np.searchsorted(self.edges, np.asarray(values, dtype=np.float64), side='left')
+        if decay != 1.0:
+            self.counts *= decay
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def proportions(self) -> np.ndarray:
+        """Share of observations per bin, floored at a small epsilon."""
+        total = self.counts.sum()
+        if total == 0:
+            return np.full(len(self.counts), 1 / len(self.counts))
+        return np.maximum(self.counts / total, _EPSILON)
+
+    def psi(self, reference: 'HistogramSketch') -> float:
+        """Population Stability Index of this sketch against a reference with the same edges."""
+        actual, expected = self.proportions(), reference.proportions()
+        return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    def to_dict(self) -> dict:
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'HistogramSketch':
+        return cls(data['edges'], data['counts'])
+
+
+class DriftMonitor:
+    """Training-time reference sketches plus live sketches updated while scoring."""
+
+    def __init__(self, reference: dict, half_life_rows: int = DEFAULT_HALF_LIFE_ROWS,
+                 min_rows: int = DEFAULT_MIN_ROWS):
+        """
+        Initialize the monitor.
+
+        Args:
+            reference: Mapping of column name to training HistogramSketch
+            half_life_rows: Rows after which older live observations count half,
+                so the report reflects recent traffic (0 keeps all history)
+            min_rows: Live rows needed before drift is reported
+        """
+        self.reference = reference
+        self.live = {name: HistogramSketch(sketch.edges) for name, sketch in reference.items()}
+        self.half_life_rows = half_life_rows
+        self.min_rows = min_rows
+        self.rows_seen = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_training(cls, X, anomaly_scores, n_bins: int = DEFAULT_BINS) -> 'DriftMonitor':
+        """
+        Build reference sketches from the training data.
+
+        Args:
+            X: Unscaled training features (duration, failure_rate columns)
+            anomaly_scores: model.score_samples() of the training data
+            n_bins: Bins per sketch
+        """
+        X = np.asarray(X, dtype=np.float64)
+        columns = {'duration': X[:, 0], 'failure_rate': X[:, 1], 'anomaly_score': anomaly_scores}
+        return cls({name: HistogramSketch.from_values(columns[name], n_bins) for name in DRIFT_COLUMNS})
+
+    @classmethod
+    def from_env(cls, reference: dict) -> 'DriftMonitor':
+        """
+        Create a monitor configured by DRIFT_HALF_LIFE_ROWS and DRIFT_MIN_ROWS.
+
+        Invalid settings fall back to the defaults: drift monitoring is
+        optional and must never keep the model from loading.
+        """
+        return cls(reference,
+                   half_life_rows=_env_rows('DRIFT_HALF_LIFE_ROWS', DEFAULT_HALF_LIFE_ROWS),
+                   min_rows=_env_rows('DRIFT_MIN_ROWS', DEFAULT_MIN_ROWS))
+
+    def save(self, model_dir: str):
+        """Write the reference sketches next to the model artifacts."""
+        with open(os.path.join(model_dir, SKETCH_FILE), 'w') as f:
+            json.dump({name: sketch.to_dict() for name, sketch in self.reference.items()}, f)
+
+    @classmethod
+    def load(cls, model_dir: str):
+        """
+        Load reference sketches saved by training.
+
+        Returns:
+            DriftMonitor, or None if the model has no sketches
+        """
+        path = os.path.join(model_dir, SKETCH_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_env({name: HistogramSketch.from_dict(data[name]) for name in DRIFT_COLUMNS})
+
+    def update(self, X, anomaly_scores):
+        """
+        Add a scored batch to the live sketches.
+
+        Args:
+            X: Unscaled features (duration, failure_rate columns)
+            anomaly_scores: Scores of the batch
+        """
+        n_rows = len(X)
+        if n_rows == 0:
+            return
+        decay = 0.5 ** (n_rows / self.half_life_rows) if self.half_life_rows > 0 else 1.0
+        columns = {'duration': X[:, 0], 'failure_rate': X[:, 1], 'anomaly_score': anomaly_scores}
+
+        with self._lock:
+            for name, sketch in self.live.items():
+                sketch.update(columns[name], decay)
+            self.rows_seen += n_rows
+
+    def report(self) -> dict:
+        """
+        Compare live traffic with the training data.
+
+        Returns:
+            Dictionary with PSI per column, the overall status
+            ('insufficient_data', 'stable', 'moderate' or 'drift') and
+            whether a retrain is recommended
+        """
+        with self._lock:
+            effective_rows = self.live['duration'].total
+            psi = {name: round(self.live[name].psi(self.reference[name]), 4) for name in self.reference}
+            rows_seen = self.rows_seen
+
+        worst = max(psi.values())
+        if effective_rows < self.min_rows:
+            status = 'insufficient_data'
+        elif worst >= PSI_SIGNIFICANT:
+            status = 'drift'
+        elif worst >= PSI_MODERATE:
+            status = 'moderate'
+        else:
+            status = 'stable'
+
+        return {
+            'status': status,
+            'retrain_recommended': status == 'drift',
+            'psi': psi,
+            'rows_seen': rows_seen,
+            'effective_rows': round(effective_rows, 1),
+            'training_rows': round(self.reference['duration'].total, 1)
+        }
@@ -3,36 +3,223 @@ Scoring script for the anomaly detection model deployment.
 This script is used by Azure ML for real-time inference.
 """
 
+import hashlib
 import json
+import os
 import joblib
 import numpy as np
-import pandas as pd
 import logging
 
+try:
+    from scoring.drift import DriftMonitor
+    from scoring.progressive import DEFAULT_ERROR_BOUND, DEFAULT_TREE_BATCH, ProgressiveScorer
+    from scoring.shadow import ShadowScorer
+except ImportError:
+    # Azure ML deploys the scoring/ directory itself as the code root
+    from drift import DriftMonitor
+    from progressive import DEFAULT_ERROR_BOUND, DEFAULT_TREE_BATCH, ProgressiveScorer
+    from shadow import ShadowScorer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FEATURE_COLS = ['duration', 'failure_rate']
+MODEL_FILES = ('isolation_forest_model.pkl', 'scaler.pkl')
+
+# Set by init() when the model directory has drift sketches
+drift_monitor = None
+
+# Set by init() when SCORING_MODE=approximate (early-exit scoring)
+progressive_scorer = None
+
+# Set by init() when a shadow model directory is configured
+shadow_scorer = None
+
+
+def parse_input(data):
+    """
+    Extract the feature matrix and build IDs from a request payload.
+    
+    Accepts either a list of per-build records or a columnar mapping of
+    column name to list of values, without going through pandas.
+    
+    Args:
+        data: The 'data' field of the request
+        
+    Returns:
+        Tuple of (feature matrix, list of build IDs)
+        
+    Raises:
+        ValueError: If the columns of a columnar payload differ in length
+    """
+    if isinstance(data, dict):
+        X = np.column_stack([np.asarray(data[col], dtype=np.float64) for col in FEATURE_COLS])
+        n_rows = len(X)
+        build_ids = data.get('build_id')
+        if build_ids is None:
+            build_ids = [f'build_{i}' for i in range(n_rows)]
+        elif len(build_ids) != n_rows:
+            raise ValueError(f"build_id has {len(build_ids)} values for {n_rows} rows")
+        return X, list(build_ids)
+    
+    X = np.array([[record[col] for col in FEATURE_COLS] for record in data], dtype=np.float64)
+    X = X.reshape(len(data), len(FEATURE_COLS))
+    build_ids = [record.get('build_id', f'build_{i}') for i, record in enumerate(data)]
+    return X, build_ids
+
 
-def init():
+def artifact_version(model_dir: str) -> str:
+    """
+    Identify a set of model artifacts.
+    
+    Uses the MODEL_VERSION environment variable if set (e.g. the registered
+    Azure ML model version), otherwise a content hash of the artifacts, so
+    results scored by the same files always carry the same version.
+    
+    Args:
+        model_dir: Directory with the model artifacts
+        
+    Returns:
+        Version string
+    """
+    if os.environ.get('MODEL_VERSION'):
+        return os.environ['MODEL_VERSION']
+    
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def init(model_dir: str = None, shadow_model_dir: str = None):
     """
     Initialize the model and scaler.
     This function is called when the container is initialized/started.
+    
+    Args:
+        model_dir: Directory with the model artifacts (defaults to the
+            MODEL_DIR environment variable, then 'model')
+        shadow_model_dir: Directory with a candidate model scored in the
+            shadow of the primary (defaults to the SHADOW_MODEL_DIR
+            environment variable; no shadow if unset)
     """
-    global model, scaler
+    global model, scaler, model_version, drift_monitor, progressive_scorer, shadow_scorer
     
     try:
         logger.info("Initializing model...")
         
+        model_dir = model_dir or os.environ.get('MODEL_DIR', 'model')
+        
         # Load the model and scaler
-        model = joblib.load('model/isolation_forest_model.pkl')
-        scaler = joblib.load('model/scaler.pkl')
+        model = joblib.load(os.path.join(model_dir, 'isolation_forest_model.pkl'))
+        scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+        model_version = artifact_version(model_dir)
+        
+        # Reference sketches for drift detection (absent for older models)
+        drift_monitor = DriftMonitor.load(model_dir)
+        if drift_monitor is None:
+            logger.info("No drift sketches found; drift monitoring disabled")
+        
+        # Exact scoring walks every tree; approximate mode exits early for clear-cut rows
+        if os.environ.get('SCORING_MODE', 'exact') == 'approximate':
+            progressive_scorer = ProgressiveScorer(
+                model,
+                error_bound=float(os.environ.get('SCORING_ERROR_BOUND', DEFAULT_ERROR_BOUND)),
+                tree_batch=int(os.environ.get('SCORING_TREE_BATCH', DEFAULT_TREE_BATCH))
+            )
+            logger.info(f"Approximate scoring enabled (error bound {progressive_scorer.error_bound})")
+        else:
+            progressive_scorer = None
         
-        logger.info("Model initialized successfully")
+        logger.info(f"Model initialized successfully (version {model_version})")
         
     except Exception as e:
         logger.error(f"Error initializing model: {str(e)}")
         raise
+    
+    shadow_scorer = None
+    shadow_model_dir = shadow_model_dir or os.environ.get('SHADOW_MODEL_DIR')
+    if shadow_model_dir:
+        # A broken candidate must never take the primary model down
+        try:
+            shadow_scorer = ShadowScorer(
+                joblib.load(os.path.join(shadow_model_dir, 'isolation_forest_model.pkl')),
+                joblib.load(os.path.join(shadow_model_dir, 'scaler.pkl')),
+                scaler,
+                mode=os.environ.get('SHADOW_MODE', 'approximate'),
+                error_bound=float(os.environ.get('SHADOW_ERROR_BOUND', DEFAULT_ERROR_BOUND)),
+                sample_rate=float(os.environ.get('SHADOW_SAMPLE_RATE', 1.0))
+            )
+            logger.info(f"Shadow model loaded from {shadow_model_dir} ({shadow_scorer.mode} scoring)")
+        except Exception as e:
+            logger.error(f"Error loading shadow model, continuing without it: {str(e)}")
+
+
+def predict(X):
+    """
+    Score a feature matrix with the loaded model and scaler, add the batch
+    to the live drift sketches, and score it with the shadow model if any.
+    
+    Args:
+        X: Feature matrix with columns in FEATURE_COLS order
+        
+    Returns:
+        Tuple of (boolean anomaly flags, anomaly scores, average trees
+        evaluated per row)
+    """
+    if len(X) == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0), 0.0
+    
+    X_scaled = scaler.transform(X)
+    
+    if progressive_scorer is not None:
+        is_anomaly, anomaly_scores, trees_used = progressive_scorer.score(X_scaled)
+        avg_trees = float(trees_used.mean())
+    else:
+        # predict() flags score_samples - offset_ < 0; reuse the scores instead
+        # of walking the forest a second time
+        anomaly_scores = model.score_samples(X_scaled)
+        is_anomaly = anomaly_scores < model.offset_
+        avg_trees = float(len(model.estimators_))
+    
+    if drift_monitor is not None:
+        drift_monitor.update(X, anomaly_scores)
+    
+    # The shadow scores the same parsed and scaled arrays; its result is only recorded
+    if shadow_scorer is not None:
+        try:
+            shadow_scorer.observe(X, X_scaled, is_anomaly)
+        except Exception as e:
+            shadow_scorer.record_error()
+            logger.warning(f"Shadow scoring failed: {str(e)}")
+    
+    return is_anomaly, anomaly_scores, avg_trees
+
+
+def drift_report():
+    """
+    Compare inputs and scores seen since init() with the training data.
+    
+    Returns:
+        Drift report dictionary, or an error if the model has no sketches
+    """
+    if drift_monitor is None:
+        return {'error': 'Drift monitoring unavailable: model has no drift sketches'}
+    return drift_monitor.report()
+
+
+def shadow_report():
+    """
+    Agreement between the shadow and primary models since init().
+    
+    Returns:
+        Agreement report dictionary, or an error if no shadow is configured
+    """
+    if shadow_scorer is None:
+        return {'error': 'No shadow model configured'}
+    return shadow_scorer.report()
 
 
 def run(raw_data):
@@ -51,31 +238,31 @@ def run(raw_data):
         # Parse input data
         data = json.loads(raw_data)
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['data'])
+        # {"drift_report": true} and {"shadow_report": true} ask for monitoring
+        # reports instead of scores
+        if data.get('drift_report'):
+            return json.dumps(drift_report())
+        if data.get('shadow_report'):
+            return json.dumps(shadow_report())
         
         # Extract features
-        feature_cols = ['duration', 'failure_rate']
-        X = df[feature_cols].values
-        
-        # Scale features
-        X_scaled = scaler.transform(X)
-        
-        # Make predictions
-        predictions = model.predict(X_scaled)
-        anomaly_scores = model.score_samples(X_scaled)
+        X, build_ids = parse_input(data['data'])
         
-        # Convert predictions (-1 for anomaly, 1 for normal)
-        is_anomaly = (predictions == -1).tolist()
+        # Scale features and score
+        is_anomaly, anomaly_scores, avg_trees = predict(X)
+        is_anomaly = is_anomaly.tolist()
         
         # Prepare response
         response = {
             'predictions': is_anomaly,
             'anomaly_scores': anomaly_scores.tolist(),
-            'build_ids': df.get('build_id', [f'build_{i}' for i in range(len(df))]).tolist()
+            'build_ids': build_ids,
+            'model_version': model_version
         }
+        if progressive_scorer is not None:
+            response['avg_trees_per_row'] = round(avg_trees, 2)
         
-        logger.info(f"Processed {len(df)} records, found {sum(is_anomaly)} anomalies")
+        logger.info(f"Processed {len(X)} records, found {sum(is_anomaly)} anomalies")
         
         return json.dumps(response)
         
@@ -0,0 +1,134 @@
+"""
+Shadow scoring: evaluate a candidate model on live traffic next to the
+primary model without affecting responses.
+
+The shadow reuses the primary's parsed (and, when the scalers match, scaled)
+feature arrays. By default it scores with early exit (scoring/progressive.py):
+only its prediction matters for the agreement statistics, so most rows
+need a fraction of the trees.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+try:
+    from scoring.progressive import DEFAULT_ERROR_BOUND, ProgressiveScorer
+except ImportError:
+    # Azure ML deploys the scoring/ directory itself as the code root
+    from progressive import DEFAULT_ERROR_BOUND, ProgressiveScorer
+
+
+class ShadowScorer:
+    """Scores batches with a shadow model and records agreement with the primary."""
+
+    def __init__(self, model, scaler, primary_scaler, mode: str = 'approximate',
+                 error_bound: float = DEFAULT_ERROR_BOUND, sample_rate: float = 1.0, seed: int = 0):
+        """
+        Initialize the shadow.
+
+        Args:
+            model: Shadow IsolationForest
+            scaler: Scaler trained with the shadow model
+            primary_scaler: Scaler of the primary model
+            mode: 'approximate' (early exit) or 'exact'
+            error_bound: Early-exit error bound in approximate mode
+            sample_rate: Fraction of rows scored by the shadow
+            seed: Random seed for row sampling
+        """
+        self.model = model
+        self.scaler = scaler
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.progressive = ProgressiveScorer(model, error_bound=error_bound) if mode == 'approximate' else None
+
+        # Retrains usually refit the scaler; reuse the primary's scaled arrays only if it is identical
+        self.shares_scaling = (np.array_equal(scaler.mean_, primary_scaler.mean_)
+                               and np.array_equal(scaler.scale_, primary_scaler.scale_))
+
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.both_anomaly = 0
+        self.primary_only = 0
+        self.shadow_only = 0
+        self.trees_evaluated = 0
+        self.seconds = 0.0
+        self.errors = 0
+
+    def observe(self, X, X_scaled, primary_is_anomaly):
+        """
+        Score a batch with the shadow and update the agreement counts.
+
+        Args:
+            X: Unscaled features of the batch
+            X_scaled: The same rows scaled by the primary's scaler
+            primary_is_anomaly: Primary model's predictions for the rows
+        """
+        start = time.perf_counter()
+
+        if self.sample_rate < 1.0:
+            with self._lock:
+                rows = np.flatnonzero(self._rng.random(len(X)) < self.sample_rate)
+            X, X_scaled, primary_is_anomaly = X[rows], X_scaled[rows], primary_is_anomaly[rows]
+
+        if len(X) == 0:
+            shadow_is_anomaly, trees = np.zeros(0, dtype=bool), 0
+        else:
+            # Same arithmetic as StandardScaler.transform, without its input validation
+            X_shadow = X_scaled if self.shares_scaling else (X - self.scaler.mean_) / self.scaler.scale_
+            if self.progressive is not None:
+                shadow_is_anomaly, _, trees_used = self.progressive.score(X_shadow)
+                trees = int(trees_used.sum())
+            else:
+                shadow_is_anomaly = self.model.score_samples(X_shadow) < self.model.offset_
+                trees = len(X) * len(self.model.estimators_)
+
+        both = int(np.count_nonzero(shadow_is_anomaly & primary_is_anomaly))
+        primary_only = int(np.count_nonzero(primary_is_anomaly)) - both
+        shadow_only = int(np.count_nonzero(shadow_is_anomaly)) - both
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.requests += 1
+            self.rows += len(X)
+            self.both_anomaly += both
+            self.primary_only += primary_only
+            self.shadow_only += shadow_only
+            self.trees_evaluated += trees
+            self.seconds += elapsed
+
+    def record_error(self):
+        """Count a batch the shadow failed to score."""
+        with self._lock:
+            self.errors += 1
+
+    def report(self) -> dict:
+        """
+        Agreement between the shadow and primary models since startup.
+
+        Returns:
+            Dictionary with agreement rate, anomaly rates of both models, the
+            disagreement breakdown and the shadow's time per request
+        """
+        with self._lock:
+            rows, requests = self.rows, self.requests
+            both, primary_only, shadow_only = self.both_anomaly, self.primary_only, self.shadow_only
+            trees, seconds, errors = self.trees_evaluated, self.seconds, self.errors
+
+        return {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate,
+            'requests': requests,
+            'rows': rows,
+            'agreement_rate': round(1 - (primary_only + shadow_only) / rows, 6) if rows else None,
+            'primary_anomaly_rate': round((both + primary_only) / rows, 6) if rows else None,
+            'shadow_anomaly_rate': round((both + shadow_only) / rows, 6) if rows else None,
+            'primary_only_anomalies': primary_only,
+            'shadow_only_anomalies': shadow_only,
+            'avg_trees_per_row': round(trees / rows, 2) if rows else None,
+            'shadow_ms_per_request': round(seconds * 1000 / requests, 3) if requests else None,
+            'errors': errors
+        }
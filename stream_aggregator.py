@@ -0,0 +1,271 @@
+"""
+In-process streaming aggregation of raw job/step events into run-level metrics.
+
+Computes the same per-run values as the KQL summarize in
+query_pipeline_metrics (duration = mean of DurationMs / 1000, failure_rate =
+share of events with a non-zero exit code) while events arrive, without
+waiting for them to land in Log Analytics.
+
+Runs are closed by an event-time watermark: the latest event time seen minus
+the allowed lateness. A run is finished once the watermark passes its last
+event plus an idle gap (or its completion marker). Events that arrive behind
+the watermark for a run that is not open any more are dropped and counted.
+The IDs of recently finished runs are kept, so a straggler for one of them
+is dropped too instead of opening a second, partial row for the same run.
+Finished runs are handed to a sink as MetricsBatch objects.
+"""
+
+import heapq
+import os
+
+from metrics_batch import MetricsBatch
+
+DEFAULT_ALLOWED_LATENESS_SECONDS = 60.0
+DEFAULT_RUN_IDLE_SECONDS = 300.0
+DEFAULT_MAX_OPEN_RUNS = 100000
+DEFAULT_MAX_CLOSED_RUNS = 100000
+DEFAULT_EMIT_BATCH_SIZE = 500
+
+# Positions in the per-run state list (a list is cheaper to update than an object)
+_DURATION_SUM, _EVENTS, _FAILURES, _DEADLINE = range(4)
+
+
+class RunAggregator:
+    """Per-run partial aggregates with watermark-based completion."""
+
+    def __init__(self, sink=None, allowed_lateness: float = DEFAULT_ALLOWED_LATENESS_SECONDS,
+                 run_idle_seconds: float = DEFAULT_RUN_IDLE_SECONDS,
+                 max_open_runs: int = DEFAULT_MAX_OPEN_RUNS,
+                 emit_batch_size: int = DEFAULT_EMIT_BATCH_SIZE,
+                 max_closed_runs: int = DEFAULT_MAX_CLOSED_RUNS):
+        """
+        Initialize the aggregator.
+
+        Args:
+            sink: Callable receiving a MetricsBatch of finished runs (e.g. a
+                wrapper around function_app.predict_anomalies); if None,
+                finished runs accumulate until drain()
+            allowed_lateness: Seconds an event may arrive behind the latest event time
+            run_idle_seconds: A run without events for this long (in event time) is finished
+            max_open_runs: Open runs kept in memory; beyond this the least
+                recently updated run is finished early
+            emit_batch_size: Finished runs collected before calling the sink
+            max_closed_runs: IDs of finished runs remembered to drop their
+                stragglers; beyond this the oldest are forgotten
+        """
+        self.sink = sink
+        self.allowed_lateness = allowed_lateness
+        self.run_idle_seconds = run_idle_seconds
+        self.max_open_runs = max_open_runs
+        self.emit_batch_size = emit_batch_size
+        self.max_closed_runs = max_closed_runs
+
+        # run_id -> [duration_sum_s, events, failures, deadline]; insertion
+        # order is least recently updated first
+        self._runs = {}
+        # Runs with a completion marker, waiting for the watermark to pass it,
+        # and a heap of (completion time, run_id) to find the ones it has passed
+        self._completed = {}
+        self._completion_times = []
+        # Finished run IDs (values unused), oldest first
+        self._closed = {}
+        self.max_event_time = float('-inf')
+
+        self._finished_ids = []
+        self._finished_duration = []
+        self._finished_failure_rate = []
+
+        self.events = 0
+        self.late_events_dropped = 0
+        self.closed_run_events_dropped = 0
+        self.runs_finished = 0
+        self.runs_evicted = 0
+
+    @classmethod
+    def from_env(cls, sink=None) -> 'RunAggregator':
+        """Create an aggregator configured by STREAM_* app settings."""
+        return cls(
+            sink=sink,
+            allowed_lateness=float(os.environ.get('STREAM_ALLOWED_LATENESS_SECONDS', DEFAULT_ALLOWED_LATENESS_SECONDS)),
+            run_idle_seconds=float(os.environ.get('STREAM_RUN_IDLE_SECONDS', DEFAULT_RUN_IDLE_SECONDS)),
+            max_open_runs=int(os.environ.get('STREAM_MAX_OPEN_RUNS', DEFAULT_MAX_OPEN_RUNS)),
+            emit_batch_size=int(os.environ.get('STREAM_EMIT_BATCH_SIZE', DEFAULT_EMIT_BATCH_SIZE)),
+            max_closed_runs=int(os.environ.get('STREAM_MAX_CLOSED_RUNS', DEFAULT_MAX_CLOSED_RUNS))
+        )
+
+    @property
+    def watermark(self) -> float:
+        """Event time before which no more events are expected."""
+        return self.max_event_time - self.allowed_lateness
+
+    @property
+    def open_runs(self) -> int:
+        return len(self._runs) + len(self._completed)
+
+    def add(self, run_id: str, event_time: float, duration_ms: float, exit_code: int):
+        """
+        Add one job/step event.
+
+        Args:
+            run_id: Workflow run the event belongs to (CorrelationId)
+            event_time: Event time in seconds since the epoch
+            duration_ms: Job/step duration in milliseconds
+            exit_code: Job/step exit code
+        """
+        self.add_many(((run_id, event_time, duration_ms, exit_code),))
+
+    def add_many(self, events):
+        """
+        Add job/step events and finish runs the watermark has passed.
+
+        Args:
+            events: Iterable of (run_id, event_time, duration_ms, exit_code) tuples
+        """
+        runs = self._runs
+        completed = self._completed
+        closed = self._closed
+        idle = self.run_idle_seconds
+        lateness = self.allowed_lateness
+        max_open_runs = self.max_open_runs
+        max_time = self.max_event_time
+        watermark = max_time - lateness
+        count = dropped = dropped_closed = 0
+
+        # Hot loop: locals only, one dict pop and insert per event
+        for run_id, event_time, duration_ms, exit_code in events:
+            count += 1
+            state = runs.pop(run_id, None)
+            if state is None:
+                state = completed.get(run_id)
+                if state is None:
+                    if event_time < watermark:
+                        dropped += 1
+                        continue
+                    if run_id in closed:
+                        dropped_closed += 1
+                        continue
+                    state = [0.0, 0, 0, event_time + idle]
+                    runs[run_id] = state
+                    # Enforce the cap as runs open, not only after the batch
+                    if len(runs) > max_open_runs:
+                        evicted = next(iter(runs))
+                        self._finish(evicted, runs.pop(evicted))
+                        self.runs_evicted += 1
+                # A straggler of a completed run counts but keeps its deadline
+            else:
+                if event_time + idle > state[_DEADLINE]:
+                    state[_DEADLINE] = event_time + idle
+                runs[run_id] = state
+
+            state[_DURATION_SUM] += duration_ms
+            state[_EVENTS] += 1
+            if exit_code != 0:
+                state[_FAILURES] += 1
+
+            if event_time > max_time:
+                max_time = event_time
+                watermark = max_time - lateness
+
+        self.max_event_time = max_time
+        self.events += count
+        self.late_events_dropped += dropped
+        self.closed_run_events_dropped += dropped_closed
+        self._close_finished()
+
+    def mark_completed(self, run_id: str, event_time: float):
+        """
+        Record that a run completed (e.g. a workflow_run completed event).
+
+        The run is finished as soon as the watermark passes the completion
+        time, instead of waiting for the idle gap; stragglers within the
+        allowed lateness are still counted.
+
+        Args:
+            run_id: Completed run
+            event_time: Completion time in seconds since the epoch
+        """
+        state = self._runs.pop(run_id, None)
+        if state is not None:
+            state[_DEADLINE] = event_time
+            self._completed[run_id] = state
+            heapq.heappush(self._completion_times, (event_time, run_id))
+        if event_time > self.max_event_time:
+            self.max_event_time = event_time
+        self._close_finished()
+
+    def _close_finished(self):
+        """Finish runs from the least recently updated end while the watermark has passed them."""
+        runs = self._runs
+        watermark = self.watermark
+
+        # Only the completed runs the watermark has passed are touched
+        completion_times = self._completion_times
+        while completion_times and completion_times[0][0] <= watermark:
+            run_id = heapq.heappop(completion_times)[1]
+            self._finish(run_id, self._completed.pop(run_id))
+
+        # Runs are ordered by last update, which tracks event time closely; a
+        # run stuck behind a later deadline is finished a little late, never early
+        while runs:
+            run_id = next(iter(runs))
+            if runs[run_id][_DEADLINE] > watermark:
+                break
+            self._finish(run_id, runs.pop(run_id))
+
+    def _finish(self, run_id: str, state: list):
+        """Turn a run's partial aggregate into its metrics and queue it for the sink."""
+        closed = self._closed
+        closed[run_id] = None
+        if len(closed) > self.max_closed_runs:
+            del closed[next(iter(closed))]
+
+        events = state[_EVENTS]
+        self._finished_ids.append(run_id)
+        self._finished_duration.append(state[_DURATION_SUM] / events / 1000)
+        self._finished_failure_rate.append(state[_FAILURES] / events)
+        self.runs_finished += 1
+
+        if self.sink is not None and len(self._finished_ids) >= self.emit_batch_size:
+            self.sink(self.drain())
+
+    def drain(self) -> MetricsBatch:
+        """
+        Take the finished runs not yet handed to the sink.
+
+        Returns:
+            MetricsBatch of finished runs
+        """
+        batch = MetricsBatch.from_columns(self._finished_ids, self._finished_duration, self._finished_failure_rate)
+        self._finished_ids, self._finished_duration, self._finished_failure_rate = [], [], []
+        return batch
+
+    def flush(self) -> MetricsBatch:
+        """
+        Finish every open run (end of stream or shutdown).
+
+        Returns:
+            MetricsBatch of finished runs not yet handed to the sink; also
+            passed to the sink if there is one
+        """
+        for runs in (self._completed, self._runs):
+            while runs:
+                run_id = next(iter(runs))
+                self._finish(run_id, runs.pop(run_id))
+        self._completion_times.clear()
+
+        batch = self.drain()
+        if self.sink is not None and len(batch):
+            self.sink(batch)
+        return batch
+
+    def stats(self) -> dict:
+        """Counters describing the stream so far."""
+        return {
+            'events': self.events,
+            'late_events_dropped': self.late_events_dropped,
+            'closed_run_events_dropped': self.closed_run_events_dropped,
+            'open_runs': len(self._runs) + len(self._completed),
+            'runs_finished': self.runs_finished,
+            'runs_evicted': self.runs_evicted,
+            'watermark': self.watermark
+        }
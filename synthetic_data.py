@@ -0,0 +1,95 @@
+"""
+Synthetic pipeline metrics, job events and fixture models shared by the tests (through
+conftest.py) and the benchmarks, so neither depends on the other.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def synthetic_metrics(n_samples: int, seed: int = 42, anomaly_fraction: float = 0.05) -> dict:
+    """
+    Generate pipeline metrics with the same shape as the training sample data.
+
+    Args:
+        n_samples: Number of builds
+        seed: Random seed
+        anomaly_fraction: Fraction of slow/failing builds
+
+    Returns:
+        Dictionary with build_id, duration and failure_rate columns
+    """
+    rng = np.random.default_rng(seed)
+    n_anomalies = int(n_samples * anomaly_fraction)
+    n_normal = n_samples - n_anomalies
+
+    duration = np.concatenate([rng.normal(300, 50, n_normal), rng.normal(900, 100, n_anomalies)])
+    failure_rate = np.concatenate([rng.beta(2, 50, n_normal), rng.beta(10, 5, n_anomalies)])
+    order = rng.permutation(n_samples)
+
+    return {
+        'build_id': [f'build_{i:07d}' for i in range(n_samples)],
+        'duration': duration[order],
+        'failure_rate': failure_rate[order]
+    }
+
+
+def train_fixture_model(model_dir: str, n_samples: int = 1000):
+    """
+    Train and save a model the same way PipelineAnomalyDetector does.
+
+    Args:
+        model_dir: Directory to write isolation_forest_model.pkl, scaler.pkl and
+            drift_sketches.json to
+        n_samples: Number of synthetic training rows
+    """
+    import joblib
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+
+    from scoring.drift import DriftMonitor
+
+    data = synthetic_metrics(n_samples)
+    X = np.column_stack([data['duration'], data['failure_rate']])
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(contamination=0.05, random_state=42, n_estimators=100, max_samples='auto')
+    model.fit(scaler.transform(X))
+
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, os.path.join(model_dir, 'isolation_forest_model.pkl'))
+    joblib.dump(scaler, os.path.join(model_dir, 'scaler.pkl'))
+    DriftMonitor.from_training(X, model.score_samples(scaler.transform(X))).save(model_dir)
+
+
+def synthetic_events(n_runs: int, jobs_per_run: int = 25, seed: int = 42,
+                     arrival_delay_s: float = 5.0, failure_probability: float = 0.03) -> list:
+    """
+    Generate job/step events for overlapping workflow runs, in arrival order.
+
+    Runs start over an hour and their jobs spread over 10 minutes. Each event
+    arrives after a random delay, so the stream is out of event-time order.
+
+    Args:
+        n_runs: Number of workflow runs
+        jobs_per_run: Events per run
+        seed: Random seed
+        arrival_delay_s: Mean delay between event time and arrival
+        failure_probability: Chance of a non-zero exit code
+
+    Returns:
+        List of (run_id, event_time, duration_ms, exit_code) tuples
+    """
+    rng = np.random.default_rng(seed)
+    run_start = np.sort(rng.uniform(0, 3600, n_runs))
+    run = np.repeat(np.arange(n_runs), jobs_per_run)
+    event_time = np.repeat(run_start, jobs_per_run) + rng.uniform(0, 600, len(run))
+    order = np.argsort(event_time + rng.exponential(arrival_delay_s, len(run)))
+
+    run_ids = [f'run_{i:07d}' for i in range(n_runs)]
+    duration_ms = rng.normal(60000, 10000, len(run))
+    exit_code = (rng.random(len(run)) < failure_probability).astype(np.int64)
+
+    return list(zip([run_ids[i] for i in run[order].tolist()], event_time[order].tolist(),
+                    duration_ms[order].tolist(), exit_code[order].tolist()))
@@ -11,6 +11,14 @@ resource "azurerm_storage_account" "function" {
   tags = var.tags
 }
 
+# File share holding the metrics history (metrics_store.py); mounted into the
+# Function App, which appends to it, and downloaded by the training workflow
+resource "azurerm_storage_share" "metrics_history" {
+  name                 = var.metrics_history_share_name
+  storage_account_name = azurerm_storage_account.function.name
+  quota                = var.metrics_history_quota_gb
+}
+
 # App Service Plan for Function App (Linux Basic plan)
 resource "azurerm_service_plan" "function" {
   name                = var.function_app_service_plan_name
@@ -41,6 +49,15 @@ resource "azurerm_linux_function_app" "anomaly_detector" {
     application_insights_key               = azurerm_application_insights.ml.instrumentation_key
   }
   
+  storage_account {
+    name         = "metrics-history"
+    type         = "AzureFiles"
+    account_name = azurerm_storage_account.function.name
+    access_key   = azurerm_storage_account.function.primary_access_key
+    share_name   = azurerm_storage_share.metrics_history.name
+    mount_path   = "/mounts/metrics-history"
+  }
+  
   app_settings = {
     "FUNCTIONS_WORKER_RUNTIME"       = "python"
     "ML_ENDPOINT_URL"                = var.ml_endpoint_url
@@ -51,6 +68,7 @@ resource "azurerm_linux_function_app" "anomaly_detector" {
     "SENDGRID_FROM_EMAIL"            = var.sendgrid_from_email
     "SENDGRID_TO_EMAIL"              = var.sendgrid_to_email
     "ML_STUDIO_URL"                  = "https://ml.azure.com"
+    "METRICS_STORE_PATH"             = "/mounts/metrics-history"
     "WEBSITE_RUN_FROM_PACKAGE"       = "1"
   }
   
@@ -136,3 +136,13 @@ output "function_app_principal_id" {
   description = "Principal ID of the Function App managed identity"
   value       = azurerm_linux_function_app.anomaly_detector.identity[0].principal_id
 }
+
+output "function_storage_account_name" {
+  description = "Name of the Function App storage account"
+  value       = azurerm_storage_account.function.name
+}
+
+output "metrics_history_share_name" {
+  description = "Name of the file share holding the metrics history"
+  value       = azurerm_storage_share.metrics_history.name
+}
@@ -96,6 +96,18 @@ variable "function_storage_account_name" {
   default     = "funcstorageanomalydet"
 }
 
+variable "metrics_history_share_name" {
+  description = "Name of the Azure Files share holding the metrics history used for retraining"
+  type        = string
+  default     = "metrics-history"
+}
+
+variable "metrics_history_quota_gb" {
+  description = "Size limit of the metrics history share in GB"
+  type        = number
+  default     = 50
+}
+
 variable "function_app_service_plan_name" {
   description = "Name of the App Service Plan for Function App"
   type        = string
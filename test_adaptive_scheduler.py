@@ -0,0 +1,75 @@
+import pytest
+
+from adaptive_scheduler import (
+    AdaptiveScheduler, DEFAULT_INTERVAL_SECONDS, DEFAULT_MAX_INTERVAL_SECONDS, DEFAULT_MIN_INTERVAL_SECONDS
+)
+
+
+def simulate(scheduler, minutes, builds_per_minute, anomaly_rate=0.0):
+    """Drive the scheduler with one tick per minute at a constant build rate"""
+    runs = []
+    for minute in range(minutes):
+        now = minute * 60.0
+        if scheduler.should_run(now):
+            window = scheduler.window(now)
+            builds = int(builds_per_minute * window.total_seconds() / 60)
+            scheduler.record_run(now, window, builds, int(builds * anomaly_rate))
+            runs.append(minute)
+    return runs
+
+
+def test_fixed_mode_runs_every_five_minutes():
+    """Test the default mode keeps the original 5-minute cadence"""
+    scheduler = AdaptiveScheduler(adaptive=False)
+    assert simulate(scheduler, 30, builds_per_minute=4) == [0, 5, 10, 15, 20, 25]
+    assert scheduler.stats(29 * 60.0)['queries_saved'] == 0
+
+
+def test_adaptive_mode_backs_off_when_idle():
+    """Test idle pipelines stretch the interval to the maximum"""
+    scheduler = AdaptiveScheduler(adaptive=True, max_interval=1800)
+    runs = simulate(scheduler, 8 * 60, builds_per_minute=0)
+    assert runs[1] - runs[0] == 30
+    stats = scheduler.stats(8 * 60 * 60.0 - 60)
+    assert stats['queries_saved'] > 70
+    assert stats['current_interval_s'] == 1800
+
+
+def test_adaptive_mode_tightens_when_busy_or_anomalous():
+    """Test busy windows and anomaly bursts shorten the interval"""
+    busy = AdaptiveScheduler(adaptive=True, target_builds_per_run=20)
+    simulate(busy, 60, builds_per_minute=10)
+    assert busy.interval == 120
+
+    burst = AdaptiveScheduler(adaptive=True, min_interval=60)
+    runs = simulate(burst, 60, builds_per_minute=10, anomaly_rate=0.5)
+    assert burst.interval == 60
+    assert max(later - earlier for earlier, later in zip(runs, runs[1:])) <= 5
+
+
+def test_window_covers_time_since_last_run():
+    """Test each query window starts where the previous run ended"""
+    scheduler = AdaptiveScheduler(adaptive=True, max_interval=600)
+    # Nothing is known about the gap before an instance's first run
+    assert scheduler.window(0.0).total_seconds() == 600
+    assert AdaptiveScheduler(adaptive=False).window(0.0).total_seconds() == 300
+    scheduler.record_run(0.0, scheduler.window(0.0), 0, 0)
+    assert scheduler.window(420.0).total_seconds() == 420
+    assert scheduler.window(5000.0).total_seconds() == 600
+
+
+@pytest.mark.parametrize('settings', [
+    {'DETECTION_INTERVAL_SECONDS': 'five minutes', 'DETECTION_MIN_INTERVAL_SECONDS': '-1',
+     'DETECTION_MAX_INTERVAL_SECONDS': 'nan', 'DETECTION_TARGET_BUILDS': '0'},
+    {'DETECTION_MIN_INTERVAL_SECONDS': '900', 'DETECTION_MAX_INTERVAL_SECONDS': '120'},
+])
+def test_from_env_falls_back_on_invalid_settings(settings, monkeypatch):
+    """Test bad DETECTION_* settings use the defaults instead of failing every tick"""
+    monkeypatch.setenv('ADAPTIVE_SCHEDULING', 'true')
+    for name, value in settings.items():
+        monkeypatch.setenv(name, value)
+    scheduler = AdaptiveScheduler.from_env()
+    assert scheduler.base_interval == DEFAULT_INTERVAL_SECONDS
+    assert scheduler.min_interval == DEFAULT_MIN_INTERVAL_SECONDS
+    assert scheduler.max_interval == DEFAULT_MAX_INTERVAL_SECONDS
+    assert scheduler.should_run(0.0)
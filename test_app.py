@@ -1,10 +1,18 @@
+import gc
+import json
 import pytest
-from app import app
 
 @pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    with app.test_client() as client:
+def app_module(monkeypatch, scoring_state):
+    """Import app without freezing the garbage collector of the test process"""
+    monkeypatch.setattr(gc, 'freeze', lambda: None)
+    import app
+    return app
+
+@pytest.fixture
+def client(app_module):
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
         yield client
 
 def test_home_route(client):
@@ -21,3 +29,76 @@ def test_health_route(client):
     assert response.status_code == 200
     data = response.get_json()
     assert data['status'] == 'healthy'
+
+@pytest.fixture
+def scoring_client(app_module, model_dir, monkeypatch):
+    monkeypatch.setattr(app_module, 'MODEL_LOADED', app_module.load_model(str(model_dir)))
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+def test_score_matches_scoring_module(scoring_client):
+    """Test /score returns the same result as scoring/score.py run()"""
+    from scoring import score
+
+    payload = {'data': {'build_id': ['b1', 'b2', 'b3'],
+                        'duration': [300.0, 1200.0, 310.0],
+                        'failure_rate': [0.02, 0.9, 0.05]}}
+    response = scoring_client.post('/score', json=payload)
+    assert response.status_code == 200
+    assert response.get_json() == json.loads(score.run(json.dumps(payload)))
+    assert response.get_json()['predictions'] == [False, True, False]
+
+def test_score_bulk_ndjson(scoring_client, monkeypatch):
+    """Test /score/bulk scores NDJSON input in chunks and streams NDJSON"""
+    monkeypatch.setenv('SCORE_BULK_CHUNK_SIZE', '2')
+    body = '\n'.join(json.dumps({'build_id': f'b{i}', 'duration': 1200.0 if i == 3 else 300.0,
+                                'failure_rate': 0.9 if i == 3 else 0.03})
+                     for i in range(5)) + '\n'
+    response = scoring_client.post('/score/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['build_id'] for line in lines] == ['b0', 'b1', 'b2', 'b3', 'b4']
+    assert [line['is_anomaly'] for line in lines] == [False, False, False, True, False]
+
+def test_score_errors(scoring_client, monkeypatch):
+    """Test /score rejects invalid and oversized requests"""
+    assert scoring_client.post('/score', json={'rows': []}).status_code == 400
+    monkeypatch.setenv('SCORE_MAX_ROWS', '1')
+    payload = {'data': [{'duration': 300, 'failure_rate': 0.0}, {'duration': 310, 'failure_rate': 0.0}]}
+    assert scoring_client.post('/score', json=payload).status_code == 413
+    assert scoring_client.post('/score/bulk', json=payload).status_code == 200
+
+def test_score_rejects_non_finite_input(scoring_client, monkeypatch):
+    """Test missing or non-finite features get a JSON 400 before scoring or streaming starts"""
+    from scoring import score
+
+    payload = {'data': [{'build_id': 'b1', 'duration': None, 'failure_rate': 0.0}]}
+    response = scoring_client.post('/score', json=payload)
+    assert response.status_code == 400
+    assert 'finite' in response.get_json()['error']
+    body = json.dumps({'build_id': 'b1', 'duration': 300.0, 'failure_rate': float('nan')}) + '\n'
+    response = scoring_client.post('/score/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+
+    def fail(X):
+        raise RuntimeError('model failed')
+
+    monkeypatch.setattr(score, 'predict', fail)
+    payload = {'data': [{'build_id': 'b1', 'duration': 300.0, 'failure_rate': 0.0}]}
+    response = scoring_client.post('/score', json=payload)
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'model failed'}
+    response = scoring_client.post('/score/bulk', json=payload)
+    assert response.get_data(as_text=True).splitlines() == ['{"error": "model failed"}']
+
+def test_parse_input_rejects_misaligned_build_ids():
+    """Test a columnar payload with fewer build IDs than rows is rejected, not zipped out of alignment"""
+    from scoring import score
+
+    data = {'duration': [1.0, 2.0], 'failure_rate': [0.1, 0.2], 'build_id': ['a']}
+    with pytest.raises(ValueError, match='1 values for 2 rows'):
+        score.parse_input(data)
+    assert json.loads(score.run(json.dumps({'data': data}))) == {'error': 'build_id has 1 values for 2 rows'}
+    data['build_id'].append('b')
+    assert score.parse_input(data)[1] == ['a', 'b']
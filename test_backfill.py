@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backfill_scores import backfill, load_results
+from synthetic_data import synthetic_metrics
+
+
+@pytest.fixture
+def history(tmp_path, model_dir):
+    data = synthetic_metrics(2500, seed=4)
+    csv_path = tmp_path / 'pipeline_metrics.csv'
+    pd.DataFrame(data).assign(timestamp='2025-01-01').to_csv(csv_path, index=False)
+    return csv_path, model_dir, data
+
+
+def test_backfill_matches_endpoint_scoring(history, tmp_path, monkeypatch):
+    """Test backfilled scores equal exact run() output, even with approximate or shadow endpoint settings"""
+    from scoring import score
+
+    csv_path, model_dir, data = history
+    monkeypatch.setenv('SCORING_MODE', 'approximate')
+    monkeypatch.setenv('SHADOW_MODEL_DIR', str(model_dir))
+    result = backfill(str(csv_path), str(tmp_path / 'out'), str(model_dir), chunk_size=1000, workers=2)
+    assert result['rows'] == 2500
+    assert result['chunks'] == 3
+    assert json.loads((tmp_path / 'out' / 'manifest.json').read_text())['scoring_mode'] == 'exact'
+
+    monkeypatch.delenv('SCORING_MODE')
+    monkeypatch.delenv('SHADOW_MODEL_DIR')
+    score.init(str(model_dir))
+    expected = json.loads(score.run(json.dumps({'data': {
+        'build_id': data['build_id'],
+        'duration': data['duration'].tolist(),
+        'failure_rate': data['failure_rate'].tolist()
+    }})))
+
+    results = load_results(str(tmp_path / 'out'))
+    assert results['build_id'] == data['build_id']
+    assert np.allclose(results['anomaly_score'], expected['anomaly_scores'], rtol=0, atol=1e-12)
+    assert results['prediction'].tolist() == expected['predictions']
+    assert set(results['model_version']) == {expected['model_version']}
+
+
+def test_backfill_resumes_from_completed_chunks(history, tmp_path):
+    """Test a rerun only scores chunks without a finished part file"""
+    csv_path, model_dir, _ = history
+    output = tmp_path / 'out'
+    backfill(str(csv_path), str(output), str(model_dir), chunk_size=1000, workers=1)
+
+    (output / 'part-00001.npz').unlink()
+    result = backfill(str(csv_path), str(output), str(model_dir), chunk_size=1000, workers=1)
+    assert (result['chunks'], result['skipped_chunks'], result['rows']) == (1, 2, 1000)
+    assert len(load_results(str(output))['build_id']) == 2500
+
+    with pytest.raises(ValueError, match='chunk_size'):
+        backfill(str(csv_path), str(output), str(model_dir), chunk_size=500, workers=1)
+
+
+@pytest.mark.parametrize('n_rows', [23, 25])
+@pytest.mark.parametrize('tail', ['', '\n', '\n\n\n'])
+def test_chunk_ranges_split_whole_rows(tmp_path, monkeypatch, n_rows, tail):
+    """Test byte ranges hold chunk_size whole rows across scan blocks, with or without trailing newlines"""
+    import backfill_scores
+
+    monkeypatch.setattr(backfill_scores, 'SCAN_BLOCK_BYTES', 7)
+    rows = [f'build-{i},{i}.5,0.{i},x' for i in range(n_rows)]
+    csv_path = tmp_path / 'metrics.csv'
+    csv_path.write_text('build_id,duration,failure_rate,timestamp\n' + '\n'.join(rows) + tail)
+
+    columns, ranges = backfill_scores.chunk_ranges(str(csv_path), 5)
+    assert columns == ['build_id', 'duration', 'failure_rate', 'timestamp']
+    content = csv_path.read_bytes()
+    chunks = [content[start:end].decode().split('\n') for start, end in ranges]
+    assert [[row for row in chunk if row] for chunk in chunks] == [rows[i:i + 5] for i in range(0, n_rows, 5)]
+
+    with pytest.raises(ValueError, match='failure_rate'):
+        csv_path.write_text('build_id,duration\nb1,1.0\n')
+        backfill_scores.chunk_ranges(str(csv_path), 5)
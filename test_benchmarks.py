@@ -0,0 +1,39 @@
+import json
+import urllib.error
+import urllib.request
+
+from benchmarks.harness import compare
+from benchmarks.stand_ins import FaultProfile, StandInServer, accept_handler
+
+
+def test_compare_flags_only_significant_slowdowns():
+    """Test the regression check ignores noise and throughput metrics"""
+    baselines = {
+        'scoring.run.records.100': {'median_ms': 10.0, 'rows_per_s': 10000},
+        'training.train_model.1000': {'median_ms': 200.0, 'peak_mb': 2.0},
+    }
+    results = {
+        'scoring.run.records.100': {'median_ms': 12.0, 'rows_per_s': 100},
+        'training.train_model.1000': {'median_ms': 150.0, 'peak_mb': 3.0},
+        'detection.end_to_end.100': {'median_ms': 99.0},
+    }
+    regressions = compare(results, baselines, tolerance=0.3)
+    assert [(name, metric) for name, metric, *_ in regressions] == [('training.train_model.1000', 'peak_mb')]
+
+
+def test_stand_in_injects_errors_and_counts_requests():
+    """Test stand-in routing by prefix, fault injection and per-route stats"""
+    routes = {'/v1': accept_handler, '/score': (accept_handler, FaultProfile(error_rate=1.0, error_status=429))}
+    with StandInServer(routes) as server:
+        ok = urllib.request.urlopen(urllib.request.Request(f'{server.url}/v1/workspaces/w/query', data=b'{}'))
+        assert ok.status == 200
+        try:
+            urllib.request.urlopen(urllib.request.Request(f'{server.url}/score', data=b'{}'))
+            assert False, 'expected an injected error'
+        except urllib.error.HTTPError as e:
+            assert e.code == 429
+        stats = json.loads(urllib.request.urlopen(f'{server.url}/_stats').read())
+
+    assert stats['/v1']['requests'] == 1
+    assert stats['/score']['requests'] == 1
+    assert stats['/score']['injected_errors'] == 1
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+
+from scoring.drift import DEFAULT_HALF_LIFE_ROWS, DEFAULT_MIN_ROWS, DriftMonitor, HistogramSketch
+from synthetic_data import synthetic_metrics
+
+
+def features(n_samples, seed, duration_shift=0.0):
+    data = synthetic_metrics(n_samples, seed=seed)
+    return np.column_stack([data['duration'] + duration_shift, data['failure_rate']])
+
+
+def test_sketch_quantile_bins_and_round_trip():
+    """Test training sketches split data into equal-share bins and survive serialization"""
+    values = np.random.default_rng(0).normal(size=10000)
+    sketch = HistogramSketch.from_values(values, n_bins=10)
+    assert len(sketch.counts) == 10
+    assert np.allclose(sketch.counts, 1000, atol=1)
+
+    restored = HistogramSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert np.array_equal(restored.edges, sketch.edges)
+    assert restored.psi(sketch) == 0.0
+
+
+def test_monitor_flags_shifted_inputs():
+    """Test the live PSI stays low on training-like traffic and flags shifted durations"""
+    X = features(5000, seed=1)
+    monitor = DriftMonitor.from_training(X, -X[:, 0] / 1000)
+
+    assert monitor.report()['status'] == 'insufficient_data'
+
+    for seed in range(2, 6):
+        batch = features(500, seed=seed)
+        monitor.update(batch, -batch[:, 0] / 1000)
+    report = monitor.report()
+    assert report['status'] == 'stable'
+    assert report['rows_seen'] == 2000
+
+    shifted = DriftMonitor(monitor.reference)
+    for seed in range(2, 6):
+        batch = features(500, seed=seed, duration_shift=150.0)
+        shifted.update(batch, -batch[:, 0] / 1000)
+    report = shifted.report()
+    assert report['status'] == 'drift'
+    assert report['retrain_recommended']
+    assert report['psi']['duration'] > 0.25
+    assert report['psi']['failure_rate'] < 0.1
+
+
+def test_from_env_falls_back_on_invalid_settings(monkeypatch):
+    """Test bad drift settings use the defaults instead of failing model load"""
+    reference = DriftMonitor.from_training(features(1000, seed=1), np.zeros(1000)).reference
+    monkeypatch.setenv('DRIFT_HALF_LIFE_ROWS', '50k')
+    monkeypatch.setenv('DRIFT_MIN_ROWS', '-5')
+    monitor = DriftMonitor.from_env(reference)
+    assert (monitor.half_life_rows, monitor.min_rows) == (DEFAULT_HALF_LIFE_ROWS, DEFAULT_MIN_ROWS)
+
+    monkeypatch.setenv('DRIFT_HALF_LIFE_ROWS', '0')
+    monkeypatch.setenv('DRIFT_MIN_ROWS', '100')
+    monitor = DriftMonitor.from_env(reference)
+    assert (monitor.half_life_rows, monitor.min_rows) == (0, 100)
+
+
+def test_score_run_reports_drift(model_dir):
+    """Test run() feeds the live sketches and answers drift report requests"""
+    from scoring import score
+
+    score.init(str(model_dir))
+
+    X = features(1000, seed=9)
+    payload = {'data': {'duration': X[:, 0].tolist(), 'failure_rate': X[:, 1].tolist()}}
+    assert 'predictions' in json.loads(score.run(json.dumps(payload)))
+
+    report = json.loads(score.run(json.dumps({'drift_report': True})))
+    assert report['rows_seen'] == 1000
+    assert set(report['psi']) == {'duration', 'failure_rate', 'anomaly_score'}
+    assert report['status'] == 'stable'
@@ -0,0 +1,252 @@
+import base64
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+import pytest
+import azure.functions as func
+import function_app
+from metrics_batch import MetricsBatch
+
+
+def make_metrics(n_normal, n_anomalous):
+    metrics = []
+    for i in range(n_normal):
+        metrics.append({'build_id': f'build_n{i:05d}', 'duration': 300.0, 'failure_rate': 0.05})
+    for i in range(n_anomalous):
+        metrics.append({'build_id': f'build_a{i:05d}', 'duration': 900.0, 'failure_rate': 0.4})
+    return metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Serve a fixed metrics window and mock predictions to the triggers"""
+    data = make_metrics(20, 25)
+    monkeypatch.setattr(function_app, 'query_pipeline_metrics',
+                        lambda logger, window=None, end=None: MetricsBatch.from_records(data))
+    monkeypatch.setattr(function_app, '_snapshots', OrderedDict())
+    monkeypatch.delenv('ML_ENDPOINT_URL', raising=False)
+    monkeypatch.delenv('TEAMS_WEBHOOK_URL', raising=False)
+    monkeypatch.delenv('SENDGRID_API_KEY', raising=False)
+    return data
+
+
+@pytest.fixture
+def query_windows(metrics, monkeypatch):
+    """Record the (start, end) window of every metrics query"""
+    windows = []
+    query = function_app.query_pipeline_metrics
+
+    def recording_query(logger, window=None, end=None):
+        windows.append((end - window, end))
+        return query(logger, window, end)
+
+    monkeypatch.setattr(function_app, 'query_pipeline_metrics', recording_query)
+    return windows
+
+
+class FrozenDatetime(datetime):
+    """datetime whose now() is a fixed instant"""
+
+    @classmethod
+    def at(cls, instant):
+        cls.instant = instant
+        return cls
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.instant
+
+
+def call_http_trigger(params=None):
+    req = func.HttpRequest(method='GET', url='/api/detect_anomalies', params=params or {}, body=b'')
+    return function_app.http_trigger.build().get_user_function()(req)
+
+
+def test_http_trigger_compact_by_default(metrics):
+    """Test the default response is compact JSON with all anomalies"""
+    response = call_http_trigger()
+    assert response.status_code == 200
+    body = response.get_body().decode()
+    assert '\n' not in body
+    data = json.loads(body)
+    assert data['metrics_analyzed'] == 45
+    assert data['anomalies_detected'] == 25
+    assert len(data['anomalies']) == 25
+    assert data['next_cursor'] is None
+
+
+def test_http_trigger_cursor_pagination(metrics, query_windows):
+    """Test paging through anomalies with cursors returns each one once"""
+    seen = []
+    cursor = None
+    while True:
+        params = {'limit': '10'}
+        if cursor:
+            params['cursor'] = cursor
+        data = json.loads(call_http_trigger(params).get_body())
+        seen.extend(a['build_id'] for a in data['anomalies'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted(m['build_id'] for m in metrics[20:])
+    # Later pages reuse the first page's snapshot
+    assert len(query_windows) == 1
+
+
+def test_http_trigger_cursor_pins_the_window(query_windows):
+    """Test a cursor re-queries its own window when the snapshot is not cached"""
+    first = json.loads(call_http_trigger({'limit': '10'}).get_body())
+    function_app._snapshots.clear()
+
+    second = json.loads(call_http_trigger({'limit': '10', 'cursor': first['next_cursor']}).get_body())
+    assert len(query_windows) == 2
+    assert query_windows[1] == query_windows[0]
+    assert query_windows[0][1] - query_windows[0][0] == function_app.DEFAULT_HTTP_WINDOW
+    assert second['anomalies'][0]['build_id'] > first['anomalies'][-1]['build_id']
+
+
+def test_http_trigger_alerts_once_per_detection(metrics, monkeypatch):
+    """Test requests served from a cached snapshot and later pages do not re-send alerts"""
+    alerts = []
+    monkeypatch.setattr(function_app, 'send_teams_alert', lambda anomalies, logger: alerts.append(len(anomalies)))
+    monkeypatch.setattr(function_app, 'send_email_alert', lambda anomalies, logger: None)
+
+    first = json.loads(call_http_trigger({'limit': '10'}).get_body())
+    window = next(iter(function_app._snapshots))
+    monkeypatch.setattr(function_app, 'datetime', FrozenDatetime.at(window[1]))
+    call_http_trigger({'limit': '10'})
+    call_http_trigger({'limit': '10', 'cursor': first['next_cursor']})
+    assert alerts == [25]
+
+
+def test_http_trigger_rejects_widened_cursor_window(metrics, query_windows):
+    """Test a hand-made cursor cannot query more than the default window"""
+    def cursor(start, end):
+        raw = json.dumps({'after': 'build_a00000', 'start': start, 'end': end}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    end = 1760054400
+    window = int(function_app.DEFAULT_HTTP_WINDOW.total_seconds())
+    assert call_http_trigger({'cursor': cursor(end - 3 * 365 * 86400, end)}).status_code == 400
+    assert call_http_trigger({'cursor': cursor(end - window - 1, end)}).status_code == 400
+    assert call_http_trigger({'cursor': cursor(end, end)}).status_code == 400
+    assert query_windows == []
+    assert call_http_trigger({'cursor': cursor(end - window, end)}).status_code == 200
+
+
+def test_http_trigger_field_projection_and_ndjson(metrics):
+    """Test field projection combined with the NDJSON format"""
+    response = call_http_trigger({'format': 'ndjson', 'fields': 'build_id,anomaly_score', 'limit': '5'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_body().decode().splitlines()
+    assert len(lines) == 5
+    assert set(json.loads(lines[0])) == {'build_id', 'anomaly_score'}
+    assert response.headers['X-Anomalies-Detected'] == '25'
+    assert 'X-Next-Cursor' in response.headers
+
+
+def test_http_trigger_rejects_invalid_options(metrics):
+    """Test invalid query parameters return 400"""
+    assert call_http_trigger({'fields': 'build_id,secret'}).status_code == 400
+    assert call_http_trigger({'limit': '0'}).status_code == 400
+    assert call_http_trigger({'cursor': '!!not-a-cursor'}).status_code == 400
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_predict_anomalies_merges_chunks_and_isolates_failures(monkeypatch):
+    """Test chunks are merged in input order and only the failing chunk falls back"""
+    import requests
+
+    calls = []
+
+    def fake_post(session, url, headers=None, json=None, timeout=None):
+        data = json['data']
+        calls.append(data['build_id'][0])
+        if 'build_n00010' in data['build_id']:
+            raise requests.exceptions.ConnectionError('endpoint unavailable')
+        is_anomaly = [d > 600 for d in data['duration']]
+        return FakeResponse({
+            'predictions': is_anomaly,
+            'anomaly_scores': [-0.9 if a else 0.9 for a in is_anomaly],
+            'build_ids': data['build_id'],
+            'model_version': 'abc123'
+        })
+
+    monkeypatch.setattr(requests.Session, 'post', fake_post)
+    monkeypatch.setenv('ML_ENDPOINT_URL', 'http://ml.local/score')
+    monkeypatch.setenv('ML_CHUNK_SIZE', '4')
+    monkeypatch.setenv('ML_MAX_PARALLEL', '3')
+    monkeypatch.setenv('ML_MAX_RETRIES', '1')
+    monkeypatch.setenv('ML_RETRY_BACKOFF_SECONDS', '0')
+
+    batch = MetricsBatch.from_records(make_metrics(12, 6))
+    scored = function_app.predict_anomalies(batch, logging.getLogger(__name__))
+
+    assert scored.build_ids.tolist() == batch.build_ids.tolist()
+    assert scored.predictions.tolist() == [False] * 12 + [True] * 6
+    # Rows 8-11 share a chunk with the failing build and got mock scores
+    assert scored.anomaly_scores.tolist() == [0.9] * 8 + [0.5] * 4 + [-0.9] * 6
+    assert scored.model_version.tolist() == ['abc123'] * 8 + ['mock'] * 4 + ['abc123'] * 6
+    # Five chunks, plus one retry of the failing chunk
+    assert len(calls) == 6
+
+
+@pytest.mark.parametrize('name, value', [
+    ('ML_MAX_RETRIES', '-1'), ('ML_MAX_RETRIES', 'two'),
+    ('ML_RETRY_BACKOFF_SECONDS', 'one'), ('ML_RETRY_BACKOFF_SECONDS', '-1'), ('ML_RETRY_BACKOFF_SECONDS', 'nan')
+])
+def test_predict_anomalies_ignores_invalid_retry_setting(monkeypatch, name, value):
+    """Test an invalid retry setting falls back to the default instead of mock predictions"""
+    import requests
+
+    def fake_post(session, url, headers=None, json=None, timeout=None):
+        n_rows = len(json['data']['build_id'])
+        return FakeResponse({'predictions': [False] * n_rows, 'anomaly_scores': [0.9] * n_rows,
+                             'model_version': 'abc123'})
+
+    monkeypatch.setattr(requests.Session, 'post', fake_post)
+    monkeypatch.setenv('ML_ENDPOINT_URL', 'http://ml.local/score')
+    monkeypatch.setenv(name, value)
+
+    scored = function_app.predict_anomalies(MetricsBatch.from_records(make_metrics(3, 0)), logging.getLogger(__name__))
+    assert scored.model_version == 'abc123'
+    assert scored.anomaly_scores.tolist() == [0.9] * 3
+
+
+def test_stream_events_are_scored_and_alerted_when_runs_finish(monkeypatch):
+    """Test job events are aggregated per run, and finished runs are scored and alerted on"""
+    alerts = []
+    monkeypatch.setattr(function_app, 'send_teams_alert', lambda anomalies, logger: alerts.extend(anomalies))
+    monkeypatch.setattr(function_app, 'send_email_alert', lambda anomalies, logger: None)
+    monkeypatch.setattr(function_app, '_run_aggregator', None)
+    monkeypatch.delenv('ML_ENDPOINT_URL', raising=False)
+    monkeypatch.setenv('STREAM_ALLOWED_LATENESS_SECONDS', '10')
+    monkeypatch.setenv('STREAM_EMIT_BATCH_SIZE', '1')
+
+    def event(run_id, at, duration_ms=1000, exit_code=0, **extra):
+        return json.dumps({'CorrelationId': run_id, 'TimeGenerated': f'2025-01-01T00:00:{at:02d}Z',
+                           'DurationMs': duration_ms, 'ExitCode': exit_code, **extra}).encode()
+
+    stats = function_app.consume_job_events([
+        event('slow', 0, 900000), event('slow', 5, 700000, 1), event('ok', 6),
+        event('slow', 8, Completed=True), b'not json', event('ok', 7, duration_ms='NaN')
+    ], logging.getLogger(__name__))
+    assert (stats['events'], stats['invalid_events'], stats['runs_finished']) == (3, 2, 0)
+
+    # The watermark passes the completion marker: only 'slow' finishes
+    stats = function_app.consume_job_events([event('ok', 30)], logging.getLogger(__name__))
+    assert stats['runs_finished'] == 1
+    assert [(a['build_id'], a['duration'], a['failure_rate']) for a in alerts] == [('slow', 800.0, 0.5)]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import function_app
+from metrics_batch import MetricsBatch, StringTable
+
+
+def test_string_table_take_preserves_order_and_unicode():
+    """Test gathering strings, including multi-byte ones, without decoding"""
+    table = StringTable.from_list(['build_1', 'build_é', '', 'build_ü_4'])
+    assert table.tolist() == ['build_1', 'build_é', '', 'build_ü_4']
+    assert table.take(np.array([3, 0, 1])).tolist() == ['build_ü_4', 'build_1', 'build_é']
+    assert table[1] == 'build_é'
+
+
+def test_from_rows_applies_defaults_for_empty_cells():
+    """Test empty Log Analytics cells fall back to default values"""
+    batch = MetricsBatch.from_rows([('run_1', None, None), ('run_2', 450.5, 0.25)])
+    assert batch.build_ids.tolist() == ['run_1', 'run_2']
+    assert batch.duration.tolist() == [300.0, 450.5]
+    assert batch.failure_rate.tolist() == [0.0, 0.25]
+
+
+def test_mock_predictions_select_anomalies_by_mask():
+    """Test vectorized mock scoring and anomaly selection"""
+    batch = MetricsBatch.from_records([
+        {'build_id': 'ok', 'duration': 300.0, 'failure_rate': 0.01},
+        {'build_id': 'slow', 'duration': 900.0, 'failure_rate': 0.01},
+        {'build_id': 'flaky', 'duration': 300.0, 'failure_rate': 0.5},
+    ])
+    scored = function_app.mock_predictions(batch)
+    assert scored.predictions.tolist() == [False, True, True]
+    assert scored.anomalies().to_records() == [
+        {'build_id': 'slow', 'duration': 900.0, 'failure_rate': 0.01, 'anomaly_score': -0.5},
+        {'build_id': 'flaky', 'duration': 300.0, 'failure_rate': 0.5, 'anomaly_score': -0.5},
+    ]
+
+
+def test_with_predictions_rejects_misaligned_output():
+    """Test model output must have one entry per row"""
+    batch = MetricsBatch.from_columns(['a', 'b'], [1.0, 2.0], [0.0, 0.0])
+    with pytest.raises(ValueError):
+        batch.with_predictions([True], [0.1])
@@ -0,0 +1,146 @@
+import logging
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+import azure.functions as func
+
+import function_app
+from metrics_batch import MetricsBatch
+from metrics_store import MetricsStore
+
+DAY = 1760054400.0  # 2025-10-10T00:00:00Z
+
+
+def scored_batch(first, n_rows, model_version='v1'):
+    ids = [f'build_{i:05d}' for i in range(first, first + n_rows)]
+    batch = MetricsBatch.from_columns(ids, np.full(n_rows, 300.0), np.full(n_rows, 0.05))
+    return batch.with_predictions(np.zeros(n_rows, dtype=bool), np.full(n_rows, 0.1), model_version)
+
+
+def fill(store, days=2, runs_per_hour=4, rows_per_run=5):
+    """Append one batch per 15 minute detection run, like the timer trigger"""
+    n = 0
+    for run in range(days * 24 * runs_per_hour):
+        store.append(scored_batch(n, rows_per_run), DAY + run * 3600 / runs_per_hour)
+        n += rows_per_run
+    return n
+
+
+def test_range_read_lists_only_overlapping_partitions(tmp_path):
+    """Test a range read touches only its hours and filters rows at the boundaries"""
+    store = MetricsStore(tmp_path)
+    fill(store)
+
+    segments = store.segments(DAY + 3600, DAY + 2 * 3600)
+    assert len(segments) == 4
+    assert {path.parent.name for path in segments} == {'hour=01'}
+
+    columns = store.read(DAY + 3600 + 1800, DAY + 3 * 3600)
+    assert len(columns['build_id']) == 6 * 5
+    assert columns['timestamp'].min() == DAY + 3600 + 1800
+    assert columns['timestamp'].max() < DAY + 3 * 3600
+
+    # Per-row versions (chunks that fell back to the mock rule) round-trip
+    mixed = scored_batch(0, 3, np.array(['v2', 'mock', 'v2']))
+    store.append(mixed, DAY + 5 * 86400)
+    later = store.read(start='2025-10-15', columns=['build_id', 'model_version'])
+    assert later['build_id'] == ['build_00000', 'build_00001', 'build_00002']
+    assert later['model_version'].tolist() == ['v2', 'mock', 'v2']
+    assert set(later) == {'build_id', 'model_version'}
+
+
+def test_compaction_merges_closed_partitions_without_changing_reads(tmp_path):
+    """Test small closed days roll up, closed hours merge and interrupted compactions stay consistent"""
+    store = MetricsStore(tmp_path)
+    total = fill(store)
+    before = store.read()
+    # Keep a copy of a segment the compaction will replace
+    replaced = next((tmp_path / 'date=2025-10-11' / 'hour=00').glob('part-*.npz'))
+    shutil.copy(replaced, tmp_path / 'replaced.npz')
+
+    # Day one (480 rows) rolls up; day two is open, so only its first 2 closed hours merge
+    result = store.compact(before=DAY + 86400 + 2 * 3600, min_day_rows=1000)
+    assert result == {'segments_merged': 96 + 2 * 4, 'segments_written': 3, 'leftovers_deleted': 0}
+    assert store.stats()['segments'] == 1 + 2 + 22 * 4
+    assert not (tmp_path / 'date=2025-10-10' / 'hour=05').exists()
+
+    after = store.read()
+    order = np.argsort(after['timestamp'], kind='stable')
+    assert len(after['build_id']) == total
+    assert [after['build_id'][i] for i in order] == before['build_id']
+    assert len(store.segments(DAY + 3600, DAY + 2 * 3600)) == 1
+
+    # A segment a compaction replaced but did not delete is ignored, then cleaned up
+    shutil.copy(tmp_path / 'replaced.npz', replaced)
+    assert len(store.read()['build_id']) == total
+    assert store.compact(before=DAY + 86400 + 2 * 3600, min_day_rows=1000)['leftovers_deleted'] == 1
+
+
+def test_detection_records_history_for_training(tmp_path, monkeypatch):
+    """Test timer runs append each scored window, HTTP detection does not, and load_data reads it back"""
+    from train_anomaly_detection import PipelineAnomalyDetector
+
+    metrics = MetricsBatch.from_records(
+        [{'build_id': f'build_{i}', 'duration': 300.0 + i, 'failure_rate': 0.05} for i in range(10)]
+    )
+    windows = []
+
+    def query(logger, window=None, end=None):
+        windows.append((end - window, end))
+        return metrics
+
+    monkeypatch.setattr(function_app, 'query_pipeline_metrics', query)
+    monkeypatch.setattr(function_app, '_scheduler', None)
+    monkeypatch.setattr(function_app, '_snapshots', OrderedDict())
+    monkeypatch.delenv('ML_ENDPOINT_URL', raising=False)
+    monkeypatch.setenv('METRICS_STORE_PATH', str(tmp_path))
+
+    req = func.HttpRequest(method='GET', url='/api/detect_anomalies', params={}, body=b'')
+    assert function_app.http_trigger.build().get_user_function()(req).status_code == 200
+    assert MetricsStore(tmp_path).stats()['rows'] == 0
+
+    function_app.timer_trigger.build().get_user_function()(None)
+    assert len(windows) == 2
+
+    detector = PipelineAnomalyDetector('workspace', 'group', 'subscription')
+    data = detector.load_data(store_path=str(tmp_path), start='2025-01-01')
+    assert data['build_id'].tolist() == [f'build_{i}' for i in range(10)]
+    assert data['duration'].tolist() == [300.0 + i for i in range(10)]
+    assert set(data['model_version']) == {function_app.MOCK_MODEL_VERSION}
+    assert str(data['timestamp'].dt.tz) == 'UTC'
+    # Rows are stamped with the end of the timer's query window
+    assert (abs(data['timestamp'] - windows[1][1]) < pd.Timedelta(milliseconds=1)).all()
+
+
+def test_training_on_an_empty_history_range_fails(tmp_path, monkeypatch):
+    """Test training never falls back to sample data when the history has no rows in the range"""
+    from train_anomaly_detection import PipelineAnomalyDetector
+
+    monkeypatch.chdir(tmp_path)
+    store = MetricsStore(tmp_path / 'history')
+    store.append(scored_batch(0, 5), DAY)
+
+    detector = PipelineAnomalyDetector('workspace', 'group', 'subscription')
+    with pytest.raises(ValueError, match='No metrics recorded'):
+        detector.load_data(store_path=str(tmp_path / 'history'), start='2025-10-11')
+    assert not (tmp_path / 'pipeline_metrics.csv').exists()
+    assert len(detector.load_data(store_path=str(tmp_path / 'history'), start='2025-10-10')) == 5
+
+
+def test_sample_metrics_are_not_recorded(tmp_path, monkeypatch):
+    """Test generated sample data never reaches the training history"""
+    monkeypatch.setenv('METRICS_STORE_PATH', str(tmp_path))
+    monkeypatch.delenv('LOG_ANALYTICS_WORKSPACE_ID', raising=False)
+    monkeypatch.delenv('ML_ENDPOINT_URL', raising=False)
+    logger = logging.getLogger(__name__)
+
+    scored = function_app.predict_anomalies(function_app.query_pipeline_metrics(logger), logger)
+    assert scored.is_sample and scored.anomalies().is_sample
+    function_app.record_history(scored, DAY, logger)
+    assert MetricsStore(tmp_path).stats()['rows'] == 0
+
+    function_app.record_history(scored_batch(0, 5), DAY, logger)
+    assert MetricsStore(tmp_path).stats()['rows'] == 5
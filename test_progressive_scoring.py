@@ -0,0 +1,68 @@
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+from scoring.progressive import ProgressiveScorer
+from synthetic_data import synthetic_metrics
+
+
+@pytest.fixture(scope='module')
+def fixture_model(model_dir):
+    model = joblib.load(model_dir / 'isolation_forest_model.pkl')
+    scaler = joblib.load(model_dir / 'scaler.pkl')
+    data = synthetic_metrics(20000, seed=3)
+    X_scaled = scaler.transform(np.column_stack([data['duration'], data['failure_rate']]))
+    return str(model_dir), model, X_scaled
+
+
+def test_zero_error_bound_reproduces_exact_scoring(fixture_model):
+    """Test progressive scoring without early exit matches sklearn's scores and predictions"""
+    _, model, X_scaled = fixture_model
+    is_anomaly, scores, trees_used = ProgressiveScorer(model, error_bound=0).score(X_scaled)
+    assert np.allclose(scores, model.score_samples(X_scaled), rtol=0, atol=1e-12)
+    assert np.array_equal(is_anomaly, model.predict(X_scaled) == -1)
+    assert (trees_used == 100).all()
+
+
+def test_approximate_mode_stays_within_error_bound(fixture_model):
+    """Test early exit disagrees with exact predictions on fewer rows than the bound"""
+    _, model, X_scaled = fixture_model
+    exact = model.predict(X_scaled) == -1
+
+    scorer = ProgressiveScorer(model, error_bound=0.01, tree_batch=10)
+    is_anomaly, _, trees_used = scorer.score(X_scaled)
+
+    assert np.mean(is_anomaly != exact) <= 0.01
+    assert trees_used.mean() < 30
+
+    # The smallest batch still has a variance at every check
+    is_anomaly, _, _ = ProgressiveScorer(model, error_bound=0.01, tree_batch=2).score(X_scaled)
+    assert np.mean(is_anomaly != exact) <= 0.01
+    with pytest.raises(ValueError):
+        ProgressiveScorer(model, tree_batch=1)
+    assert scorer.stats()['avg_trees_per_row'] == pytest.approx(trees_used.mean(), abs=0.01)
+
+
+def test_run_reports_trees_in_approximate_mode(fixture_model, monkeypatch):
+    """Test SCORING_MODE=approximate switches run() and reports trees evaluated per row"""
+    from scoring import score
+
+    model_dir, _, _ = fixture_model
+    payload = json.dumps({'data': {'duration': [300.0, 1200.0], 'failure_rate': [0.02, 0.9]}})
+
+    score.init(model_dir)
+    exact = json.loads(score.run(payload))
+    assert 'avg_trees_per_row' not in exact
+
+    monkeypatch.setenv('SCORING_MODE', 'approximate')
+    score.init(model_dir)
+    try:
+        approximate = json.loads(score.run(payload))
+    finally:
+        monkeypatch.delenv('SCORING_MODE')
+        score.init(model_dir)
+
+    assert approximate['predictions'] == exact['predictions'] == [False, True]
+    assert approximate['avg_trees_per_row'] < 100
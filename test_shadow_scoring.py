@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from synthetic_data import synthetic_metrics
+
+
+@pytest.fixture
+def model_dirs(model_dir, shadow_model_dir):
+    return str(model_dir), str(shadow_model_dir)
+
+
+def make_payload(n_rows):
+    data = synthetic_metrics(n_rows, seed=5)
+    return json.dumps({'data': {'build_id': data['build_id'],
+                                'duration': data['duration'].tolist(),
+                                'failure_rate': data['failure_rate'].tolist()}})
+
+
+@pytest.mark.parametrize('mode', ['approximate', 'exact'])
+def test_shadow_returns_primary_result_and_records_agreement(model_dirs, monkeypatch, mode):
+    """Test a shadow model leaves responses unchanged and reports agreement with the primary"""
+    from scoring import score
+
+    primary, shadow = model_dirs
+    payload = make_payload(2000)
+
+    score.init(primary)
+    expected = score.run(payload)
+    assert 'error' in score.shadow_report()
+
+    monkeypatch.setenv('SHADOW_MODE', mode)
+    score.init(primary, shadow_model_dir=shadow)
+    try:
+        assert score.run(payload) == expected
+        report = json.loads(score.run(json.dumps({'shadow_report': True})))
+    finally:
+        score.init(primary)
+
+    predictions = json.loads(expected)['predictions']
+    assert report['requests'] == 1
+    assert report['rows'] == 2000
+    assert report['primary_anomaly_rate'] == pytest.approx(sum(predictions) / 2000)
+    assert report['agreement_rate'] > 0.98
+    assert report['errors'] == 0
+    if mode == 'approximate':
+        assert report['avg_trees_per_row'] < 50
+
+
+def test_broken_shadow_does_not_affect_primary(model_dirs, tmp_path):
+    """Test a missing shadow model is skipped and the primary keeps serving"""
+    from scoring import score
+
+    primary, _ = model_dirs
+    score.init(primary, shadow_model_dir=str(tmp_path / 'missing'))
+    assert score.shadow_scorer is None
+    assert 'predictions' in json.loads(score.run(make_payload(10)))
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stream_aggregator import RunAggregator
+from synthetic_data import synthetic_events
+
+
+def test_matches_kql_summarize_on_out_of_order_stream():
+    """Test per-run metrics equal the KQL summarize over the same events"""
+    events = synthetic_events(n_runs=300, jobs_per_run=8, arrival_delay_s=5.0)
+    aggregator = RunAggregator(allowed_lateness=120, run_idle_seconds=300)
+    aggregator.add_many(events)
+    assert aggregator.runs_finished > 0 and aggregator.open_runs > 0
+
+    finished = [aggregator.drain(), aggregator.flush()]
+    ids = finished[0].build_ids.tolist() + finished[1].build_ids.tolist()
+    duration = np.concatenate([batch.duration for batch in finished])
+    failure_rate = np.concatenate([batch.failure_rate for batch in finished])
+
+    df = pd.DataFrame(events, columns=['run_id', 'time', 'duration_ms', 'exit_code'])
+    expected = df.groupby('run_id').agg(duration=('duration_ms', lambda d: (d / 1000).mean()),
+                                        failure_rate=('exit_code', lambda c: (c != 0).mean()))
+    expected = expected.loc[ids]
+
+    assert aggregator.late_events_dropped == 0
+    assert len(ids) == len(set(ids)) == 300
+    assert np.allclose(duration, expected['duration'])
+    assert np.allclose(failure_rate, expected['failure_rate'])
+
+
+def test_late_events_and_completion():
+    """Test events within the lateness are counted and events behind the watermark are dropped"""
+    aggregator = RunAggregator(allowed_lateness=30, run_idle_seconds=60)
+    aggregator.add_many([('a', 0.0, 10000, 0), ('b', 10.0, 20000, 1), ('a', 20.0, 30000, 1)])
+    aggregator.mark_completed('a', 25.0)
+
+    # Out of order but within the lateness: still part of run 'a'
+    aggregator.add('a', 5.0, 20000, 0)
+    aggregator.add('c', 60.0, 1000, 0)
+    finished = aggregator.drain()
+    assert finished.build_ids.tolist() == ['a']
+    assert finished.duration[0] == pytest.approx(20.0)
+    assert finished.failure_rate[0] == pytest.approx(1 / 3)
+
+    # 'a' is closed and 10.0 is behind the watermark (30): dropped
+    aggregator.add('a', 10.0, 5000, 0)
+    assert aggregator.late_events_dropped == 1
+    assert sorted(aggregator.flush().build_ids.tolist()) == ['b', 'c']
+
+
+def test_bounded_open_runs_and_sink_batches():
+    """Test the open-run cap evicts the stalest runs and the sink receives full batches"""
+    batches = []
+    aggregator = RunAggregator(sink=batches.append, max_open_runs=100, emit_batch_size=50,
+                               allowed_lateness=1e9, run_idle_seconds=1e9)
+    aggregator.add_many((f'run_{i}', float(i), 1000, 0) for i in range(1000))
+
+    assert aggregator.open_runs == 100
+    assert aggregator.runs_evicted == 900
+    assert [len(batch) for batch in batches] == [50] * 18
+    assert batches[0].build_ids[0] == 'run_0'
+
+    aggregator.flush()
+    assert sum(len(batch) for batch in batches) == 1000
+
+
+def test_evicted_and_finished_runs_are_emitted_once():
+    """Test stragglers of evicted or finished runs are dropped instead of opening a second row"""
+    batches = []
+    aggregator = RunAggregator(sink=batches.append, max_open_runs=2, emit_batch_size=1,
+                               allowed_lateness=1e9, run_idle_seconds=1e9)
+    aggregator.add_many([('r1', 0.0, 1000, 0), ('r2', 1.0, 1000, 0), ('r3', 2.0, 1000, 0)])
+    # The cap holds within a single call, so r1 is already evicted
+    assert aggregator.open_runs == 2
+    aggregator.add('r1', 3.0, 1000, 0)
+    aggregator.flush()
+
+    ids = [build_id for batch in batches for build_id in batch.build_ids.tolist()]
+    assert sorted(ids) == ['r1', 'r2', 'r3']
+    assert aggregator.closed_run_events_dropped == 1
+
+    # The closed-run memory is bounded too
+    aggregator = RunAggregator(max_closed_runs=10, allowed_lateness=0, run_idle_seconds=1)
+    aggregator.add_many((f'run_{i}', float(i * 10), 1000, 0) for i in range(100))
+    assert len(aggregator._closed) == 10
+
+
+def test_completed_runs_finish_in_completion_time_order():
+    """Test the watermark finishes exactly the completed runs it has passed, whatever the marking order"""
+    aggregator = RunAggregator(allowed_lateness=10, run_idle_seconds=1e9)
+    aggregator.add_many((f'run_{t}', 0.0, 1000, 0) for t in (10, 30, 20))
+    for t in (10, 30, 20):
+        aggregator.mark_completed(f'run_{t}', float(t))
+
+    aggregator.add('other', 35.0, 1000, 0)
+    assert aggregator.drain().build_ids.tolist() == ['run_10', 'run_20']
+    assert sorted(aggregator.flush().build_ids.tolist()) == ['other', 'run_30']
@@ -12,6 +12,9 @@ import joblib
 import os
 from pathlib import Path
 
+from metrics_store import MetricsStore
+from scoring.drift import DriftMonitor
+
 # Azure ML SDK v2 imports
 from azure.ai.ml import MLClient
 from azure.ai.ml.entities import Model, ManagedOnlineEndpoint, ManagedOnlineDeployment, Environment, CodeConfiguration
@@ -43,6 +46,7 @@ class PipelineAnomalyDetector:
         self.subscription_id = subscription_id
         self.model = None
         self.scaler = StandardScaler()
+        self.drift_monitor = None
         self.ml_client = None
         
     def connect_to_workspace(self):
@@ -65,17 +69,25 @@ class PipelineAnomalyDetector:
             logger.error(f"Failed to connect to workspace: {str(e)}")
             raise
     
-    def load_data(self, csv_path: str = 'pipeline_metrics.csv') -> pd.DataFrame:
+    def load_data(self, csv_path: str = 'pipeline_metrics.csv', store_path: str = None,
+                  start=None, end=None) -> pd.DataFrame:
         """
-        Load pipeline metrics data from CSV file.
+        Load pipeline metrics data from the metrics history store or a CSV file.
         
         Args:
-            csv_path: Path to CSV file containing metrics
+            csv_path: Path to CSV file containing metrics (used without store_path)
+            store_path: Root of the metrics history written by the detection pipeline
+            start: Inclusive start of the time range to read from the store
+                (epoch seconds, ISO 8601 string or datetime; None for the beginning)
+            end: Exclusive end of the time range (None for everything since start)
             
         Returns:
             DataFrame with pipeline metrics
         """
         try:
+            if store_path:
+                return self._load_history(store_path, start, end)
+            
             logger.info(f"Loading data from {csv_path}")
             
             if not os.path.exists(csv_path):
@@ -98,6 +110,39 @@ class PipelineAnomalyDetector:
             logger.error(f"Error loading data: {str(e)}")
             raise
     
+    def _load_history(self, store_path: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Read a time range of scored builds from the metrics history store.
+        
+        Only the partitions overlapping the range are read.
+        
+        Args:
+            store_path: Root of the metrics history store
+            start: Inclusive start of the range, or None
+            end: Exclusive end of the range, or None
+            
+        Returns:
+            DataFrame with timestamp, build_id, features, anomaly_score,
+            prediction and model_version columns
+            
+        Raises:
+            ValueError: If no builds were recorded in the range (training on
+                generated sample data instead would register a model that
+                never saw a real build)
+        """
+        store = MetricsStore(store_path)
+        logger.info(f"Loading data from metrics history {store_path} ({start or 'beginning'} to {end or 'now'})")
+        
+        columns = store.read(start, end)
+        if not len(columns['build_id']):
+            raise ValueError(f"No metrics recorded in {store_path} from {start or 'the beginning'} "
+                             f"to {end or 'now'}")
+        
+        df = pd.DataFrame(columns)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
+        logger.info(f"Loaded {len(df)} records scored by model versions {sorted(df['model_version'].unique())}")
+        return df
+    
     def _generate_sample_data(self, n_samples: int = 1000) -> pd.DataFrame:
         """
         Generate sample pipeline metrics data for demonstration.
@@ -171,13 +216,17 @@ class PipelineAnomalyDetector:
             
             self.model.fit(X_scaled)
             
-            # Evaluate on training data
-            predictions = self.model.predict(X_scaled)
-            n_anomalies = np.sum(predictions == -1)
+            # Evaluate on training data; predict() flags score_samples - offset_ < 0,
+            # so the scores are computed once and reused for the drift sketches
+            anomaly_scores = self.model.score_samples(X_scaled)
+            n_anomalies = np.sum(anomaly_scores - self.model.offset_ < 0)
             
             logger.info(f"Model trained successfully")
             logger.info(f"Detected {n_anomalies} anomalies in training data ({n_anomalies/len(data)*100:.2f}%)")
             
+            # Reference distribution sketches for drift detection at scoring time
+            self.drift_monitor = DriftMonitor.from_training(X, anomaly_scores)
+            
             # Save model locally
             self._save_model_locally()
             
@@ -195,6 +244,8 @@ class PipelineAnomalyDetector:
             
             joblib.dump(self.model, model_path)
             joblib.dump(self.scaler, scaler_path)
+            if self.drift_monitor is not None:
+                self.drift_monitor.save(output_dir)
             
             logger.info(f"Model saved to {model_path}")
             logger.info(f"Scaler saved to {scaler_path}")
@@ -361,8 +412,14 @@ def main():
         # Connect to Azure ML workspace
         detector.connect_to_workspace()
         
-        # Load data
-        data = detector.load_data('pipeline_metrics.csv')
+        # Load data: the metrics history recorded by the detection pipeline
+        # when METRICS_STORE_PATH is set, otherwise the flat CSV
+        data = detector.load_data(
+            'pipeline_metrics.csv',
+            store_path=os.getenv('METRICS_STORE_PATH'),
+            start=os.getenv('TRAINING_START'),
+            end=os.getenv('TRAINING_END')
+        )
         
         # Train model
         detector.train_model(data, contamination=0.05)